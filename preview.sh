@@ -0,0 +1,2 @@
+#!/usr/bin/env bash
+python3 src/preview.py "$@"
@@ -0,0 +1,275 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from manifest import (
+    hash_file,
+    hash_file_cached,
+    load_asset_manifest,
+    save_asset_manifest,
+)
+from page import remove_output
+
+# Hex digits of the content hash put into fingerprinted file names.
+FINGERPRINT_LENGTH = 12
+COPY_STRATEGIES = ("copy", "kernel", "hardlink")
+
+
+class SyncResult(NamedTuple):
+    copied: int
+    unchanged: int
+    removed: int
+
+
+def is_unchanged(src: str, dest: str, use_hash: bool = False) -> bool:
+    """
+    Checks whether dest already holds a copy of src.
+    Files match when their sizes and mtimes are equal; with use_hash, files of
+    equal size but different mtimes are also compared by content hash, and on a
+    match dest is given src's times and mode so the next check is a stat again.
+
+    Args:
+        src (str): Source file path.
+        dest (str): Destination file path.
+        use_hash (bool): Fall back to comparing content hashes.
+
+    Returns:
+        bool: True if dest does not need to be copied again.
+    """
+    try:
+        dest_stat = os.stat(dest)
+    except FileNotFoundError:
+        return False
+    src_stat = os.stat(src)
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+    if src_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    if not use_hash or hash_file(src) != hash_file(dest):
+        return False
+    shutil.copystat(src, dest)
+    return True
+
+
+def kernel_copy(src: str, dest: str):
+    """
+    Copies src to dest with os.copy_file_range, or os.sendfile where that is
+    unavailable, so the data never passes through user space; filesystems with
+    reflink support can share the blocks outright. Falls back to a regular copy
+    when the kernel refuses. Copies metadata like shutil.copy2.
+
+    Args:
+        src (str): Source file path.
+        dest (str): Destination file path.
+    """
+    copy_range = getattr(os, "copy_file_range", None)
+    try:
+        with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                if copy_range is not None:
+                    sent = copy_range(fsrc.fileno(), fdst.fileno(), remaining)
+                else:
+                    sent = os.sendfile(fdst.fileno(), fsrc.fileno(), None, remaining)
+                if sent == 0:
+                    break
+                remaining -= sent
+    except OSError:
+        _ = shutil.copyfile(src, dest)
+    shutil.copystat(src, dest)
+
+
+def copy_file(src: str, dest: str, strategy: str = "copy") -> str:
+    """
+    Replaces dest with a copy of src using the given strategy.
+    The copy is made next to dest and renamed over it, so an existing dest that
+    is a hardlink is never written through.
+
+    Args:
+        src (str): Source file path.
+        dest (str): Destination file path.
+        strategy (str): One of COPY_STRATEGIES. "hardlink" falls back to
+                        "kernel" when src and dest are on different filesystems.
+
+    Returns:
+        str: The strategy that was actually used.
+    """
+    tmp_path = f"{dest}.sync-tmp"
+    if strategy == "hardlink":
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            strategy = "kernel"
+    if strategy == "kernel":
+        kernel_copy(src, tmp_path)
+    elif strategy == "copy":
+        _ = shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dest)
+    return strategy
+
+
+def find_duplicates(paths: list[str]) -> dict[str, str]:
+    """
+    Finds files with identical contents. Only files sharing a size are hashed.
+
+    Args:
+        paths (list[str]): File paths to check.
+
+    Returns:
+        dict[str, str]: Maps each duplicate to the first path with the same
+                        contents; first occurrences are not included.
+    """
+    by_size: dict[int, list[str]] = {}
+    for path in paths:
+        by_size.setdefault(os.path.getsize(path), []).append(path)
+    duplicates: dict[str, str] = {}
+    for group in by_size.values():
+        if len(group) < 2:
+            continue
+        first_by_hash: dict[str, str] = {}
+        for path in group:
+            first = first_by_hash.setdefault(hash_file(path), path)
+            if first != path:
+                duplicates[path] = first
+    return duplicates
+
+
+def fingerprint_path(relative_path: str, digest: str) -> str:
+    """
+    Returns the fingerprinted name of a file: its content hash goes before the
+    extension, e.g. images/a.png becomes images/a.0123456789ab.png.
+
+    Args:
+        relative_path (str): Path of the file.
+        digest (str): Hex digest of the file's contents.
+
+    Returns:
+        str: The fingerprinted path.
+    """
+    root, extension = os.path.splitext(relative_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def fingerprint_assets(
+    src_dir: str, hashes: dict[str, list[int | str]] | None = None
+) -> dict[str, str]:
+    """
+    Maps every file in src_dir to its fingerprinted name. With a hash map, only
+    files whose size or mtime changed since it recorded them are hashed again,
+    and entries of files that are gone are dropped from it.
+
+    Args:
+        src_dir (str): Source directory path.
+        hashes (dict[str, list[int | str]] | None): [size, mtime_ns, digest]
+                                                    entries keyed by path
+                                                    relative to src_dir.
+
+    Returns:
+        dict[str, str]: Fingerprinted paths keyed by path, both relative to src_dir.
+    """
+    if hashes is None:
+        hashes = {}
+    assets: dict[str, str] = {}
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        for file in sorted(files):
+            src = os.path.join(root, file)
+            relative_path = os.path.relpath(src, src_dir)
+            digest = hash_file_cached(src, relative_path, hashes)
+            assets[relative_path] = fingerprint_path(relative_path, digest)
+    for relative_path in hashes.keys() - assets.keys():
+        del hashes[relative_path]
+    return assets
+
+
+def sync_directory(
+    src_dir: str,
+    dest_dir: str,
+    manifest_path: str | None,
+    use_hash: bool = False,
+    strategy: str = "copy",
+    workers: int = 1,
+    dedupe: bool = False,
+    fingerprints: dict[str, str] | None = None,
+) -> SyncResult:
+    """
+    Makes dest_dir hold a copy of every file in src_dir, copying only new or
+    changed files and leaving unchanged ones untouched. Files copied by the
+    previous sync whose source is gone are removed; everything else in
+    dest_dir, such as generated pages, is left alone.
+
+    Args:
+        src_dir (str): Source directory path.
+        dest_dir (str): Destination directory path.
+        manifest_path (str | None): Path to the asset manifest recording synced
+                                    files, or None to neither read nor record
+                                    one (nothing is then removed).
+        use_hash (bool): Compare content hashes when sizes match but mtimes differ.
+        strategy (str): How files are copied, one of COPY_STRATEGIES.
+        workers (int): Number of threads copying files.
+        dedupe (bool): Copy files with identical contents once and hardlink the
+                       rest to that copy. Linked copies share one mtime, so this
+                       implies use_hash.
+        fingerprints (dict[str, str] | None): Fingerprinted names by relative
+                                              path (see fingerprint_assets).
+                                              Each file is also published under
+                                              its fingerprinted name, hardlinked
+                                              to the plain copy, so both stay
+                                              reachable.
+
+    Returns:
+        SyncResult: Number of files copied, left unchanged and removed.
+    """
+    if not os.path.exists(src_dir):
+        raise FileNotFoundError(f"Source directory '{src_dir}' does not exist.")
+
+    previous = load_asset_manifest(manifest_path) if manifest_path else []
+    current: list[str] = []
+    pending: dict[str, str] = {}
+    aliases: dict[str, str] = {}
+    unchanged = 0
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        for file in sorted(files):
+            src = os.path.join(root, file)
+            relative_path = os.path.relpath(src, src_dir)
+            dest = os.path.join(dest_dir, relative_path)
+            current.append(relative_path)
+            if fingerprints is not None and relative_path in fingerprints:
+                current.append(fingerprints[relative_path])
+                alias = os.path.join(dest_dir, fingerprints[relative_path])
+                if not is_unchanged(src, alias):
+                    aliases[alias] = dest
+            if is_unchanged(src, dest, use_hash or dedupe):
+                unchanged += 1
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            pending[src] = dest
+
+    duplicates = find_duplicates(list(pending)) if dedupe else {}
+    originals = [src for src in pending if src not in duplicates]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        used = executor.map(
+            lambda src: copy_file(src, pending[src], strategy), originals
+        )
+        for src, method in zip(originals, used, strict=True):
+            print(f"File copied from {src} to {pending[src]} ({method})")
+    for src, first in duplicates.items():
+        _ = copy_file(pending[first], pending[src], "hardlink")
+        print(f"File linked from {pending[first]} to {pending[src]} (duplicate)")
+    for alias, dest in aliases.items():
+        _ = copy_file(dest, alias, "hardlink")
+        print(f"File linked from {dest} to {alias} (fingerprint)")
+
+    removed = 0
+    kept = set(current)
+    for relative_path in previous:
+        if relative_path not in kept:
+            remove_output(os.path.join(dest_dir, relative_path), dest_dir)
+            print(f"Removed stale asset {relative_path}")
+            removed += 1
+
+    if manifest_path:
+        save_asset_manifest(manifest_path, current)
+    return SyncResult(len(pending), unchanged, removed)
@@ -0,0 +1,275 @@
+import argparse
+import json
+import multiprocessing.util
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import TypedDict, cast
+
+import page
+from corpus import generate_corpus, parse_mix
+from main import PUBLIC_DIR
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+# Directory each measured worker process records its peak RSS in.
+PEAK_DIR_ENV = "BENCH_BUILD_PEAK_DIR"
+
+# Runs main.main() in a fresh interpreter, with every page worker recording its
+# peak RSS on exit, then reports the peak RSS of the build process itself.
+RUNNER = """
+import json, resource, sys
+sys.path.insert(0, sys.argv[1])
+sys.argv = ["main.py", *sys.argv[2:]]
+import bench_build, main, page
+page._init_worker = bench_build.init_measured_worker
+main.main()
+usage = {"self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+print(json.dumps(usage), file=sys.stderr)
+"""
+# The real worker initializer, kept before RUNNER replaces it.
+_init_worker = page._init_worker  # pyright: ignore[reportPrivateUsage]
+
+
+def record_peak_rss():
+    path = os.path.join(os.environ[PEAK_DIR_ENV], str(os.getpid()))
+    with open(path, "w") as f:
+        _ = f.write(str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def init_measured_worker(settings: page.RenderSettings):
+    """
+    Page worker initializer that also records the worker's peak RSS when it
+    exits, since RUSAGE_CHILDREN only reports the largest child's.
+
+    Args:
+        settings (page.RenderSettings): The build's render settings.
+    """
+    _init_worker(settings)
+    # Finalizers with an exit priority run when a pool worker exits cleanly.
+    _ = multiprocessing.util.Finalize(None, record_peak_rss, exitpriority=0)
+
+
+class BuildResult(TypedDict):
+    pages: int
+    jobs: int
+    markdown_bytes: int
+    wall_seconds: float
+    pages_per_second: float
+    mb_per_second: float
+    peak_rss_mb: float
+
+
+def parse_int_list(spec: str) -> list[int]:
+    return [int(value) for value in spec.split(",") if value]
+
+
+def run_build(site_dir: str, jobs: int, extra_args: list[str]) -> tuple[float, float]:
+    """
+    Runs a cold full build of the site in site_dir in a separate process: the
+    previous output is removed and the parse cache is off, so every run of a
+    suite parses and writes every page.
+
+    Args:
+        site_dir (str): Directory containing content/, static/ and template.html.
+        jobs (int): Number of worker processes.
+        extra_args (list[str]): Additional arguments passed to main.py.
+
+    Returns:
+        tuple[float, float]: Wall time in seconds and peak RSS in MB, summed
+                             over the build process and its workers.
+    """
+    shutil.rmtree(os.path.join(site_dir, PUBLIC_DIR), ignore_errors=True)
+    with tempfile.TemporaryDirectory(prefix="ssg-bench-rss-") as peak_dir:
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                RUNNER,
+                SRC_DIR,
+                "/",
+                "--jobs",
+                str(jobs),
+                "--no-cache",
+                *extra_args,
+            ],
+            cwd=site_dir,
+            env={**os.environ, PEAK_DIR_ENV: peak_dir},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=False,
+        )
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(f"Build failed:\n{proc.stderr}")
+        usage = cast(dict[str, int], json.loads(proc.stderr.strip().splitlines()[-1]))
+        peak = usage["self"]
+        for name in os.listdir(peak_dir):
+            with open(os.path.join(peak_dir, name)) as f:
+                peak += int(f.read())
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return wall, peak / scale
+
+
+def run_suite(
+    page_counts: list[int],
+    job_counts: list[int],
+    page_size: int,
+    markup_density: float,
+    mix: dict[str, int],
+    depth: int,
+    seed: int,
+    extra_args: list[str],
+) -> list[BuildResult]:
+    """
+    Builds a synthetic corpus of every requested size with every requested
+    number of workers.
+
+    Args:
+        page_counts (list[int]): Corpus sizes to build.
+        job_counts (list[int]): Worker counts to build each corpus with.
+        page_size (int): Approximate page size in bytes.
+        markup_density (float): Fraction of words carrying inline markup.
+        mix (dict[str, int]): Weight per block kind.
+        depth (int): Directory depth of the content tree.
+        seed (int): Random seed for the corpus.
+        extra_args (list[str]): Additional arguments passed to main.py.
+
+    Returns:
+        list[BuildResult]: One result per (pages, jobs) combination.
+    """
+    results: list[BuildResult] = []
+    for pages in page_counts:
+        with tempfile.TemporaryDirectory(prefix="ssg-bench-") as site_dir:
+            total = generate_corpus(
+                site_dir, pages, page_size, markup_density, mix, depth, seed
+            )
+            for jobs in job_counts:
+                wall, rss = run_build(site_dir, jobs, extra_args)
+                result: BuildResult = {
+                    "pages": pages,
+                    "jobs": jobs,
+                    "markdown_bytes": total,
+                    "wall_seconds": round(wall, 4),
+                    "pages_per_second": round(pages / wall, 1),
+                    "mb_per_second": round(total / wall / 1e6, 3),
+                    "peak_rss_mb": round(rss, 1),
+                }
+                print(
+                    f"{pages:>8} pages {jobs:>3} jobs  {wall:>8.2f}s "
+                    + f"{result['pages_per_second']:>10.1f} pages/s "
+                    + f"{result['mb_per_second']:>8.3f} MB/s "
+                    + f"{result['peak_rss_mb']:>8.1f} MB RSS"
+                )
+                results.append(result)
+    return results
+
+
+def compare(baseline_path: str, results: list[BuildResult]):
+    """
+    Prints the speedup of each result over the matching baseline result.
+
+    Args:
+        baseline_path (str): Path to a JSON report from an earlier run.
+        results (list[BuildResult]): Results of this run.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = cast(list[BuildResult], json.load(f)["results"])
+    by_shape = {(r["pages"], r["jobs"]): r for r in baseline}
+    for result in results:
+        old = by_shape.get((result["pages"], result["jobs"]))
+        if old is None:
+            continue
+        speedup = old["wall_seconds"] / result["wall_seconds"]
+        print(
+            f"{result['pages']:>8} pages {result['jobs']:>3} jobs  "
+            + f"{speedup:>6.2f}x vs baseline"
+        )
+
+
+def git_revision() -> str:
+    proc = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return proc.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end build benchmark")
+    _ = parser.add_argument(
+        "--pages", default="100,1000,10000,100000", help="Comma separated page counts"
+    )
+    _ = parser.add_argument(
+        "--jobs",
+        default=f"1,{os.cpu_count() or 1}",
+        help="Comma separated worker counts",
+    )
+    _ = parser.add_argument("--page-size", type=int, default=4096)
+    _ = parser.add_argument("--markup-density", type=float, default=0.1)
+    _ = parser.add_argument("--mix", default="paragraph=6,list=2,code=1,quote=1")
+    _ = parser.add_argument("--depth", type=int, default=2)
+    _ = parser.add_argument("--seed", type=int, default=0)
+    _ = parser.add_argument(
+        "--output", default="bench_build.json", help="Where to save the JSON report"
+    )
+    _ = parser.add_argument(
+        "--compare", metavar="REPORT", help="Earlier JSON report to compare against"
+    )
+    _ = parser.add_argument(
+        "build_args", nargs="*", help="Extra arguments passed to main.py (after --)"
+    )
+    args = parser.parse_args()
+
+    page_size = cast(int, args.page_size)
+    markup_density = cast(float, args.markup_density)
+    mix = parse_mix(cast(str, args.mix))
+    depth = cast(int, args.depth)
+    seed = cast(int, args.seed)
+    build_args = cast(list[str], args.build_args)
+    results = run_suite(
+        parse_int_list(cast(str, args.pages)),
+        parse_int_list(cast(str, args.jobs)),
+        page_size,
+        markup_density,
+        mix,
+        depth,
+        seed,
+        build_args,
+    )
+    settings = {
+        "page_size": page_size,
+        "markup_density": markup_density,
+        "mix": mix,
+        "depth": depth,
+        "seed": seed,
+        "build_args": build_args,
+    }
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": settings,
+        "results": results,
+    }
+    output = cast(str, args.output)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {output}")
+    if args.compare:
+        compare(cast(str, args.compare), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+from collections.abc import Callable
+from typing import cast
+
+from corpus import DEFAULT_MIX, generate_page_markdown
+from htmlnode import iter_html
+from page import generate_page
+from template import Template
+from textnode import TextNode, TextType
+from utils import (
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+
+DEFAULT_BASELINE = "bench_baseline.json"
+TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "..", "template.html")
+
+INLINE_FIXTURE = (
+    "This is **bold** text with an _italic_ word, a `code span`, some ~~struck~~ "
+    "words, an ![image](/images/tolkien.png) and a [link](/blog/tom) in it. "
+) * 8
+PLAIN_FIXTURE = "Plain prose without any markup characters in it at all. " * 16
+DOCUMENT_FIXTURE = generate_page_markdown(random.Random(0), 0, 16384, 0.1, DEFAULT_MIX)
+BLOCK_FIXTURES = markdown_to_blocks(DOCUMENT_FIXTURE)
+TREE_FIXTURE = markdown_to_html_node(DOCUMENT_FIXTURE)
+
+
+def bench_generate_page(minify: bool = False) -> Callable[[], None]:
+    """
+    Returns a callable that renders the document fixture to a temporary file.
+
+    Args:
+        minify (bool): Render with minimal whitespace.
+
+    Returns:
+        Callable[[], None]: The benchmark callable.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="ssg-micro-")
+    source = os.path.join(tmp_dir, "index.md")
+    dest = os.path.join(tmp_dir, "out", "index.html")
+    with open(source, "w") as f:
+        _ = f.write(DOCUMENT_FIXTURE)
+    atexit.register(shutil.rmtree, tmp_dir, True)
+    template = Template("<title>{{ Title }}</title>{{ Content }}", "/base/", minify)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_page(source, "template.html", dest, "/base/", template)
+
+    return run
+
+
+def benchmarks() -> dict[str, Callable[[], object]]:
+    """
+    Returns the benchmarked functions, each bound to its fixed input fixture.
+
+    Returns:
+        dict[str, Callable[[], object]]: Benchmark callables keyed by name.
+    """
+    inline = [TextNode(INLINE_FIXTURE, TextType.TEXT)]
+    return {
+        "text_to_textnodes": lambda: text_to_textnodes(INLINE_FIXTURE),
+        "text_to_textnodes[plain]": lambda: text_to_textnodes(PLAIN_FIXTURE),
+        "text_to_textnodes[legacy]": lambda: text_to_textnodes(
+            INLINE_FIXTURE, legacy=True
+        ),
+        "split_nodes_delimiter": lambda: split_nodes_delimiter(
+            inline, "**", TextType.BOLD
+        ),
+        "split_nodes_image": lambda: split_nodes_image(inline),
+        "split_nodes_link": lambda: split_nodes_link(inline),
+        "markdown_to_blocks": lambda: markdown_to_blocks(DOCUMENT_FIXTURE),
+        "block_to_block_type": lambda: [
+            block_to_block_type(block) for block in BLOCK_FIXTURES
+        ],
+        "markdown_to_html_node": lambda: markdown_to_html_node(DOCUMENT_FIXTURE),
+        "ParentNode.to_html": TREE_FIXTURE.to_html,
+        "iter_html[minify]": lambda: "".join(iter_html(TREE_FIXTURE, True)),
+        "generate_page": bench_generate_page(),
+        "generate_page[minify]": bench_generate_page(minify=True),
+    }
+
+
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    """
+    Returns the best time per call of func, in seconds.
+
+    Args:
+        func (Callable[[], object]): The function to time.
+        repeat (int): Number of timed rounds; the fastest one is used.
+
+    Returns:
+        float: Seconds per call.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(names: list[str] | None, repeat: int) -> dict[str, float]:
+    """
+    Runs the micro-benchmarks and prints their timings.
+
+    Args:
+        names (list[str] | None): Benchmarks to run; all when None.
+        repeat (int): Number of timed rounds per benchmark.
+
+    Returns:
+        dict[str, float]: Seconds per call keyed by benchmark name.
+    """
+    results: dict[str, float] = {}
+    for name, func in benchmarks().items():
+        if names and name not in names:
+            continue
+        results[name] = time_call(func, repeat)
+        print(f"{name:<28} {results[name] * 1e6:>12.2f} us")
+    return results
+
+
+def minify_report(repeat: int) -> dict[str, float]:
+    """
+    Renders the document fixture into the site template with and without
+    minification and prints the bytes saved and the render-time overhead.
+
+    Args:
+        repeat (int): Number of timed rounds per variant.
+
+    Returns:
+        dict[str, float]: Page sizes in bytes and seconds per render of both
+                          variants, plus the fraction of bytes saved.
+    """
+    with open(TEMPLATE_PATH, "r") as f:
+        source = f.read()
+    results: dict[str, float] = {}
+    for name, minify in (("plain", False), ("minified", True)):
+        template = Template(source, "/base/", minify)
+
+        def render(template: Template = template) -> str:
+            html = "".join(iter_html(TREE_FIXTURE, template.minify))
+            return template.render(html, "Title")
+
+        results[f"{name}_bytes"] = len(render().encode())
+        results[f"{name}_seconds"] = time_call(render, repeat)
+    results["saved"] = 1 - results["minified_bytes"] / results["plain_bytes"]
+    overhead = results["minified_seconds"] / results["plain_seconds"] - 1
+    print(
+        f"{'page bytes':<28} {results['plain_bytes']:>12.0f} -> "
+        + f"{results['minified_bytes']:.0f} ({results['saved']:.1%} saved)"
+    )
+    print(
+        f"{'render time':<28} {results['plain_seconds'] * 1e6:>12.2f} us -> "
+        + f"{results['minified_seconds'] * 1e6:.2f} us ({overhead:+.1%})"
+    )
+    return results
+
+
+def compare(
+    baseline: dict[str, float], results: dict[str, float], threshold: float
+) -> list[str]:
+    """
+    Prints each benchmark's change against the baseline.
+
+    Args:
+        baseline (dict[str, float]): Seconds per call from the baseline file.
+        results (dict[str, float]): Seconds per call from this run.
+        threshold (float): Allowed slowdown, e.g. 0.1 for 10%.
+
+    Returns:
+        list[str]: Names of the benchmarks that regressed beyond the threshold.
+    """
+    regressions: list[str] = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            print(f"{name:<28} {'(not in baseline)':>12}")
+            continue
+        change = seconds / baseline[name] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<28} {change:>+12.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser/renderer micro-benchmarks")
+    _ = parser.add_argument(
+        "command",
+        choices=("run", "baseline", "compare", "minify"),
+        help="run: print timings; baseline: save them; compare: check against them; "
+        + "minify: report bytes saved and render overhead of --minify",
+    )
+    _ = parser.add_argument("--baseline-file", default=DEFAULT_BASELINE)
+    _ = parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Allowed slowdown before compare fails (0.1 = 10%%)",
+    )
+    _ = parser.add_argument("--repeat", type=int, default=5)
+    _ = parser.add_argument(
+        "--only", action="append", metavar="NAME", help="Run only this benchmark"
+    )
+    args = parser.parse_args()
+    command = cast(str, args.command)
+    baseline_file = cast(str, args.baseline_file)
+
+    if command == "minify":
+        _ = minify_report(cast(int, args.repeat))
+        return
+    results = run(cast(list[str] | None, args.only), cast(int, args.repeat))
+    if command == "baseline":
+        with open(baseline_file, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {baseline_file}")
+    elif command == "compare":
+        with open(baseline_file, "r") as f:
+            baseline = cast(dict[str, float], json.load(f))
+        regressions = compare(baseline, results, cast(float, args.threshold))
+        if regressions:
+            print(
+                f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}"
+            )
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from typing import cast
+
+from htmlnode import HTMLNode, LeafNode, ParentNode, new_leaf, new_parent
+
+
+class DictNode:
+    """Dict-backed stand-in with the same attributes as HTMLNode, for comparison."""
+
+    def __init__(
+        self,
+        tag: str | None,
+        value: str | None,
+        children: list["DictNode"] | None,
+        props: dict[str, str] | None,
+    ) -> None:
+        self.tag: str | None = tag
+        self.value: str | None = value
+        self.children: list[DictNode] | None = children
+        self.props: dict[str, str] | None = props
+
+
+def build_dict_tree(count: int) -> DictNode:
+    children = [
+        DictNode("p", None, [DictNode(None, "text", None, None)], None)
+        for _ in range(count)
+    ]
+    return DictNode("div", None, children, None)
+
+
+def build_validated_tree(count: int) -> HTMLNode:
+    children: list[HTMLNode] = [
+        ParentNode("p", [LeafNode(None, "text")]) for _ in range(count)
+    ]
+    return ParentNode("div", children)
+
+
+def build_trusted_tree(count: int) -> HTMLNode:
+    children: list[HTMLNode] = [
+        new_parent("p", [new_leaf(None, "text")]) for _ in range(count)
+    ]
+    return new_parent("div", children)
+
+
+def measure_memory(build: Callable[[int], object], count: int) -> int:
+    """
+    Returns the number of bytes still allocated by a tree built by `build`.
+
+    Args:
+        build (Callable[[int], object]): Builds a tree of `count` paragraphs.
+        count (int): Number of paragraphs.
+
+    Returns:
+        int: Bytes allocated while the tree is alive.
+    """
+    tracemalloc.start()
+    tree = build(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return current
+
+
+def measure_throughput(
+    build: Callable[[int], object], count: int, repeat: int
+) -> float:
+    """
+    Returns the number of nodes built per second by `build`.
+
+    Args:
+        build (Callable[[int], object]): Builds a tree of `count` paragraphs.
+        count (int): Number of paragraphs.
+        repeat (int): Number of timed runs; the fastest one is used.
+
+    Returns:
+        float: Nodes per second.
+    """
+    best = min(timeit.repeat(lambda: build(count), number=1, repeat=repeat))
+    return (2 * count + 1) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTMLNode memory/throughput benchmark")
+    _ = parser.add_argument("--nodes", type=int, default=200_000)
+    _ = parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    count = cast(int, args.nodes) // 2
+    repeat = cast(int, args.repeat)
+
+    builders: list[tuple[str, Callable[[int], object]]] = [
+        ("dict-backed", build_dict_tree),
+        ("slots, validated", build_validated_tree),
+        ("slots, trusted", build_trusted_tree),
+    ]
+    print(f"{'variant':<18} {'bytes/node':>10} {'nodes/sec':>12}")
+    for name, build in builders:
+        memory = measure_memory(build, count) / (2 * count + 1)
+        throughput = measure_throughput(build, count, repeat)
+        print(f"{name:<18} {memory:>10.1f} {throughput:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
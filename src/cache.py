@@ -0,0 +1,303 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from typing import NamedTuple, cast
+
+from manifest import GENERATOR_VERSION, hash_bytes
+from utils import PARSER_VERSION
+from writer import OutputWriter
+
+PARSE_CACHE_DIR = os.path.join(".cache", "parse")
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+# Version of the render cache's directory layout and entry format. Entries live
+# at <root>/render-v<N>/<first two key characters>/<key>.html.
+RENDER_CACHE_LAYOUT = "1"
+
+
+def evict_lru(path: str, max_bytes: int, max_age: float | None = None) -> int:
+    """
+    Removes the least recently used files under path (by mtime) until the rest
+    fit in max_bytes, along with every file older than max_age.
+
+    Args:
+        path (str): Cache directory.
+        max_bytes (int): Total size to trim the files to.
+        max_age (float | None): Maximum age in seconds, if any.
+
+    Returns:
+        int: Number of files removed.
+    """
+    entries: list[tuple[int, int, str]] = []
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            file_path = os.path.join(root, file)
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, file_path))
+            total += stat.st_size
+    cutoff = time.time_ns() - int(max_age * 1e9) if max_age is not None else 0
+    removed = 0
+    entries.sort()
+    for mtime_ns, size, file_path in entries:
+        if total <= max_bytes and mtime_ns >= cutoff:
+            break
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+class ParsedPage(NamedTuple):
+    html: str
+    title: str
+
+
+class ParseCache:
+    def __init__(
+        self,
+        path: str = PARSE_CACHE_DIR,
+        max_bytes: int = DEFAULT_CACHE_SIZE,
+        memory_entries: int = 0,
+    ):
+        """
+        A content-addressed on-disk cache of parsed pages: the body HTML and
+        title of a markdown document, keyed by the document's hash and the
+        parser version. Entries are touched when read so that evict() can drop
+        the least recently used ones. Safe to share between worker processes.
+        Long-running processes can also keep recent entries in memory.
+
+        Args:
+            path (str): Cache directory.
+            max_bytes (int): Size the cache is trimmed to by evict().
+            memory_entries (int): Number of recently used entries kept in memory.
+        """
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.memory_entries: int = memory_entries
+        self.memory: OrderedDict[str, ParsedPage] = OrderedDict()
+
+    def __getstate__(self) -> dict[str, object]:
+        # Worker processes get the settings, not a copy of the in-memory entries.
+        return {**self.__dict__, "memory": OrderedDict()}
+
+    def remember(self, key: str, page: ParsedPage):
+        if self.memory_entries <= 0:
+            return
+        self.memory[key] = page
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            _ = self.memory.popitem(last=False)
+
+    def key(self, markdown: str, minify: bool = False, images: str = "") -> str:
+        variant = "\0minify" if minify else ""
+        if images:
+            # The sizes of the page's images (see ImageSizes.describe).
+            variant += f"\0images\0{images}"
+        return hash_bytes(f"{PARSER_VERSION}{variant}\0{markdown}".encode())
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> ParsedPage | None:
+        """
+        Looks up a parsed page and marks it as recently used.
+
+        Args:
+            key (str): Key returned by key().
+
+        Returns:
+            ParsedPage | None: The cached page, or None on a miss.
+        """
+        page = self.memory.get(key)
+        if page is not None:
+            self.memory.move_to_end(key)
+            return page
+        path = self.entry_path(key)
+        try:
+            with open(path, "r") as f:
+                html, title = cast(list[str], json.load(f))
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        page = ParsedPage(html, title)
+        self.remember(key, page)
+        return page
+
+    def put(self, key: str, page: ParsedPage):
+        """
+        Atomically stores a parsed page.
+
+        Args:
+            key (str): Key returned by key().
+            page (ParsedPage): The parsed page.
+        """
+        self.remember(key, page)
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(page), f)
+        os.replace(tmp_path, path)
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used entries until the cache fits in
+        max_bytes.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        return evict_lru(self.path, self.max_bytes)
+
+
+class RenderCache:
+    def __init__(self, root: str):
+        """
+        A content-addressed cache of finished pages, meant to be shared between
+        machines and CI runs (mounted or restored like a ccache directory).
+        Entries are keyed by the markdown hash, template hash, basepath and
+        generator version, are written to a unique temporary file and renamed
+        into place, and are never modified afterwards, so concurrent writers and
+        readers cannot see a partial entry. Hits touch the entry for pruning.
+
+        Args:
+            root (str): Cache directory.
+        """
+        self.root: str = root
+        self.hits: int = 0
+        self.misses: int = 0
+        self.stores: int = 0
+
+    def key(
+        self, source_hash: str, template_hash: str, basepath: str, minify: bool = False
+    ) -> str:
+        versions = f"{GENERATOR_VERSION}\0{PARSER_VERSION}"
+        if minify:
+            versions += "\0minify"
+        return hash_bytes(
+            f"{source_hash}\0{template_hash}\0{basepath}\0{versions}".encode()
+        )
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(
+            self.root, f"render-v{RENDER_CACHE_LAYOUT}", key[:2], f"{key}.html"
+        )
+
+    def restore(
+        self, key: str, dest_path: str, writer: OutputWriter | None = None
+    ) -> bool:
+        """
+        Copies a cached page to dest_path if there is one, leaving an identical
+        existing page untouched.
+
+        Args:
+            key (str): Key returned by key().
+            dest_path (str): Where the page is written.
+            writer (OutputWriter | None): Writes the page and counts it as
+                                          written or unchanged.
+
+        Returns:
+            bool: True on a hit.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        _ = (writer or OutputWriter(threads=0)).write_now(dest_path, data)
+        self.hits += 1
+        return True
+
+    def store(self, key: str, page_path: str):
+        """
+        Adds a generated page to the cache.
+
+        Args:
+            key (str): Key returned by key().
+            page_path (str): The generated page.
+        """
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            _ = shutil.copyfile(page_path, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.stores += 1
+
+    def report(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (
+            f"Render cache: {self.hits} hits, {self.misses} misses ({rate:.0%} hit "
+            + f"rate), {self.stores} stored"
+        )
+
+
+def cache_stats(root: str) -> tuple[int, int]:
+    """
+    Counts the files under a cache directory.
+
+    Args:
+        root (str): Cache directory.
+
+    Returns:
+        tuple[int, int]: Number of files and their total size in bytes.
+    """
+    count = size = 0
+    for dir_path, _, files in os.walk(root):
+        for file in files:
+            count += 1
+            size += os.path.getsize(os.path.join(dir_path, file))
+    return count, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build cache maintenance")
+    _ = parser.add_argument("command", choices=("stats", "prune"))
+    _ = parser.add_argument("root", help="Cache directory")
+    _ = parser.add_argument(
+        "--max-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        metavar="MB",
+        help="prune: size to trim the cache to, least recently used entries first",
+    )
+    _ = parser.add_argument(
+        "--max-age",
+        type=float,
+        metavar="DAYS",
+        help="prune: also remove entries not used for this many days",
+    )
+    args = parser.parse_args()
+    root = cast(str, args.root)
+    if args.command == "prune":
+        max_age = cast(float | None, args.max_age)
+        removed = evict_lru(
+            root,
+            cast(int, args.max_size) * 1024 * 1024,
+            max_age * 86400 if max_age is not None else None,
+        )
+        print(f"Removed {removed} entries from '{root}'.")
+    count, size = cache_stats(root)
+    print(f"'{root}': {count} entries, {size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import gzip
+import mimetypes
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from manifest import COMPRESS_MANIFEST_NAME, load_asset_manifest, save_asset_manifest
+from preview import is_compressible
+
+
+def _load_compressors() -> dict[str, Callable[[bytes], bytes]]:
+    """
+    Collects the available compressors, keyed by the sibling file suffix.
+    Gzip always works; brotli and zstd are used when their modules are
+    importable and skipped otherwise.
+
+    Returns:
+        dict[str, Callable[[bytes], bytes]]: Compress functions at maximum level.
+    """
+    compressors: dict[str, Callable[[bytes], bytes]] = {
+        # mtime=0 keeps the output identical for identical input.
+        ".gz": lambda data: gzip.compress(data, compresslevel=9, mtime=0),
+    }
+    try:
+        import brotli  # pyright: ignore[reportMissingImports]
+
+        compressors[".br"] = lambda data: brotli.compress(data, quality=11)  # pyright: ignore
+    except ImportError:
+        pass
+    try:
+        from compression import zstd  # pyright: ignore[reportMissingImports]
+
+        compressors[".zst"] = lambda data: zstd.compress(data, level=19)  # pyright: ignore
+    except ImportError:
+        try:
+            import zstandard  # pyright: ignore[reportMissingImports]
+
+            compressors[".zst"] = zstandard.ZstdCompressor(level=19).compress  # pyright: ignore
+        except ImportError:
+            pass
+    return compressors
+
+
+COMPRESSORS = _load_compressors()
+
+
+class CompressResult(NamedTuple):
+    compressed: int
+    unchanged: int
+    removed: int
+
+
+def should_compress(path: str) -> bool:
+    """
+    Checks whether a file is a text output worth precompressing.
+
+    Args:
+        path (str): Path or name of the file.
+
+    Returns:
+        bool: True for HTML, CSS, JavaScript, SVG, JSON and other text types,
+              False for files that are already compressed.
+    """
+    content_type, encoding = mimetypes.guess_type(path)
+    return (
+        encoding is None and content_type is not None and is_compressible(content_type)
+    )
+
+
+def compress_file(path: str, suffixes: list[str]) -> list[str]:
+    """
+    Writes a compressed sibling of a file for each suffix whose sibling is
+    missing or whose mtime differs from the file's. Siblings are written to a
+    temporary file, renamed into place and given the file's mtime, so a server
+    comparing mtimes sees them as up to date. Any other mtime counts as stale,
+    since a file replaced by one with an older mtime (a copy that kept its
+    source's times, say) is still newer than its sibling.
+
+    Args:
+        path (str): Path to the file.
+        suffixes (list[str]): Sibling suffixes, keys of COMPRESSORS.
+
+    Returns:
+        list[str]: The suffixes that were (re)written.
+    """
+    stat = os.stat(path)
+    stale: list[str] = []
+    for suffix in suffixes:
+        try:
+            if os.stat(f"{path}{suffix}").st_mtime_ns == stat.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        stale.append(suffix)
+    if not stale:
+        return []
+    with open(path, "rb") as f:
+        data = f.read()
+    for suffix in stale:
+        sibling = f"{path}{suffix}"
+        tmp_path = f"{sibling}.tmp"
+        with open(tmp_path, "wb") as f:
+            _ = f.write(COMPRESSORS[suffix](data))
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, sibling)
+    return stale
+
+
+def compress_tree(
+    root: str, workers: int = 1, suffixes: list[str] | None = None
+) -> CompressResult:
+    """
+    Precompresses every text output under root, in parallel, skipping files
+    whose siblings are up to date. The siblings written are recorded in a
+    manifest in root, and recorded siblings whose file is gone, or whose format
+    is no longer written, are removed; compressed files that this stage did not
+    write, such as a data.json.gz from the static directory, are left alone, as
+    are hidden files such as the build manifests.
+
+    Args:
+        root (str): The output directory.
+        workers (int): Number of compression threads.
+        suffixes (list[str] | None): Formats to write; all available if None.
+
+    Returns:
+        CompressResult: Counts of files compressed, already up to date and
+                        siblings removed.
+    """
+    formats = list(COMPRESSORS) if suffixes is None else suffixes
+    manifest_path = os.path.join(root, COMPRESS_MANIFEST_NAME)
+    previous = set(load_asset_manifest(manifest_path))
+    files: list[str] = []
+    removed = 0
+    for directory, _, names in os.walk(root):
+        present = set(names)
+        for name in names:
+            if name.startswith("."):
+                continue
+            path = os.path.join(directory, name)
+            if os.path.relpath(path, root) in previous:
+                stem, suffix = os.path.splitext(name)
+                if stem not in present or suffix not in formats:
+                    os.unlink(path)
+                    removed += 1
+                continue
+            if should_compress(name):
+                files.append(path)
+
+    compressed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for path, written in zip(
+            files, executor.map(lambda path: compress_file(path, formats), files)
+        ):
+            if written:
+                compressed += 1
+                print(f"Compressed {path} ({', '.join(written)})")
+    save_asset_manifest(
+        manifest_path,
+        [
+            os.path.relpath(f"{path}{suffix}", root)
+            for path in files
+            for suffix in formats
+        ],
+    )
+    return CompressResult(compressed, len(files) - compressed, removed)
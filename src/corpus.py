@@ -0,0 +1,278 @@
+import argparse
+import os
+import random
+import struct
+from typing import cast
+
+WORDS = (
+    "the",
+    "ring",
+    "was",
+    "forged",
+    "in",
+    "the",
+    "fires",
+    "of",
+    "mount",
+    "doom",
+    "by",
+    "sauron",
+    "who",
+    "sought",
+    "to",
+    "rule",
+    "all",
+    "free",
+    "peoples",
+    "of",
+    "middle",
+    "earth",
+    "elves",
+    "dwarves",
+    "and",
+    "men",
+    "fell",
+    "under",
+    "its",
+    "shadow",
+    "until",
+    "a",
+    "hobbit",
+    "of",
+    "the",
+    "shire",
+    "carried",
+    "it",
+    "east",
+    "across",
+    "the",
+    "misty",
+    "mountains",
+)
+
+BLOCK_KINDS = ("paragraph", "list", "code", "quote")
+DEFAULT_MIX = {"paragraph": 6, "list": 2, "code": 1, "quote": 1}
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+def parse_mix(spec: str) -> dict[str, int]:
+    """
+    Parses a block mix such as "paragraph=6,list=2,code=1,quote=1".
+
+    Args:
+        spec (str): Comma separated kind=weight pairs.
+
+    Returns:
+        dict[str, int]: Weight per block kind.
+    """
+    mix: dict[str, int] = {}
+    for pair in spec.split(","):
+        kind, _, weight = pair.partition("=")
+        if kind not in BLOCK_KINDS:
+            raise ValueError(f"Unknown block kind '{kind}'")
+        mix[kind] = int(weight)
+    return mix
+
+
+def inline_text(rng: random.Random, words: int, markup_density: float) -> str:
+    """
+    Generates a run of words, wrapping a fraction of them in inline markup.
+
+    Args:
+        rng (random.Random): Random source.
+        words (int): Number of words.
+        markup_density (float): Fraction of words carrying inline markup.
+
+    Returns:
+        str: The generated text.
+    """
+    out: list[str] = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        if rng.random() < markup_density:
+            match rng.randrange(6):
+                case 0:
+                    word = f"**{word}**"
+                case 1:
+                    word = f"_{word}_"
+                case 2:
+                    word = f"`{word}`"
+                case 3:
+                    word = f"~~{word}~~"
+                case 4:
+                    word = f"[{word}](/{rng.choice(WORDS)})"
+                case _:
+                    word = f"![{word}](/images/bench.png)"
+        out.append(word)
+    return " ".join(out)
+
+
+def generate_block(rng: random.Random, kind: str, markup_density: float) -> str:
+    """
+    Generates one markdown block of the given kind.
+
+    Args:
+        rng (random.Random): Random source.
+        kind (str): One of BLOCK_KINDS.
+        markup_density (float): Fraction of words carrying inline markup.
+
+    Returns:
+        str: The markdown block.
+    """
+    match kind:
+        case "list":
+            marker = rng.choice(("-", "*", "1."))
+            return "\n".join(
+                f"{marker} {inline_text(rng, rng.randint(3, 12), markup_density)}"
+                for _ in range(rng.randint(3, 6))
+            )
+        case "code":
+            lines = [
+                f"    {' '.join(rng.choices(WORDS, k=rng.randint(2, 6)))}"
+                for _ in range(rng.randint(2, 8))
+            ]
+            return "```\n" + "\n".join(lines) + "\n```"
+        case "quote":
+            return f"> {inline_text(rng, rng.randint(8, 30), markup_density)}"
+        case _:
+            lines = [
+                inline_text(rng, rng.randint(8, 16), markup_density)
+                for _ in range(rng.randint(1, 5))
+            ]
+            return "\n".join(lines)
+
+
+def generate_page_markdown(
+    rng: random.Random,
+    index: int,
+    page_size: int,
+    markup_density: float,
+    mix: dict[str, int],
+) -> str:
+    """
+    Generates the markdown of one page of roughly page_size bytes.
+
+    Args:
+        rng (random.Random): Random source.
+        index (int): Page number, used in the title.
+        page_size (int): Approximate page size in bytes.
+        markup_density (float): Fraction of words carrying inline markup.
+        mix (dict[str, int]): Weight per block kind.
+
+    Returns:
+        str: The page's markdown.
+    """
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    blocks = [f"# Page {index}"]
+    size = len(blocks[0])
+    while size < page_size:
+        (kind,) = rng.choices(kinds, weights)
+        block = generate_block(rng, kind, markup_density)
+        blocks.append(block)
+        size += len(block) + 2
+    return "\n\n".join(blocks) + "\n"
+
+
+def page_path(index: int, depth: int) -> str:
+    """
+    Returns the relative path of a page, nested `depth` directories deep with
+    ten subdirectories per level.
+
+    Args:
+        index (int): Page number.
+        depth (int): Directory depth.
+
+    Returns:
+        str: Relative path of the page's markdown file.
+    """
+    parts = [f"d{(index // 10 ** (level + 1)) % 10}" for level in range(depth)]
+    return os.path.join(*parts, f"page{index}.md")
+
+
+def generate_corpus(
+    root: str,
+    pages: int,
+    page_size: int = 4096,
+    markup_density: float = 0.1,
+    mix: dict[str, int] | None = None,
+    depth: int = 2,
+    seed: int = 0,
+) -> int:
+    """
+    Writes a synthetic site (content/, static/ and template.html) under root.
+
+    Args:
+        root (str): Directory to write the site into.
+        pages (int): Number of pages.
+        page_size (int): Approximate page size in bytes.
+        markup_density (float): Fraction of words carrying inline markup.
+        mix (dict[str, int] | None): Weight per block kind.
+        depth (int): Directory depth of the content tree.
+        seed (int): Random seed, so that a corpus can be regenerated exactly.
+
+    Returns:
+        int: Total size of the generated markdown in bytes.
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    total = 0
+    for index in range(pages):
+        path = os.path.join(root, "content", page_path(index, depth))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        markdown = generate_page_markdown(rng, index, page_size, markup_density, mix)
+        with open(path, "w") as f:
+            _ = f.write(markdown)
+        total += len(markdown.encode())
+
+    os.makedirs(os.path.join(root, "static", "images"), exist_ok=True)
+    with open(os.path.join(root, "static", "index.css"), "w") as f:
+        _ = f.write("body { font-family: serif; }\n")
+    with open(os.path.join(root, "static", "images", "bench.png"), "wb") as f:
+        # A real 640x480 header, so image sizing has something to read.
+        _ = f.write(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR")
+        _ = f.write(struct.pack(">II", 640, 480))
+        _ = f.write(bytes(rng.randrange(256) for _ in range(4072)))
+    with open(os.path.join(root, "template.html"), "w") as f:
+        _ = f.write(TEMPLATE)
+    os.makedirs(os.path.join(root, "docs"), exist_ok=True)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic content generator")
+    _ = parser.add_argument("root", help="Directory to write the site into")
+    _ = parser.add_argument("--pages", type=int, default=1000)
+    _ = parser.add_argument("--page-size", type=int, default=4096)
+    _ = parser.add_argument("--markup-density", type=float, default=0.1)
+    _ = parser.add_argument("--mix", default="paragraph=6,list=2,code=1,quote=1")
+    _ = parser.add_argument("--depth", type=int, default=2)
+    _ = parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    total = generate_corpus(
+        cast(str, args.root),
+        cast(int, args.pages),
+        cast(int, args.page_size),
+        cast(float, args.markup_density),
+        parse_mix(cast(str, args.mix)),
+        cast(int, args.depth),
+        cast(int, args.seed),
+    )
+    print(f"Generated {args.pages} pages ({total} bytes) in '{args.root}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import os
+from typing import cast
+from urllib.parse import unquote, urlsplit
+
+from manifest import PageRecord, hash_file, hash_file_cached, load_manifest
+from utils import extract_markdown_images, extract_markdown_links
+
+
+def static_path(url: str) -> str | None:
+    """
+    Maps a site-absolute URL to the path it is served from, relative to the
+    static directory.
+
+    Args:
+        url (str): The URL of a link or image.
+
+    Returns:
+        str | None: The decoded, normalized path, or None for external,
+                    relative or escaping URLs.
+    """
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path.startswith("/"):
+        return None
+    path = os.path.normpath(unquote(parts.path).lstrip("/"))
+    if path.startswith("..") or path == ".":
+        return None
+    return path
+
+
+def find_references(markdown: str, static_dir: str) -> list[str]:
+    """
+    Finds the static files a page links to or embeds as images.
+
+    Args:
+        markdown (str): The page's markdown.
+        static_dir (str): The static directory that site-absolute URLs map to.
+
+    Returns:
+        list[str]: Sorted paths of the referenced files, relative to static_dir.
+    """
+    references: set[str] = set()
+    targets = extract_markdown_images(markdown) + extract_markdown_links(markdown)
+    for _, url in targets:
+        path = static_path(url)
+        if path is not None and os.path.isfile(os.path.join(static_dir, path)):
+            references.add(path)
+    return sorted(references)
+
+
+class Fingerprints:
+    def __init__(
+        self,
+        static_dir: str | None = None,
+        files: dict[str, list[int | str]] | None = None,
+    ) -> None:
+        """
+        Content hashes of dependency files, each file hashed at most once per
+        build however many pages depend on it. Missing files hash to "".
+
+        Args:
+            static_dir (str | None): The static directory that files keys are
+                                     relative to.
+            files (dict[str, list[int | str]] | None): [size, mtime_ns, digest]
+                                                       entries of static files
+                                                       (see ImageSizes.files);
+                                                       static files whose size
+                                                       and mtime match are not
+                                                       read again.
+        """
+        self.static_dir: str | None = static_dir
+        self.files: dict[str, list[int | str]] | None = files
+        self.hashes: dict[str, str] = {}
+
+    def get(self, path: str) -> str:
+        if path not in self.hashes:
+            try:
+                self.hashes[path] = self.hash(path)
+            except FileNotFoundError:
+                self.hashes[path] = ""
+        return self.hashes[path]
+
+    def hash(self, path: str) -> str:
+        if self.static_dir is not None and self.files is not None:
+            relative_path = os.path.relpath(path, self.static_dir)
+            if not relative_path.startswith(".."):
+                return hash_file_cached(path, relative_path, self.files)
+        return hash_file(path)
+
+    def record(self, paths: list[str]) -> dict[str, str]:
+        return {path: self.get(path) for path in paths}
+
+
+def changed_dependencies(
+    recorded: dict[str, str], required: list[str], fingerprints: Fingerprints
+) -> list[str]:
+    """
+    Lists the dependencies that invalidate a page's output: required files the
+    record does not cover, and recorded files whose contents changed.
+
+    Args:
+        recorded (dict[str, str]): The page's recorded dependency fingerprints.
+        required (list[str]): Files every page currently depends on.
+        fingerprints (Fingerprints): The build's current fingerprints.
+
+    Returns:
+        list[str]: The changed dependencies; empty if the output is up to date.
+    """
+    changed = [path for path in required if path not in recorded]
+    for path, fingerprint in recorded.items():
+        if fingerprints.get(path) != fingerprint:
+            changed.append(path)
+    return changed
+
+
+class DependencyGraph:
+    def __init__(self, pages: dict[str, PageRecord]):
+        """
+        The build's dependency graph, read back from the manifest's page
+        records: which pages' outputs depend on each input file, and which pages
+        reference each static asset without depending on its contents.
+
+        Args:
+            pages (dict[str, PageRecord]): Page records keyed by source path.
+        """
+        self.dependents: dict[str, set[str]] = {}
+        self.referrers: dict[str, set[str]] = {}
+        for page, record in pages.items():
+            for path in record["dependencies"]:
+                self.dependents.setdefault(path, set()).add(page)
+            for path in record["references"]:
+                self.referrers.setdefault(path, set()).add(page)
+
+    def affected(self, path: str) -> list[str]:
+        """
+        Returns the pages whose outputs must be rebuilt when path changes.
+
+        Args:
+            path (str): An input file, as recorded in the manifest.
+
+        Returns:
+            list[str]: Sorted page source paths.
+        """
+        return sorted(self.dependents.get(path, ()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the build dependency graph")
+    _ = parser.add_argument("manifest", help="Build manifest, e.g. docs/.manifest.json")
+    _ = parser.add_argument("path", help="Input file or static asset path")
+    args = parser.parse_args()
+    graph = DependencyGraph(load_manifest(cast(str, args.manifest)))
+    path = cast(str, args.path)
+    print(f"Pages rebuilt when '{path}' changes:")
+    for page in graph.affected(path):
+        print(f"  {page}")
+    print(f"Pages referencing '{path}':")
+    for page in sorted(graph.referrers.get(path, ())):
+        print(f"  {page}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+import argparse
+import functools
+import os
+import queue
+import threading
+from collections import OrderedDict
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple, cast
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from images import ImageSizes, annotate_images
+from manifest import hash_bytes
+from page import extract_title
+from template import Template, apply_basepath
+from utils import markdown_to_html_node
+
+LIVE_RELOAD_PATH = "/__livereload"
+# Injected into every page: swaps in the new <article> body on "content" events.
+LIVE_RELOAD_SCRIPT = b"""<script>
+(() => {
+  const events = new EventSource(
+    "/__livereload?path=" + encodeURIComponent(location.pathname)
+  );
+  events.addEventListener("content", (event) => {
+    const article = document.querySelector("article");
+    if (article) article.innerHTML = event.data;
+    else location.reload();
+  });
+  events.addEventListener("reload", () => location.reload());
+})();
+</script>
+"""
+
+
+def resolve_page(content_dir: str, url_path: str) -> str | None:
+    """
+    Maps a request path to the markdown file the page is generated from, the
+    same way the build maps content/ to docs/: "/blog/tom/" (or "/blog/tom") is
+    content/blog/tom/index.md and "/x.html" is content/x.md.
+
+    Args:
+        content_dir (str): Directory containing markdown files.
+        url_path (str): The request path.
+
+    Returns:
+        str | None: The markdown file, or None if no page matches.
+    """
+    parts = [part for part in unquote(urlsplit(url_path).path).split("/") if part]
+    if any(part in (".", "..") or os.sep in part for part in parts):
+        return None
+    if parts and parts[-1].endswith(".html"):
+        source = os.path.join(content_dir, *parts[:-1], parts[-1][:-5] + ".md")
+    else:
+        source = os.path.join(content_dir, *parts, "index.md")
+    return source if os.path.isfile(source) else None
+
+
+class CachedPage(NamedTuple):
+    stat: tuple[int, int]
+    source_hash: str
+    body: bytes
+    content: str
+
+
+class PageRenderer:
+    def __init__(
+        self,
+        content_dir: str,
+        template_path: str,
+        basepath: str = "/",
+        max_entries: int = 256,
+        images: ImageSizes | None = None,
+    ):
+        """
+        Renders pages on request and keeps the most recently used ones.
+        A cached page is reused while its source's size and mtime are unchanged;
+        when they change, the source is re-hashed and only re-rendered if its
+        contents changed. Editing the template drops every cached page.
+        Thread-safe.
+
+        Args:
+            content_dir (str): Directory containing markdown files.
+            template_path (str): Path to the HTML template file.
+            basepath (str): Base path for the site.
+            max_entries (int): Number of rendered pages kept.
+            images (ImageSizes | None): If given, img tags get the size of their
+                                        static image when the page is rendered,
+                                        as in a build.
+        """
+        self.content_dir: str = content_dir
+        self.template_path: str = template_path
+        self.basepath: str = basepath
+        self.max_entries: int = max_entries
+        self.images: ImageSizes | None = images
+        self.pages: OrderedDict[str, CachedPage] = OrderedDict()
+        self.template: Template | None = None
+        self.template_stat: tuple[int, int] = (0, 0)
+        self.lock: threading.Lock = threading.Lock()
+
+    def current_template(self) -> Template:
+        """
+        Returns the compiled template, recompiling it if the file changed.
+        Must be called with the lock held.
+
+        Returns:
+            Template: The compiled template.
+        """
+        stat = os.stat(self.template_path)
+        template_stat = (stat.st_size, stat.st_mtime_ns)
+        if self.template is None or template_stat != self.template_stat:
+            self.template = Template.from_file(self.template_path, self.basepath)
+            self.template_stat = template_stat
+            self.pages.clear()
+        return self.template
+
+    def render(self, source: str) -> bytes:
+        """
+        Returns the finished page generated from a markdown file.
+
+        Args:
+            source (str): Path to the markdown file.
+
+        Returns:
+            bytes: The UTF-8 encoded page.
+        """
+        return self.render_page(source).body
+
+    def render_page(self, source: str) -> CachedPage:
+        """
+        Returns the cache entry of a page, rendering it if needed.
+
+        Args:
+            source (str): Path to the markdown file.
+
+        Returns:
+            CachedPage: The page, its source hash and its content slot.
+        """
+        stat = os.stat(source)
+        source_stat = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            template = self.current_template()
+            cached = self.pages.get(source)
+            if cached is not None and cached.stat == source_stat:
+                self.pages.move_to_end(source)
+                return cached
+
+        with open(source, "rb") as f:
+            data = f.read()
+        source_hash = hash_bytes(data)
+        if cached is not None and cached.source_hash == source_hash:
+            page = cached._replace(stat=source_stat)
+        else:
+            markdown = data.decode()
+            node = markdown_to_html_node(markdown)
+            if self.images is not None:
+                annotate_images(node, self.images)
+            html = node.to_html()
+            body = template.render(html, extract_title(markdown)).encode()
+            content = apply_basepath(html, template.basepath)
+            page = CachedPage(source_stat, source_hash, body, content)
+
+        with self.lock:
+            self.pages[source] = page
+            self.pages.move_to_end(source)
+            while len(self.pages) > self.max_entries:
+                _ = self.pages.popitem(last=False)
+        return page
+
+
+def format_event(event: str, data: str) -> bytes:
+    """
+    Encodes a Server-Sent Event.
+
+    Args:
+        event (str): The event name.
+        data (str): The payload; may span several lines.
+
+    Returns:
+        bytes: The encoded event.
+    """
+    lines = "".join(f"data: {line}\n" for line in data.split("\n"))
+    return f"event: {event}\n{lines}\n".encode()
+
+
+class LiveReload:
+    def __init__(self, renderer: PageRenderer, interval: float = 0.02):
+        """
+        Pushes re-rendered pages to the browsers viewing them.
+        Only the sources of pages that somebody is viewing, plus the template,
+        are polled, so the interval can be short on any size of site. When a
+        viewed page's markdown changes, its subscribers get a "content" event
+        carrying the new {{ Content }} slot; touching a file without changing
+        it sends nothing. A template change sends every subscriber "reload".
+
+        Args:
+            renderer (PageRenderer): Renders the changed pages.
+            interval (float): Seconds between polls.
+        """
+        self.renderer: PageRenderer = renderer
+        self.interval: float = interval
+        self.subscribers: dict[str, set[queue.Queue[tuple[str, str] | None]]] = {}
+        self.seen: dict[str, tuple[tuple[int, int], str]] = {}
+        self.template_stat: tuple[int, int] | None = None
+        self.lock: threading.Lock = threading.Lock()
+        self.stopped: threading.Event = threading.Event()
+
+    def subscribe(self, source: str) -> queue.Queue[tuple[str, str] | None]:
+        page = self.renderer.render_page(source)
+        events: queue.Queue[tuple[str, str] | None] = queue.Queue()
+        with self.lock:
+            self.subscribers.setdefault(source, set()).add(events)
+            _ = self.seen.setdefault(source, (page.stat, page.source_hash))
+        return events
+
+    def unsubscribe(self, source: str, events: queue.Queue[tuple[str, str] | None]):
+        with self.lock:
+            subscribers = self.subscribers.get(source, set())
+            subscribers.discard(events)
+            if not subscribers:
+                _ = self.subscribers.pop(source, None)
+                _ = self.seen.pop(source, None)
+
+    def publish(self, sources: list[str], event: str, data: str):
+        with self.lock:
+            for source in sources:
+                for events in self.subscribers.get(source, ()):
+                    events.put((event, data))
+
+    def check(self):
+        """
+        Polls the template and the viewed pages once and notifies subscribers.
+        A page that fails to render is not retried until its source changes
+        again, and a missing template (mid-save, say) skips the poll.
+        """
+        try:
+            stat = os.stat(self.renderer.template_path)
+        except OSError:
+            return
+        template_stat = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            sources = list(self.subscribers)
+        if self.template_stat is not None and template_stat != self.template_stat:
+            self.template_stat = template_stat
+            self.publish(sources, "reload", "")
+            return
+        self.template_stat = template_stat
+
+        for source in sources:
+            try:
+                stat = os.stat(source)
+            except FileNotFoundError:
+                continue
+            with self.lock:
+                seen = self.seen.get(source)
+            source_stat = (stat.st_size, stat.st_mtime_ns)
+            if seen is None or seen[0] == source_stat:
+                continue
+            try:
+                page = self.renderer.render_page(source)
+            except Exception as e:
+                print(f"Failed to render {source}. Reason: {e}")
+                with self.lock:
+                    if source in self.seen:
+                        self.seen[source] = (source_stat, seen[1])
+                continue
+            with self.lock:
+                if source in self.seen:
+                    self.seen[source] = (page.stat, page.source_hash)
+            if page.source_hash != seen[1]:
+                self.publish([source], "content", page.content)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.check()
+            # An unexpected error must not end live reload for the session.
+            except Exception as e:  # noqa: BLE001
+                print(f"Live reload check failed. Reason: {e}")
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self):
+        """
+        Stops polling and wakes every event stream with a None event, which
+        ends it.
+        """
+        self.stopped.set()
+        with self.lock:
+            for subscribers in self.subscribers.values():
+                for events in subscribers:
+                    events.put(None)
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    def __init__(
+        self,
+        *args: object,
+        renderer: PageRenderer,
+        live_reload: LiveReload | None = None,
+        **kwargs: object,
+    ):
+        self.renderer: PageRenderer = renderer
+        self.live_reload: LiveReload | None = live_reload
+        super().__init__(*args, **kwargs)  # pyright: ignore[reportArgumentType]
+
+    def do_GET(self):
+        if urlsplit(self.path).path == LIVE_RELOAD_PATH:
+            self.stream_events()
+        elif not self.send_page(head_only=False):
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self.send_page(head_only=True):
+            super().do_HEAD()
+
+    def send_page(self, head_only: bool) -> bool:
+        """
+        Answers the request with a rendered page if the path maps to one.
+
+        Args:
+            head_only (bool): Send the headers without the body.
+
+        Returns:
+            bool: False if no page matches and the static files should be tried.
+        """
+        parts = urlsplit(self.path)
+        source = resolve_page(self.renderer.content_dir, parts.path)
+        if source is None:
+            return False
+        if not parts.path.endswith(("/", ".html")):
+            self.send_response(301)
+            location = parts.path + "/" + (f"?{parts.query}" if parts.query else "")
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return True
+        try:
+            body = self.renderer.render(source)
+        except Exception as e:
+            self.send_error(500, f"Failed to render {source}", str(e))
+            return True
+        if self.live_reload is not None:
+            head, found, tail = body.rpartition(b"</body>")
+            body = (
+                head + LIVE_RELOAD_SCRIPT + found + tail
+                if found
+                else body + LIVE_RELOAD_SCRIPT
+            )
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head_only:
+            _ = self.wfile.write(body)
+        return True
+
+    def stream_events(self):
+        """
+        Serves the Server-Sent Events stream of the page named by the "path"
+        query parameter until the browser goes away.
+        """
+        query = parse_qs(urlsplit(self.path).query)
+        source = resolve_page(self.renderer.content_dir, query.get("path", ["/"])[0])
+        if self.live_reload is None or source is None:
+            self.send_error(404)
+            return
+        events = self.live_reload.subscribe(source)
+        self.close_connection = True
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            _ = self.wfile.write(b"retry: 500\n\n")
+            while not self.live_reload.stopped.is_set():
+                try:
+                    item = events.get(timeout=15)
+                except queue.Empty:
+                    _ = self.wfile.write(b": ping\n\n")
+                    continue
+                if item is None:
+                    break
+                _ = self.wfile.write(format_event(*item))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.live_reload.unsubscribe(source, events)
+
+
+def make_server(
+    renderer: PageRenderer,
+    static_dir: str,
+    bind: str = "127.0.0.1",
+    port: int = 8888,
+    live_reload: LiveReload | None = None,
+) -> ThreadingHTTPServer:
+    """
+    Creates a development server that renders pages on request and serves
+    static files straight from static_dir.
+
+    Args:
+        renderer (PageRenderer): Renders and caches the pages.
+        static_dir (str): Directory of static files.
+        bind (str): Address to listen on.
+        port (int): Port to listen on; 0 picks a free one.
+        live_reload (LiveReload | None): If given, pages get a script that
+                                         listens for its events.
+
+    Returns:
+        ThreadingHTTPServer: The server, not yet serving.
+    """
+    handler = functools.partial(
+        DevRequestHandler,
+        renderer=renderer,
+        live_reload=live_reload,
+        directory=static_dir,
+    )
+    return ThreadingHTTPServer((bind, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Development server")
+    _ = parser.add_argument("--bind", default="127.0.0.1")
+    _ = parser.add_argument("--port", type=int, default=8888)
+    _ = parser.add_argument("--content", default="content")
+    _ = parser.add_argument("--static", default="static")
+    _ = parser.add_argument("--template", default="template.html")
+    _ = parser.add_argument(
+        "--cache-entries", type=int, default=256, help="Rendered pages kept in memory"
+    )
+    _ = parser.add_argument(
+        "--no-image-sizes",
+        action="store_true",
+        help="Do not add width, height and lazy loading to images from their headers",
+    )
+    _ = parser.add_argument(
+        "--no-live-reload",
+        action="store_true",
+        help="Do not push edited pages to the browsers viewing them",
+    )
+    args = parser.parse_args()
+    renderer = PageRenderer(
+        cast(str, args.content),
+        cast(str, args.template),
+        max_entries=cast(int, args.cache_entries),
+        images=None
+        if cast(bool, args.no_image_sizes)
+        else ImageSizes(cast(str, args.static)),
+    )
+    live_reload = None
+    if not cast(bool, args.no_live_reload):
+        live_reload = LiveReload(renderer)
+        live_reload.start()
+    server = make_server(
+        renderer,
+        cast(str, args.static),
+        cast(str, args.bind),
+        cast(int, args.port),
+        live_reload,
+    )
+    host, port = server.server_address[:2]
+    print(f"Serving {args.content} and {args.static} on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped.")
+    finally:
+        if live_reload is not None:
+            live_reload.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
+import re
+from collections.abc import Callable, Iterator, Sequence
 from typing import cast, override
 
+VOID_TAGS = frozenset({"img", "br", "hr", "input", "meta", "link"})
+# Elements whose whitespace is significant; minified output keeps them verbatim.
+PRESERVED_TAGS = frozenset({"pre", "code", "textarea", "script", "style"})
+WHITESPACE_RUN = re.compile(r"[ \t\n\r\f]+")
+
 
 class HTMLNode:
+    __slots__ = ("children", "props", "tag", "value")
+
     def __init__(
         self,
         tag: str | None = None,
@@ -37,6 +45,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str | None,
@@ -53,10 +63,9 @@ class LeafNode(HTMLNode):
             return self.value
         props_str = self.props_to_html()
         return_html = f"<{self.tag}"
-        unclosed_tags = {"img", "br", "hr", "input", "meta", "link"}
         if props_str:
             return_html += f" {props_str}"
-        if self.tag in unclosed_tags:
+        if self.tag in VOID_TAGS:
             return_html += "/>"
         else:
             if self.value:
@@ -70,6 +79,8 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
@@ -81,16 +92,155 @@ class ParentNode(HTMLNode):
 
     @override
     def to_html(self) -> str:
-        if self.tag is None:
-            raise ValueError("ParentNode must have a tag")
-        if self.children is None:
-            raise ValueError("ParentNode must have children")
-        props_str = self.props_to_html()
-        children_html = "".join(child.to_html() for child in self.children or [])
-        if props_str:
-            return f"<{self.tag} {props_str}>{children_html}</{self.tag}>"
-        return f"<{self.tag}>{children_html}</{self.tag}>"
+        return "".join(iter_html(self))
 
     @override
     def __repr__(self) -> str:
         return f"ParentNode({self.tag}, {self.children}, {self.props})"
+
+
+def new_leaf(
+    tag: str | None, value: str, props: dict[str, str] | None = None
+) -> LeafNode:
+    """
+    Creates a LeafNode without going through the constructor chain. Meant for
+    nodes built by the parser, whose arguments are already known to be valid.
+
+    Args:
+        tag (str | None): The tag name, or None for raw text.
+        value (str): The text content.
+        props (dict[str, str] | None): The attributes; None when there are none.
+
+    Returns:
+        LeafNode: The new node.
+    """
+    node = object.__new__(LeafNode)
+    node.tag = tag
+    node.value = value
+    node.children = None
+    node.props = props
+    return node
+
+
+def new_parent(
+    tag: str, children: list[HTMLNode], props: dict[str, str] | None = None
+) -> ParentNode:
+    """
+    Creates a ParentNode without validating its children. Meant for trees built
+    by the parser, whose children are always HTMLNode instances.
+
+    Args:
+        tag (str): The tag name.
+        children (list[HTMLNode]): The child nodes.
+        props (dict[str, str] | None): The attributes; None when there are none.
+
+    Returns:
+        ParentNode: The new node.
+    """
+    node = object.__new__(ParentNode)
+    node.tag = tag
+    node.value = None
+    node.children = children
+    node.props = props
+    return node
+
+
+def collapse_whitespace(text: str) -> str:
+    """
+    Collapses each run of HTML whitespace in text to a single space, which
+    renders the same outside preformatted elements. Non-breaking spaces are kept.
+
+    Args:
+        text (str): Text content of a node.
+
+    Returns:
+        str: The collapsed text.
+    """
+    if "  " in text or "\n" in text or "\t" in text or "\r" in text or "\f" in text:
+        return WHITESPACE_RUN.sub(" ", text)
+    return text
+
+
+def minified_leaf_html(node: HTMLNode) -> str:
+    """
+    Serializes a LeafNode with minimal whitespace: text runs are collapsed and
+    void elements lose their self-closing slash. Preserved elements such as
+    code spans are serialized unchanged.
+
+    Args:
+        node (HTMLNode): The leaf to serialize.
+
+    Returns:
+        str: The leaf's HTML.
+    """
+    if node.value is None:
+        raise ValueError("LeafNode must have a value")
+    tag = node.tag
+    if tag is None:
+        return collapse_whitespace(node.value)
+    if tag in PRESERVED_TAGS:
+        return node.to_html()
+    props_str = node.props_to_html()
+    start = f"<{tag} {props_str}>" if props_str else f"<{tag}>"
+    if tag in VOID_TAGS:
+        return start
+    return f"{start}{collapse_whitespace(node.value)}</{tag}>"
+
+
+def iter_html(node: HTMLNode, minify: bool = False) -> Iterator[str]:
+    """
+    Serializes an HTMLNode tree into a stream of HTML chunks.
+    The tree is walked with an explicit stack, so nesting depth is not limited
+    by the recursion limit and no subtree is ever joined into a string.
+
+    Args:
+        node (HTMLNode): The root of the tree.
+        minify (bool): Emit minimal whitespace (see minified_leaf_html), except
+                       inside preserved elements such as pre, whose subtrees
+                       are serialized unchanged.
+
+    Yields:
+        str: Consecutive chunks of the HTML document.
+    """
+    stack: list[HTMLNode | str] = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            yield item
+        elif isinstance(item, ParentNode):
+            if item.tag is None:
+                raise ValueError("ParentNode must have a tag")
+            if item.children is None:
+                raise ValueError("ParentNode must have children")
+            if minify and item.tag in PRESERVED_TAGS:
+                yield from iter_html(item)
+                continue
+            props_str = item.props_to_html()
+            if props_str:
+                yield f"<{item.tag} {props_str}>"
+            else:
+                yield f"<{item.tag}>"
+            stack.append(f"</{item.tag}>")
+            stack.extend(reversed(item.children))
+        elif minify:
+            # Plain text is by far the most common leaf.
+            if item.tag is None and item.value is not None:
+                yield collapse_whitespace(item.value)
+            else:
+                yield minified_leaf_html(item)
+        else:
+            yield item.to_html()
+
+
+def write_html(node: HTMLNode, write: Callable[[str], object], minify: bool = False):
+    """
+    Serializes an HTMLNode tree chunk by chunk into a sink, such as the write
+    method of a file or io.StringIO.
+
+    Args:
+        node (HTMLNode): The root of the tree.
+        write (Callable[[str], object]): Called with each chunk of HTML in order.
+        minify (bool): Emit minimal whitespace (see iter_html).
+    """
+    for chunk in iter_html(node, minify):
+        _ = write(chunk)
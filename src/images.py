@@ -0,0 +1,224 @@
+import json
+import os
+import struct
+from typing import BinaryIO, cast
+
+from deps import static_path
+from htmlnode import HTMLNode, ParentNode
+from manifest import hash_file_cached
+from utils import extract_markdown_images
+
+# JPEG start-of-frame markers, which carry the image size.
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# JPEG markers without a length field.
+JPEG_STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD8)})
+
+
+def _jpeg_size(f: BinaryIO) -> tuple[int, int] | None:
+    """
+    Walks a JPEG's segment headers, seeking past their payloads, up to the first
+    start-of-frame segment.
+
+    Args:
+        f (BinaryIO): The file, positioned after the start-of-image marker.
+
+    Returns:
+        tuple[int, int] | None: Width and height, or None if there is no frame.
+    """
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker or marker[0] in (0xD9, 0xDA):
+            return None
+        if marker[0] in JPEG_STANDALONE_MARKERS:
+            continue
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        (length,) = struct.unpack(">H", header)
+        if marker[0] in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        _ = f.seek(length - 2, os.SEEK_CUR)
+
+
+def _webp_size(head: bytes) -> tuple[int, int] | None:
+    """
+    Reads a WebP's size from the header of its first chunk.
+
+    Args:
+        head (bytes): The first 30 or more bytes of the file.
+
+    Returns:
+        tuple[int, int] | None: Width and height, or None for an unknown chunk.
+    """
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and head[20] == 0x2F:
+        (bits,) = struct.unpack("<I", head[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def read_image_size(path: str) -> tuple[int, int] | None:
+    """
+    Reads the intrinsic size of a PNG, GIF, WebP or JPEG image from its header,
+    without reading the rest of the file.
+
+    Args:
+        path (str): Path to the image.
+
+    Returns:
+        tuple[int, int] | None: Width and height in pixels, or None if the file
+                                is not a recognized image.
+    """
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return cast(tuple[int, int], struct.unpack(">II", head[16:24]))
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return cast(tuple[int, int], struct.unpack("<HH", head[6:10]))
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+            return _webp_size(head)
+        if head[:2] == b"\xff\xd8":
+            _ = f.seek(2)
+            return _jpeg_size(f)
+    return None
+
+
+def image_cache_path(cache_dir: str) -> str:
+    """
+    Places the image size cache beside a parse cache directory rather than in
+    it, where trimming the parse cache would evict it.
+
+    Args:
+        cache_dir (str): The parse cache directory.
+
+    Returns:
+        str: Path of the image size cache file.
+    """
+    return f"{os.path.normpath(cache_dir)}.images.json"
+
+
+class ImageSizes:
+    def __init__(self, static_dir: str, cache_path: str | None = None) -> None:
+        """
+        Sizes of the images in the static directory, cached by content hash.
+        A file is hashed again only when its size or mtime changed; with a
+        cache path, both the hashes and the sizes are kept between builds.
+
+        Args:
+            static_dir (str): The static directory that image URLs map to.
+            cache_path (str | None): JSON file the cache is loaded from and
+                                     saved to.
+        """
+        self.static_dir: str = static_dir
+        self.cache_path: str | None = cache_path
+        # Relative path -> [size, mtime_ns, hash], also used to fingerprint
+        # the static files (see assets.fingerprint_assets).
+        self.files: dict[str, list[int | str]] = {}
+        # Hash -> [width, height], or None for unreadable files.
+        self.sizes: dict[str, list[int] | None] = {}
+        if cache_path is not None:
+            try:
+                with open(cache_path, "r") as f:
+                    data = cast(dict[str, dict[str, object]], json.load(f))
+                self.files = cast(dict[str, list[int | str]], data["files"])
+                self.sizes = cast(dict[str, list[int] | None], data["sizes"])
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def get(self, url: str) -> tuple[int, int] | None:
+        """
+        Looks up the size of the static image a URL points to.
+
+        Args:
+            url (str): The image's src.
+
+        Returns:
+            tuple[int, int] | None: Width and height, or None if the URL is not a
+                                    readable image in the static directory.
+        """
+        path = static_path(url)
+        if path is None:
+            return None
+        full_path = os.path.join(self.static_dir, path)
+        try:
+            digest = hash_file_cached(full_path, path, self.files)
+        except OSError:
+            return None
+        if digest not in self.sizes:
+            size = read_image_size(full_path)
+            self.sizes[digest] = list(size) if size is not None else None
+        size = self.sizes[digest]
+        return (size[0], size[1]) if size is not None else None
+
+    def describe(self, markdown: str) -> str:
+        """
+        Summarizes the sizes of the images a page embeds, for cache keys of
+        output that includes them.
+
+        Args:
+            markdown (str): The page's markdown.
+
+        Returns:
+            str: The image URLs with their sizes.
+        """
+        return "\0".join(
+            f"{url}={self.get(url)}" for _, url in extract_markdown_images(markdown)
+        )
+
+    def save(self):
+        """
+        Atomically writes the cache file, if there is one.
+        """
+        if self.cache_path is None:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"files": self.files, "sizes": self.sizes}, f)
+        os.replace(tmp_path, self.cache_path)
+
+
+def annotate_images(node: HTMLNode, sizes: ImageSizes):
+    """
+    Adds width and height to the img nodes of a page whose size is known, so
+    browsers can reserve their space, and marks them decoding="async". All but
+    the first image are also marked loading="lazy", since the first one is
+    often above the fold.
+
+    Args:
+        node (HTMLNode): The root of the page body.
+        sizes (ImageSizes): The static images' sizes.
+    """
+    first = True
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, ParentNode) and item.children is not None:
+            stack.extend(reversed(item.children))
+        elif item.tag == "img" and item.props is not None:
+            size = sizes.get(item.props.get("src", ""))
+            if size is not None:
+                item.props["width"] = str(size[0])
+                item.props["height"] = str(size[1])
+            if not first:
+                item.props["loading"] = "lazy"
+            item.props["decoding"] = "async"
+            first = False
@@ -1,17 +1,167 @@
 import argparse
 import os
 import shutil
+import time
 from typing import cast
 
-from page import generate_pages_recursive
+from assets import COPY_STRATEGIES, fingerprint_assets, sync_directory
+from cache import DEFAULT_CACHE_SIZE, PARSE_CACHE_DIR, ParseCache, RenderCache
+from compress import COMPRESSORS, compress_tree
+from images import ImageSizes, image_cache_path
+from manifest import (
+    ASSET_MANIFEST_NAME,
+    FINGERPRINT_MANIFEST_NAME,
+    MANIFEST_NAME,
+    save_fingerprint_manifest,
+)
+from page import generate_pages_incremental, generate_pages_recursive
+from profiling import Profiler
+from publish import LOCK_NAME, PUBLISH_MODES, build_lock, prepare_staging, publish
+from watch import watch
 
 STATIC_DIR = "static"
 PUBLIC_DIR = "docs"
+CONTENT_DIR = "content"
+TEMPLATE_PATH = "template.html"
+# Parsed pages kept in memory between --watch rebuilds.
+WATCH_MEMORY_ENTRIES = 10000
 
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description="Static Site Generator")
     _ = parser.add_argument("basepath", default="/", help="Base path for the site")
+    _ = parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-render pages and re-copy static files whose inputs changed "
+        + "since the last build",
+    )
+    _ = parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After building, keep running and rebuild incrementally whenever "
+        + "content/, static/ or template.html change",
+    )
+    _ = parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=0.5,
+        metavar="SECONDS",
+        help="How often --watch polls for changes",
+    )
+    _ = parser.add_argument(
+        "--hash-static",
+        action="store_true",
+        help="With --incremental, compare static files by content hash when their "
+        + "mtimes differ",
+    )
+    _ = parser.add_argument(
+        "--copy-strategy",
+        choices=COPY_STRATEGIES,
+        default="copy",
+        help="How static files are copied: copy (shutil.copy2), kernel "
+        + "(copy_file_range/sendfile) or hardlink (falls back to kernel across "
+        + "filesystems; never edit hardlinked files in docs/ in place)",
+    )
+    _ = parser.add_argument(
+        "--copy-workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Number of threads copying static files",
+    )
+    _ = parser.add_argument(
+        "--dedupe-static",
+        action="store_true",
+        help="Copy static files with identical contents once and hardlink the rest",
+    )
+    _ = parser.add_argument(
+        "--no-image-sizes",
+        action="store_true",
+        help="Do not add width, height and lazy loading to images from their headers",
+    )
+    _ = parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Also publish each static file under a content-hashed name, link pages "
+        + f"and the template to those names and write {FINGERPRINT_MANIFEST_NAME}",
+    )
+    _ = parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="Emit pages without formatting whitespace (pre and code kept as is)",
+    )
+    _ = parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="Write maximally compressed siblings of text outputs (pages and static "
+        + f"files) next to them: {', '.join(COMPRESSORS)}",
+    )
+    _ = parser.add_argument(
+        "--publish",
+        choices=PUBLISH_MODES,
+        help="Build into a staging copy of docs/ (unchanged files hardlinked) and "
+        + "swap it in when done: rename swaps directories (atomically only where "
+        + "renameat2 is available, i.e. Linux), symlink points docs/ at the new "
+        + "release atomically everywhere. Implies --incremental",
+    )
+    _ = parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Number of worker processes used to render pages",
+    )
+    _ = parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every rendered page from scratch instead of using the parse cache",
+    )
+    _ = parser.add_argument(
+        "--cache-dir",
+        default=PARSE_CACHE_DIR,
+        help=f"Directory of the parse cache (default: {PARSE_CACHE_DIR}); image "
+        + "sizes are cached beside it in DIR.images.json",
+    )
+    _ = parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        metavar="MB",
+        help="Size the parse cache is trimmed to after each build",
+    )
+    _ = parser.add_argument(
+        "--render-cache",
+        metavar="DIR",
+        help="Shared cache of finished pages (safe to mount or restore on several "
+        + "machines); prune it with 'python3 src/cache.py prune DIR'",
+    )
+    _ = parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="build_profile.json",
+        metavar="REPORT",
+        help="Time each build stage per page and write a JSON report "
+        + "(default: build_profile.json); every page is parsed from scratch, "
+        + "as with --no-cache",
+    )
+    _ = parser.add_argument(
+        "--profile-cprofile",
+        action="store_true",
+        help="With --profile, also run each page under cProfile",
+    )
+    _ = parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="With --profile, also record each page's peak memory with tracemalloc",
+    )
+    _ = parser.add_argument(
+        "--profile-slowest",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of slowest pages listed in the profile report",
+    )
     return parser.parse_args()
 
 
@@ -37,73 +187,181 @@ def delete_directory_contents(dir: str):
         raise FileNotFoundError(f"Directory '{dir}' does not exist.")
 
 
-def copy_single_file(src: str, dest: str):
+def build_site(
+    public_dir: str,
+    args: argparse.Namespace,
+    incremental: bool,
+    profiler: Profiler | None,
+    cache: ParseCache | None,
+    render_cache: RenderCache | None,
+    images: ImageSizes | None,
+):
     """
-    Copies a single file from src to dest.
+    Copies the static files and renders the pages into public_dir.
 
     Args:
-        src (str): Source file path.
-        dest (str): Destination file path.
+        public_dir (str): Directory to build into.
+        args (argparse.Namespace): The parsed command line arguments.
+        incremental (bool): Update the previous build in place instead of
+                            wiping public_dir first.
+        profiler (Profiler | None): Collects per-page timings if given.
+        cache (ParseCache | None): Cache of parsed pages.
+        render_cache (RenderCache | None): Cache of finished pages.
+        images (ImageSizes | None): Sizes of the static images.
     """
-    try:
-        _ = shutil.copy2(src, dest)
-        print(f"File copied from {src} to {dest}")
-    except Exception as e:
-        print(f"Failed to copy {src} to {dest}. Reason: {e}")
+    basepath = cast(str, args.basepath)
+    jobs = cast(int, args.jobs)
+    strategy = cast(str, args.copy_strategy)
+    copy_workers = cast(int, args.copy_workers)
+    dedupe = cast(bool, args.dedupe_static)
+    minify = cast(bool, args.minify)
+    assets = None
+    if cast(bool, args.fingerprint):
+        # Share the image cache's stat-keyed hashes, so unchanged files are
+        # not hashed again and the hashes are kept between builds.
+        hashes = images.files if images is not None else None
+        assets = fingerprint_assets(STATIC_DIR, hashes)
 
+    if incremental:
+        copied, kept, stale = sync_directory(
+            STATIC_DIR,
+            public_dir,
+            os.path.join(public_dir, ASSET_MANIFEST_NAME),
+            cast(bool, args.hash_static),
+            strategy,
+            copy_workers,
+            dedupe,
+            assets,
+        )
+        print(f"Static sync: {copied} copied, {kept} unchanged, {stale} removed.")
+        rendered, unchanged, removed = generate_pages_incremental(
+            CONTENT_DIR,
+            TEMPLATE_PATH,
+            public_dir,
+            basepath,
+            os.path.join(public_dir, MANIFEST_NAME),
+            jobs,
+            profiler,
+            cache,
+            render_cache,
+            STATIC_DIR,
+            minify,
+            assets,
+            images,
+        )
+        print(
+            f"Incremental build: {rendered} rendered, {unchanged} unchanged, {removed} removed."
+        )
+    else:
+        try:
+            delete_directory_contents(public_dir)
+        except FileNotFoundError:
+            os.makedirs(public_dir)
+        _ = sync_directory(
+            STATIC_DIR, public_dir, None, False, strategy, copy_workers, dedupe, assets
+        )
+        print(f"All contents from '{STATIC_DIR}' have been copied to '{public_dir}'.")
+        generate_pages_recursive(
+            CONTENT_DIR,
+            TEMPLATE_PATH,
+            public_dir,
+            basepath,
+            jobs,
+            profiler,
+            cache,
+            render_cache,
+            minify,
+            assets,
+            images,
+        )
 
-def create_directory(name: str, dest: str):
-    """
-    Creates a directory named 'name' inside the 'dest' directory.
+    fingerprint_manifest = os.path.join(public_dir, FINGERPRINT_MANIFEST_NAME)
+    if assets is not None:
+        save_fingerprint_manifest(fingerprint_manifest, assets)
+    elif os.path.exists(fingerprint_manifest):
+        os.unlink(fingerprint_manifest)
 
-    Args:
-        name (str): Name of the directory to create.
-        dest (str): Destination directory where the new directory will be created.
-    """
-    path = os.path.join(dest, name)
-    try:
-        os.makedirs(path, exist_ok=True)
-        print(f"Directory '{name}' created at {path}")
-    except Exception as e:
-        print(f"Failed to create directory {path}. Reason: {e}")
+    if cast(bool, args.precompress):
+        compressed, fresh, orphaned = compress_tree(public_dir, os.cpu_count() or 1)
+        print(
+            f"Precompression: {compressed} compressed, {fresh} up to date, {orphaned} removed."
+        )
 
 
-def iterate_and_copy_files(src_dir: str, dest_dir: str):
-    """
-    Iterates over all files in src_dir and copies them to dest_dir.
+def main():
+    args = parse_arguments()
+    incremental = cast(bool, args.incremental)
+    publish_mode = cast(str | None, args.publish)
+    profile_path = cast(str | None, args.profile)
+    profiler = None
+    if profile_path is not None:
+        profiler = Profiler(
+            cprofile=cast(bool, args.profile_cprofile),
+            trace_memory=cast(bool, args.profile_memory),
+        )
 
-    Args:
-        src_dir (str): Source directory path.
-        dest_dir (str): Destination directory path.
-    """
-    if not os.path.exists(src_dir):
-        raise FileNotFoundError(f"Source directory '{src_dir}' does not exist.")
-
-    if not os.path.exists(dest_dir):
-        os.makedirs(dest_dir)
-
-    for item in os.listdir(src_dir):
-        s = os.path.join(src_dir, item)
-        d = os.path.join(dest_dir, item)
-        if os.path.isdir(s):
-            create_directory(item, dest_dir)
-            iterate_and_copy_files(s, d)
-        else:
-            copy_single_file(s, d)
+    watching = cast(bool, args.watch)
+    no_cache = cast(bool, args.no_cache)
+    cache = None
+    # Cache hits would skip the parse stages, so profiles measure cold pages.
+    if not no_cache and profiler is None:
+        cache = ParseCache(
+            cast(str, args.cache_dir),
+            cast(int, args.cache_size) * 1024 * 1024,
+            WATCH_MEMORY_ENTRIES if watching else 0,
+        )
 
-    print(f"All contents from '{src_dir}' have been copied to '{dest_dir}'.")
+    render_cache_dir = cast(str | None, args.render_cache)
+    render_cache = RenderCache(render_cache_dir) if render_cache_dir else None
+    images = None
+    if not cast(bool, args.no_image_sizes):
+        cache_path = None if no_cache else image_cache_path(cast(str, args.cache_dir))
+        images = ImageSizes(STATIC_DIR, cache_path)
+
+    def build(incremental: bool):
+        if publish_mode is None:
+            build_site(
+                PUBLIC_DIR, args, incremental, profiler, cache, render_cache, images
+            )
+        else:
+            staging = prepare_staging(PUBLIC_DIR, publish_mode)
+            try:
+                build_site(staging, args, True, profiler, cache, render_cache, images)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            publish(staging, PUBLIC_DIR, publish_mode)
+        if images is not None:
+            images.save()
+        if render_cache is not None:
+            print(render_cache.report())
+        if cache is not None:
+            evicted = cache.evict()
+            if evicted:
+                print(f"Parse cache: evicted {evicted} least recently used entries")
 
+    def rebuild(changes: list[str]):
+        print(f"Changed: {', '.join(changes)}")
+        start = time.perf_counter()
+        try:
+            build(True)
+        except Exception as e:
+            print(f"Rebuild failed. Reason: {e}")
+            return
+        print(f"Rebuilt in {time.perf_counter() - start:.2f}s")
 
-def main():
-    args = parse_arguments()
-    basepath = cast(str, args.basepath)
+    with build_lock(LOCK_NAME):
+        build(incremental or watching)
+        if watching:
+            watch(
+                [CONTENT_DIR, STATIC_DIR, TEMPLATE_PATH],
+                rebuild,
+                cast(float, args.watch_interval),
+            )
 
-    try:
-        delete_directory_contents(PUBLIC_DIR)
-    except FileNotFoundError:
-        os.makedirs(PUBLIC_DIR)
-    iterate_and_copy_files(STATIC_DIR, PUBLIC_DIR)
-    generate_pages_recursive("content", "template.html", PUBLIC_DIR, basepath)
+    if profiler is not None and profile_path is not None:
+        profiler.write_report(profile_path, cast(int, args.profile_slowest))
+        print(f"Profile report written to {profile_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+from typing import TypedDict, cast
+
+GENERATOR_VERSION = "5"
+MANIFEST_NAME = ".manifest.json"
+ASSET_MANIFEST_NAME = ".assets.json"
+# Compressed siblings written by the precompress stage.
+COMPRESS_MANIFEST_NAME = ".compressed.json"
+# Public map of static files to their fingerprinted names.
+FINGERPRINT_MANIFEST_NAME = "fingerprints.json"
+
+
+class PageRecord(TypedDict):
+    source_hash: str
+    source_size: int
+    source_mtime_ns: int
+    basepath: str
+    minify: bool
+    fingerprint: bool
+    image_sizes: bool
+    generator_version: str
+    output_path: str
+    # Input files the output is built from (e.g. the template, and with
+    # fingerprinting or image sizes the static files it references), with
+    # their hashes.
+    dependencies: dict[str, str]
+    # Static assets the page links to or embeds, relative to the static directory.
+    references: list[str]
+
+
+def hash_bytes(data: bytes) -> str:
+    """
+    Returns the hex SHA-256 digest of the given bytes.
+
+    Args:
+        data (bytes): The data to hash.
+
+    Returns:
+        str: The hex digest.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """
+    Returns the hex SHA-256 digest of a file's contents without reading the
+    whole file into memory.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: The hex digest.
+    """
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def hash_file_cached(path: str, key: str, hashes: dict[str, list[int | str]]) -> str:
+    """
+    Returns a file's digest from hashes when its size and mtime still match the
+    entry under key, and otherwise hashes the file and records it there.
+
+    Args:
+        path (str): Path to the file.
+        key (str): The file's entry in hashes.
+        hashes (dict[str, list[int | str]]): [size, mtime_ns, digest] entries.
+
+    Returns:
+        str: The hex digest.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    stat = os.stat(path)
+    record = hashes.get(key)
+    if record is not None and record[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return cast(str, record[2])
+    digest = hash_file(path)
+    hashes[key] = [stat.st_size, stat.st_mtime_ns, digest]
+    return digest
+
+
+def load_manifest(path: str) -> dict[str, PageRecord]:
+    """
+    Loads the page records of a build manifest.
+    A missing, unreadable or outdated manifest yields no records, which makes
+    the next incremental build a full one.
+
+    Args:
+        path (str): Path to the manifest file.
+
+    Returns:
+        dict[str, PageRecord]: Page records keyed by source path relative to the
+                               content directory.
+    """
+    try:
+        with open(path, "r") as f:
+            data = cast(dict[str, object], json.load(f))
+    except (OSError, ValueError):
+        return {}
+    if data.get("generator_version") != GENERATOR_VERSION:
+        return {}
+    return cast(dict[str, PageRecord], data.get("pages", {}))
+
+
+def save_manifest(path: str, pages: dict[str, PageRecord]):
+    """
+    Atomically writes the page records of a build manifest.
+
+    Args:
+        path (str): Path to the manifest file.
+        pages (dict[str, PageRecord]): Page records keyed by relative source path.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(
+            {"generator_version": GENERATOR_VERSION, "pages": pages},
+            f,
+            indent=1,
+            sort_keys=True,
+        )
+    os.replace(tmp_path, path)
+
+
+def load_asset_manifest(path: str) -> list[str]:
+    """
+    Loads the list of static assets recorded by the previous asset sync.
+
+    Args:
+        path (str): Path to the asset manifest file.
+
+    Returns:
+        list[str]: Asset paths relative to the output directory.
+    """
+    try:
+        with open(path, "r") as f:
+            data = cast(dict[str, object], json.load(f))
+    except (OSError, ValueError):
+        return []
+    return cast(list[str], data.get("assets", []))
+
+
+def save_asset_manifest(path: str, assets: list[str]):
+    """
+    Atomically writes the list of synced static assets.
+
+    Args:
+        path (str): Path to the asset manifest file.
+        assets (list[str]): Asset paths relative to the output directory.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"assets": sorted(assets)}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def save_fingerprint_manifest(path: str, assets: dict[str, str]):
+    """
+    Atomically writes the map of static files to their fingerprinted names.
+
+    Args:
+        path (str): Path to the fingerprint manifest file.
+        assets (dict[str, str]): Fingerprinted paths keyed by original path, both
+                                 relative to the output directory.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(assets, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
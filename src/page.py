@@ -1,7 +1,28 @@
+import contextlib
+import io
+import json
 import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, TextIO
 
+from cache import ParseCache, ParsedPage, RenderCache
+from deps import Fingerprints, changed_dependencies, find_references
+from htmlnode import iter_html
+from images import ImageSizes, annotate_images
+from manifest import (
+    GENERATOR_VERSION,
+    PageRecord,
+    hash_bytes,
+    hash_file,
+    load_manifest,
+    save_manifest,
+)
+from profiling import PageProfile, Profiler
+from template import Template, find_local_urls
 from utils import markdown_to_html_node
+from writer import OutputWriter, discard
 
 
 def extract_title(markdown: str) -> str:
@@ -22,7 +43,17 @@ def extract_title(markdown: str) -> str:
     return heading_match.group(1).strip()
 
 
-def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str):
+def generate_page(
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    basepath: str,
+    template: Template | None = None,
+    stats: dict[str, float] | None = None,
+    cache: ParseCache | None = None,
+    writer: OutputWriter | None = None,
+    images: ImageSizes | None = None,
+):
     """
     Generates an HTML page from a markdown file using a specified template.
 
@@ -30,48 +61,622 @@ def generate_page(from_path: str, template_path: str, dest_path: str, basepath:
         from_path (str): Path to the source markdown file.
         template_path (str): Path to the HTML template file.
         dest_path (str): Path where the generated HTML file will be saved.
+        basepath (str): Base path for the site.
+        template (Template | None): The template already compiled for this
+                                    basepath; read from template_path if omitted.
+        stats (dict[str, float] | None): If given, the time spent in each build
+                                         stage is added to it (see
+                                         profiling.STAGES). The page is then
+                                         serialized, templated and written as
+                                         separate steps instead of streamed,
+                                         as it also is with a cache.
+        cache (ParseCache | None): If given, the body HTML and title are taken
+                                   from it when the markdown was parsed before,
+                                   and stored in it otherwise.
+        writer (OutputWriter | None): If given, the page is handed to it, which
+                                      leaves an identical existing page untouched
+                                      and may write in the background.
+        images (ImageSizes | None): If given, img nodes get the intrinsic size of
+                                    their static image and lazy loading (see
+                                    images.annotate_images).
     """
     print(
         f"Generating page from {from_path} using template {template_path} to {dest_path}"
     )
-    markdown_content = template_content = ""
+    if template is None:
+        template = Template.from_file(template_path, basepath)
+    start = time.perf_counter() if stats is not None else 0.0
+    markdown_content = ""
     with open(from_path, "r") as f:
         markdown_content = f.read()
-    with open(template_path, "r") as f:
-        template_content = f.read()
+    key = ""
+    if cache is not None:
+        sizes = images.describe(markdown_content) if images is not None else ""
+        key = cache.key(markdown_content, template.minify, sizes)
+    cached = cache.get(key) if cache is not None else None
+    if stats is not None:
+        stats["read"] = stats.get("read", 0.0) + time.perf_counter() - start
 
-    html = markdown_to_html_node(markdown_content).to_html()
-    title = extract_title(markdown_content)
+    if cached is None:
+        node = markdown_to_html_node(markdown_content, stats)
+        if images is not None:
+            annotate_images(node, images)
+        title = extract_title(markdown_content)
+        html = None
+    else:
+        node = None
+        html, title = cached
 
-    final_content = (
-        template_content.replace("{{ Content }}", html)
-        .replace("{{ Title }}", title)
-        .replace('href="/', f'href="{basepath}')
-        .replace('src="/', f'src="{basepath}')
-    )
+    # Written beside dest_path and renamed over it, so readers never see a
+    # partial page and a hardlinked previous output is replaced, not modified.
+    tmp_path = f"{dest_path}.tmp"
+    if node is not None and stats is None and cache is None:
+        # Without a parse cache nothing needs the body as a string, so the page
+        # is streamed from the tree; an unchanged page then costs a temporary
+        # file and a comparison instead of a string the size of the page.
+        def render(f: TextIO):
+            template.write_node(f, node, title)
 
-    if not os.path.exists(os.path.dirname(dest_path)):
-        os.makedirs(os.path.dirname(dest_path))
-    with open(dest_path, "w") as f:
-        _ = f.write(final_content)
+        if writer is not None:
+            _ = writer.write_stream(dest_path, render)
+        else:
+            if not os.path.exists(os.path.dirname(dest_path)):
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    render(f)
+                os.replace(tmp_path, dest_path)
+            except BaseException:
+                discard(tmp_path)
+                raise
+    else:
+        start = time.perf_counter()
+        if node is not None:
+            html = "".join(iter_html(node, template.minify))
+            if cache is not None:
+                cache.put(key, ParsedPage(html, title))
+        assert html is not None
+        serialized = time.perf_counter()
+        final_content = template.render(html, title)
+        rendered = time.perf_counter()
+        if writer is not None:
+            # Profiled writes happen inline so the write stage is timed.
+            writer.write(
+                dest_path, final_content, wait=stats is not None, source=from_path
+            )
+        else:
+            if not os.path.exists(os.path.dirname(dest_path)):
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    _ = f.write(final_content)
+                os.replace(tmp_path, dest_path)
+            except BaseException:
+                discard(tmp_path)
+                raise
+        written = time.perf_counter()
+        if stats is not None:
+            stats["serialize"] = stats.get("serialize", 0.0) + serialized - start
+            stats["template"] = stats.get("template", 0.0) + rendered - serialized
+            stats["write"] = stats.get("write", 0.0) + written - rendered
     print(f"Page generated at {dest_path}")
 
 
-def generate_pages_recursive(
-    dir_path_content: str, template_path: str, dest_dir_path: str, basepath: str
-):
+def find_markdown_pages(
+    dir_path_content: str, dest_dir_path: str
+) -> list[tuple[str, str]]:
     """
-    Recursively generates HTML pages for all markdown files in a directory.
+    Finds all markdown files in a directory and maps them to their HTML outputs.
 
     Args:
         dir_path_content (str): Directory containing markdown files.
-        template_path (str): Path to the HTML template file.
         dest_dir_path (str): Directory where generated HTML files will be saved.
+
+    Returns:
+        list[tuple[str, str]]: Sorted (source path, destination path) pairs.
     """
+    pages: list[tuple[str, str]] = []
     for root, _, files in os.walk(dir_path_content):
         for file in files:
             if file.endswith(".md"):
                 from_path = os.path.join(root, file)
                 relative_path = os.path.relpath(from_path, dir_path_content)
                 dest_path = os.path.join(dest_dir_path, relative_path[:-3] + ".html")
-                generate_page(from_path, template_path, dest_path, basepath)
+                pages.append((from_path, dest_path))
+    pages.sort()
+    return pages
+
+
+class RenderSettings(NamedTuple):
+    template_path: str
+    basepath: str
+    template: Template
+    profiler: Profiler | None
+    cache: ParseCache | None
+    images: ImageSizes | None
+
+
+_worker_settings: RenderSettings | None = None
+# Worker processes write synchronously; the pool already runs them in parallel.
+_worker_writer: OutputWriter | None = None
+
+
+def _init_worker(settings: RenderSettings):
+    global _worker_settings, _worker_writer
+    _worker_settings = settings
+    _worker_writer = OutputWriter(threads=0)
+
+
+def render_page(
+    settings: RenderSettings,
+    from_path: str,
+    dest_path: str,
+    writer: OutputWriter | None = None,
+) -> PageProfile | None:
+    """
+    Generates one page with the settings shared by the whole build, under the
+    profiler if there is one.
+
+    Args:
+        settings (RenderSettings): The build's render settings.
+        from_path (str): Path to the source markdown file.
+        dest_path (str): Path where the generated HTML file will be saved.
+        writer (OutputWriter | None): Writes the page, skipping identical output.
+
+    Returns:
+        PageProfile | None: The page's profile when profiling.
+    """
+    template_path, basepath, template, profiler, cache, images = settings
+    if profiler is None:
+        generate_page(
+            from_path,
+            template_path,
+            dest_path,
+            basepath,
+            template,
+            None,
+            cache,
+            writer,
+            images,
+        )
+        return None
+    return profiler.run(
+        from_path,
+        lambda stats: generate_page(
+            from_path,
+            template_path,
+            dest_path,
+            basepath,
+            template,
+            stats,
+            cache,
+            writer,
+            images,
+        ),
+    )
+
+
+def _render_page_task(
+    task: tuple[str, str],
+) -> tuple[str, str | None, PageProfile | None, bool]:
+    """
+    Worker entry point: generates one page, capturing its log output and any error
+    so that a bad page does not take down the rest of the batch.
+
+    Args:
+        task (tuple[str, str]): Source path and destination path.
+
+    Returns:
+        tuple[str, str | None, PageProfile | None, bool]: The captured log, the
+                                                          error message if any,
+                                                          the page's profile, and
+                                                          whether the output file
+                                                          changed.
+    """
+    assert _worker_settings is not None and _worker_writer is not None
+    from_path, dest_path = task
+    log = io.StringIO()
+    written = _worker_writer.written
+    try:
+        with contextlib.redirect_stdout(log):
+            profile = render_page(
+                _worker_settings, from_path, dest_path, _worker_writer
+            )
+    except Exception as e:
+        return log.getvalue(), f"{type(e).__name__}: {e}", None, False
+    return log.getvalue(), None, profile, _worker_writer.written > written
+
+
+def _render_batch(
+    pages: list[tuple[str, str]], settings: RenderSettings, jobs: int
+) -> list[tuple[str, str]]:
+    """
+    Generates the given pages, either inline or across a pool of worker processes.
+    With more than one job, pages are handed out in chunks and each page's log is
+    printed in input order once it is done. Either way, failing pages are
+    reported and skipped instead of aborting the batch. Pages whose output is
+    byte-identical to the existing file are not rewritten; the written and
+    unchanged counts are printed at the end.
+
+    Args:
+        pages (list[tuple[str, str]]): (source path, destination path) pairs.
+        settings (RenderSettings): The build's render settings.
+        jobs (int): Number of worker processes.
+
+    Returns:
+        list[tuple[str, str]]: (source path, error message) pairs for the pages
+                               that failed.
+    """
+    if not pages:
+        return []
+    profiler = settings.profiler
+    failures: list[tuple[str, str]] = []
+    if jobs <= 1:
+        writer = OutputWriter()
+        try:
+            for from_path, dest_path in pages:
+                try:
+                    profile = render_page(settings, from_path, dest_path, writer)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    print(f"Failed to generate page from {from_path}. Reason: {error}")
+                    failures.append((from_path, error))
+                    continue
+                if profiler is not None and profile is not None:
+                    profiler.add(profile)
+        finally:
+            writer.close()
+        # Background writes that failed are only known once the writer is done.
+        for from_path, error in writer.failures:
+            print(f"Failed to generate page from {from_path}. Reason: {error}")
+        failures.extend(writer.failures)
+        written, skipped = writer.written, writer.skipped
+    else:
+        written = skipped = 0
+        chunksize = max(1, len(pages) // (jobs * 4))
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(settings,)
+        ) as executor:
+            results = executor.map(_render_page_task, pages, chunksize=chunksize)
+            for (from_path, _), (log, error, profile, changed) in zip(pages, results):
+                print(log, end="")
+                if error is not None:
+                    print(f"Failed to generate page from {from_path}. Reason: {error}")
+                    failures.append((from_path, error))
+                elif changed:
+                    written += 1
+                else:
+                    skipped += 1
+                if profiler is not None and profile is not None:
+                    profiler.add(profile)
+    print(f"Output files: {written} written, {skipped} unchanged.")
+    return failures
+
+
+def render_pages(
+    pages: list[tuple[str, str]],
+    template_path: str,
+    basepath: str,
+    jobs: int = 1,
+    profiler: Profiler | None = None,
+    cache: ParseCache | None = None,
+    render_cache: RenderCache | None = None,
+    minify: bool = False,
+    assets: dict[str, str] | None = None,
+    images: ImageSizes | None = None,
+) -> list[tuple[str, str]]:
+    """
+    Generates the given pages, inline or across jobs worker processes (see
+    _render_batch). The template is compiled once and shared by every page.
+    Pages found in the render cache are copied from it instead of generated,
+    and newly generated pages are added to it.
+
+    Args:
+        pages (list[tuple[str, str]]): (source path, destination path) pairs.
+        template_path (str): Path to the HTML template file.
+        basepath (str): Base path for the site.
+        jobs (int): Number of worker processes.
+        profiler (Profiler | None): Collects a profile of every rendered page.
+        cache (ParseCache | None): Cache of parsed pages shared by all workers.
+        render_cache (RenderCache | None): Cache of finished pages.
+        minify (bool): Emit pages with minimal whitespace.
+        assets (dict[str, str] | None): Fingerprinted static file paths that
+                                        links are rewritten to.
+        images (ImageSizes | None): Sizes of the static images, added to the
+                                    pages' img tags.
+
+    Returns:
+        list[tuple[str, str]]: (source path, error message) pairs for the pages
+                               that failed.
+    """
+    if images is not None and jobs > 1 and render_cache is None:
+        # Workers look sizes up in their own copy, so every image is resolved
+        # here first; they then only stat the files and the new entries are
+        # kept when the sizes are saved.
+        for from_path, _ in pages:
+            with open(from_path, "r") as f:
+                _ = images.describe(f.read())
+    settings = RenderSettings(
+        template_path,
+        basepath,
+        Template.from_file(template_path, basepath, minify, assets),
+        profiler,
+        cache,
+        images,
+    )
+    if render_cache is None:
+        return _render_batch(pages, settings, jobs)
+
+    template_hash = hash_file(template_path)
+    if assets:
+        # Pages embed fingerprinted names, so they are keyed on all of them.
+        fingerprints = json.dumps(assets, sort_keys=True)
+        template_hash = hash_bytes(f"{template_hash}\0{fingerprints}".encode())
+    keys: dict[str, str] = {}
+    uncached: list[tuple[str, str]] = []
+    restored = OutputWriter(threads=0)
+    for from_path, dest_path in pages:
+        source_hash = hash_file(from_path)
+        if images is not None:
+            with open(from_path, "r") as f:
+                sizes = images.describe(f.read())
+            source_hash = hash_bytes(f"{source_hash}\0{sizes}".encode())
+        key = render_cache.key(source_hash, template_hash, basepath, minify)
+        if render_cache.restore(key, dest_path, restored):
+            print(f"Page restored from render cache at {dest_path}")
+        else:
+            keys[from_path] = key
+            uncached.append((from_path, dest_path))
+    if restored.written or restored.skipped:
+        print(
+            f"Restored files: {restored.written} written, "
+            + f"{restored.skipped} unchanged."
+        )
+    failures = _render_batch(uncached, settings, jobs)
+    failed = {from_path for from_path, _ in failures}
+    for from_path, dest_path in uncached:
+        if from_path not in failed:
+            render_cache.store(keys[from_path], dest_path)
+    return failures
+
+
+def generate_pages_recursive(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    basepath: str,
+    jobs: int = 1,
+    profiler: Profiler | None = None,
+    cache: ParseCache | None = None,
+    render_cache: RenderCache | None = None,
+    minify: bool = False,
+    assets: dict[str, str] | None = None,
+    images: ImageSizes | None = None,
+):
+    """
+    Recursively generates HTML pages for all markdown files in a directory.
+
+    Args:
+        dir_path_content (str): Directory containing markdown files.
+        template_path (str): Path to the HTML template file.
+        dest_dir_path (str): Directory where generated HTML files will be saved.
+        jobs (int): Number of worker processes used to render pages.
+        profiler (Profiler | None): Collects a profile of every rendered page.
+        cache (ParseCache | None): Cache of parsed pages.
+        render_cache (RenderCache | None): Cache of finished pages.
+        minify (bool): Emit pages with minimal whitespace.
+        assets (dict[str, str] | None): Fingerprinted static file paths that
+                                        links are rewritten to.
+        images (ImageSizes | None): Sizes of the static images, added to the
+                                    pages' img tags.
+    """
+    pages = find_markdown_pages(dir_path_content, dest_dir_path)
+    failures = render_pages(
+        pages,
+        template_path,
+        basepath,
+        jobs,
+        profiler,
+        cache,
+        render_cache,
+        minify,
+        assets,
+        images,
+    )
+    if failures:
+        raise RuntimeError(f"{len(failures)} page(s) failed to generate")
+
+
+def remove_output(dest_path: str, dest_dir_path: str):
+    """
+    Removes a generated file and any directories it leaves empty, stopping at
+    the destination root.
+
+    Args:
+        dest_path (str): Path of the generated file to remove.
+        dest_dir_path (str): Root directory of the generated site.
+    """
+    if os.path.exists(dest_path):
+        os.unlink(dest_path)
+    parent = os.path.dirname(dest_path)
+    root = os.path.abspath(dest_dir_path)
+    while os.path.abspath(parent) != root and os.path.isdir(parent):
+        if os.listdir(parent):
+            break
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+
+def generate_pages_incremental(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    basepath: str,
+    manifest_path: str,
+    jobs: int = 1,
+    profiler: Profiler | None = None,
+    cache: ParseCache | None = None,
+    render_cache: RenderCache | None = None,
+    static_dir: str | None = None,
+    minify: bool = False,
+    assets: dict[str, str] | None = None,
+    images: ImageSizes | None = None,
+) -> tuple[int, int, int]:
+    """
+    Generates HTML pages for the markdown files whose inputs changed since the
+    build recorded in the manifest, and removes pages whose sources vanished.
+    A page is up to date when its source hash, the basepath, the minify,
+    fingerprint and image size settings and the generator version match its
+    manifest record, none of the files its output depends on (the template)
+    changed, and its output still exists. Sources whose size and mtime are
+    unchanged reuse their recorded hash instead of being re-read.
+    The static assets each page references are recorded too. Since they are
+    copied rather than embedded, changing one rebuilds no pages, unless assets
+    are fingerprinted or images sized: then the pages (or the template) embed
+    their fingerprinted names or image sizes, so those pages depend on them.
+
+    Args:
+        dir_path_content (str): Directory containing markdown files.
+        template_path (str): Path to the HTML template file.
+        dest_dir_path (str): Directory where generated HTML files will be saved.
+        basepath (str): Base path for the site.
+        manifest_path (str): Path to the build manifest.
+        jobs (int): Number of worker processes used to render pages.
+        profiler (Profiler | None): Collects a profile of every rendered page.
+        cache (ParseCache | None): Cache of parsed pages, which spares stale
+                                   pages with unchanged markdown (e.g. after a
+                                   template change) from being parsed again.
+        render_cache (RenderCache | None): Cache of finished pages.
+        static_dir (str | None): Static directory used to resolve the assets each
+                                 page references; none are recorded if omitted.
+        minify (bool): Emit pages with minimal whitespace.
+        assets (dict[str, str] | None): Fingerprinted static file paths that
+                                        links are rewritten to.
+        images (ImageSizes | None): Sizes of the static images, added to the
+                                    pages' img tags. Their file hashes also
+                                    spare unchanged static dependencies from
+                                    being read again.
+
+    Returns:
+        tuple[int, int, int]: Number of pages rendered, left unchanged and removed.
+    """
+    fingerprints = (
+        Fingerprints(static_dir, images.files) if images is not None else Fingerprints()
+    )
+    required = [template_path]
+    fingerprint = assets is not None
+    image_sizes = images is not None
+    if assets is not None and static_dir is not None:
+        with open(template_path, "r") as f:
+            linked = {path for path in find_local_urls(f.read()) if path in assets}
+        required += sorted(os.path.join(static_dir, path) for path in linked)
+    invalidated: dict[str, int] = {}
+    old_pages = load_manifest(manifest_path)
+    new_pages: dict[str, PageRecord] = {}
+    stale: list[tuple[str, str, str, PageRecord]] = []
+    sources: set[str] = set()
+    unchanged = 0
+
+    for from_path, dest_path in find_markdown_pages(dir_path_content, dest_dir_path):
+        key = os.path.relpath(from_path, dir_path_content)
+        sources.add(key)
+        output_path = os.path.relpath(dest_path, dest_dir_path)
+        stat = os.stat(from_path)
+        record = old_pages.get(key)
+        if (
+            record is not None
+            and record["source_size"] == stat.st_size
+            and record["source_mtime_ns"] == stat.st_mtime_ns
+        ):
+            source_hash = record["source_hash"]
+        else:
+            source_hash = hash_file(from_path)
+
+        changed = required
+        if record is not None:
+            changed = changed_dependencies(
+                record["dependencies"], required, fingerprints
+            )
+            for path in changed:
+                invalidated[path] = invalidated.get(path, 0) + 1
+        if (
+            record is not None
+            and record["source_hash"] == source_hash
+            and not changed
+            and record["basepath"] == basepath
+            and record["minify"] == minify
+            and record["fingerprint"] == fingerprint
+            and record["image_sizes"] == image_sizes
+            and record["generator_version"] == GENERATOR_VERSION
+            and record["output_path"] == output_path
+            and os.path.exists(dest_path)
+        ):
+            record["source_size"] = stat.st_size
+            record["source_mtime_ns"] = stat.st_mtime_ns
+            new_pages[key] = record
+            unchanged += 1
+            continue
+
+        stale.append(
+            (
+                key,
+                from_path,
+                dest_path,
+                {
+                    "source_hash": source_hash,
+                    "source_size": stat.st_size,
+                    "source_mtime_ns": stat.st_mtime_ns,
+                    "basepath": basepath,
+                    "minify": minify,
+                    "fingerprint": fingerprint,
+                    "image_sizes": image_sizes,
+                    "generator_version": GENERATOR_VERSION,
+                    "output_path": output_path,
+                    "dependencies": fingerprints.record(required),
+                    "references": [],
+                },
+            )
+        )
+
+    failures = render_pages(
+        [(from_path, dest_path) for _, from_path, dest_path, _ in stale],
+        template_path,
+        basepath,
+        jobs,
+        profiler,
+        cache,
+        render_cache,
+        minify,
+        assets,
+        images,
+    )
+    failed = {from_path for from_path, _ in failures}
+    for key, from_path, dest_path, record in stale:
+        if from_path not in failed:
+            if static_dir is not None:
+                with open(from_path, "r") as f:
+                    record["references"] = find_references(f.read(), static_dir)
+                if fingerprint or image_sizes:
+                    record["dependencies"].update(
+                        fingerprints.record(
+                            [os.path.join(static_dir, r) for r in record["references"]]
+                        )
+                    )
+            new_pages[key] = record
+    rendered = len(stale) - len(failures)
+    for path, count in invalidated.items():
+        print(f"{path} changed: {count} dependent page(s) rebuilt")
+
+    removed = 0
+    for key, record in old_pages.items():
+        if key not in sources:
+            remove_output(
+                os.path.join(dest_dir_path, record["output_path"]), dest_dir_path
+            )
+            print(f"Removed {record['output_path']} (source {key} no longer exists)")
+            removed += 1
+
+    save_manifest(manifest_path, new_pages)
+    if failures:
+        raise RuntimeError(f"{len(failures)} page(s) failed to generate")
+    return rendered, unchanged, removed
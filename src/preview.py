@@ -0,0 +1,453 @@
+import argparse
+import email.utils
+import functools
+import gzip
+import mimetypes
+import os
+import posixpath
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socket import socket
+from typing import cast, override
+from urllib.parse import unquote, urlsplit
+
+COMPRESSIBLE_TYPES = (
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES
+
+
+def accepts_gzip(header: str) -> bool:
+    """
+    Checks whether an Accept-Encoding header allows a gzip response.
+
+    Args:
+        header (str): The Accept-Encoding header value.
+
+    Returns:
+        bool: True unless gzip is absent or refused with q=0.
+    """
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            _, _, q = params.strip().partition("q=")
+            try:
+                return float(q or "1") > 0
+            except ValueError:
+                return False
+    return False
+
+
+def fresh_sibling(path: str, stat: os.stat_result) -> os.stat_result | None:
+    """
+    Looks up a precompressed sibling written for the file's current version,
+    which compress.compress_file stamps with the file's mtime.
+
+    Args:
+        path (str): Path to the sibling, e.g. the file's path plus ".gz".
+        stat (os.stat_result): The file's stat.
+
+    Returns:
+        os.stat_result | None: The sibling's stat, or None if it is missing or
+                               its mtime differs from the file's.
+    """
+    try:
+        sibling = os.stat(path)
+    except OSError:
+        return None
+    return sibling if sibling.st_mtime_ns == stat.st_mtime_ns else None
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parses a single-range Range header.
+
+    Args:
+        header (str): The Range header value, e.g. "bytes=0-499" or "bytes=-500".
+        size (int): Size of the file.
+
+    Returns:
+        tuple[int, int] | None: First and last byte (inclusive), or None when
+                                the header is malformed or asks for several
+                                ranges, in which case the whole file is sent.
+
+    Raises:
+        ValueError: If the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    first, dash, last = spec.strip().partition("-")
+    if (
+        unit.strip() != "bytes"
+        or not dash
+        or not (first or last)
+        or not (first.isdigit() or not first)
+        or not (last.isdigit() or not last)
+    ):
+        return None
+    if not first:
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class GzipCache:
+    def __init__(self, max_bytes: int):
+        """
+        Keeps gzipped copies of recently served files, keyed by path, size and
+        mtime so that an edited file is compressed again. Thread-safe.
+
+        Args:
+            max_bytes (int): Total size of compressed data kept.
+        """
+        self.max_bytes: int = max_bytes
+        self.size: int = 0
+        self.entries: OrderedDict[tuple[str, int, int], bytes] = OrderedDict()
+        self.lock: threading.Lock = threading.Lock()
+
+    def get(self, path: str, stat: os.stat_result) -> bytes:
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+                return data
+        with open(path, "rb") as f:
+            data = gzip.compress(f.read(), compresslevel=6, mtime=0)
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = data
+                self.size += len(data)
+            while self.size > self.max_bytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+        return data
+
+
+class PreviewRequestHandler(BaseHTTPRequestHandler):
+    protocol_version: str = "HTTP/1.1"
+    server_version: str = "learn_ssg-preview"
+    # Idle keep-alive connections are closed after this many seconds.
+    timeout: float | None = 15
+
+    def __init__(
+        self,
+        *args: object,
+        root: str,
+        gzip_cache: GzipCache,
+        quiet: bool = False,
+        **kwargs: object,
+    ):
+        self.root: str = root
+        self.gzip_cache: GzipCache = gzip_cache
+        self.quiet: bool = quiet
+        super().__init__(*args, **kwargs)  # pyright: ignore[reportArgumentType]
+
+    @override
+    def log_message(self, format: str, *args: object):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self.serve(head_only=False)
+
+    def do_HEAD(self):
+        self.serve(head_only=True)
+
+    def translate_path(self, url_path: str) -> str | None:
+        """
+        Maps a request path to a file or directory under the root.
+
+        Args:
+            url_path (str): The request path.
+
+        Returns:
+            str | None: The local path, or None if it escapes the root.
+        """
+        path = posixpath.normpath(unquote(urlsplit(url_path).path))
+        parts = [part for part in path.split("/") if part]
+        if any(part in (".", "..") or os.sep in part for part in parts):
+            return None
+        return os.path.join(self.root, *parts)
+
+    def not_modified(self, etag: str, mtime: int) -> bool:
+        """
+        Evaluates If-None-Match, or If-Modified-Since when there is no
+        If-None-Match.
+
+        Args:
+            etag (str): The representation's ETag.
+            mtime (int): The file's mtime in whole seconds.
+
+        Returns:
+            bool: True if a 304 should be sent.
+        """
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return mtime <= since.timestamp()
+
+    def serve(self, head_only: bool):
+        path = self.translate_path(self.path)
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        if os.path.isdir(path):
+            url_path = urlsplit(self.path).path
+            if not url_path.endswith("/"):
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header("Location", url_path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            path = os.path.join(path, "index.html")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        if not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        compressible = is_compressible(content_type)
+        use_gzip = (
+            compressible
+            and "Range" not in self.headers
+            and accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        )
+        gz_stat = None
+        if use_gzip:
+            gz_stat = fresh_sibling(f"{path}.gz", stat)
+            # Each encoding is a different representation with its own ETag, and
+            # a .gz sibling's bytes differ from the ones compressed here.
+            if gz_stat is not None:
+                etag = f'"{gz_stat.st_size:x}-{gz_stat.st_mtime_ns:x}-gz"'
+            else:
+                etag = etag[:-1] + '-gzip"'
+
+        headers = {
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": "no-cache",
+        }
+        if compressible:
+            headers["Vary"] = "Accept-Encoding"
+        if self.not_modified(etag, int(stat.st_mtime)):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        if use_gzip:
+            self.send_gzip(path, stat, gz_stat, content_type, headers, head_only)
+        else:
+            self.send_file(path, stat, content_type, headers, head_only)
+
+    def send_gzip(
+        self,
+        path: str,
+        stat: os.stat_result,
+        gz_stat: os.stat_result | None,
+        content_type: str,
+        headers: dict[str, str],
+        head_only: bool,
+    ):
+        """
+        Sends a gzip-encoded response, from the .gz sibling when gz_stat is
+        given (see fresh_sibling), otherwise compressed through the cache.
+        """
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Encoding", "gzip")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if gz_stat is not None:
+            self.send_header("Content-Length", str(gz_stat.st_size))
+            self.end_headers()
+            if not head_only:
+                with open(f"{path}.gz", "rb") as f:
+                    self.send_body(f, 0, gz_stat.st_size)
+            return
+        data = self.gzip_cache.get(path, stat)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if not head_only:
+            _ = self.wfile.write(data)
+
+    def send_file(
+        self,
+        path: str,
+        stat: os.stat_result,
+        content_type: str,
+        headers: dict[str, str],
+        head_only: bool,
+    ):
+        """
+        Sends the file unencoded, or the requested byte range of it.
+        """
+        start, end = 0, stat.st_size - 1
+        status = HTTPStatus.OK
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header is not None and (
+            if_range is None or if_range in (headers["ETag"], headers["Last-Modified"])
+        ):
+            try:
+                byte_range = parse_range(range_header, stat.st_size)
+            except ValueError:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{stat.st_size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = HTTPStatus.PARTIAL_CONTENT
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{stat.st_size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if not head_only and stat.st_size:
+            with open(path, "rb") as f:
+                self.send_body(f, start, end - start + 1)
+
+    def send_body(self, f: object, offset: int, count: int):
+        # socket.sendfile uses os.sendfile where available, so file data goes
+        # from the page cache to the socket without passing through Python.
+        connection = cast(socket, self.connection)
+        _ = connection.sendfile(f, offset, count)  # pyright: ignore[reportArgumentType]
+
+
+class PooledHTTPServer(HTTPServer):
+    def __init__(self, address: tuple[str, int], handler: object, workers: int):
+        """
+        An HTTP server that handles connections on a fixed pool of threads
+        instead of one new thread per connection.
+
+        Args:
+            address (tuple[str, int]): Address and port to listen on.
+            handler (object): The request handler class or factory.
+            workers (int): Number of worker threads, i.e. of connections served
+                           concurrently; further connections wait in the backlog.
+        """
+        self.request_queue_size: int = max(128, workers * 4)
+        self.pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=workers)
+        super().__init__(address, handler)  # pyright: ignore[reportArgumentType]
+
+    @override
+    def process_request(self, request: socket, client_address: tuple[str, int]):  # pyright: ignore[reportIncompatibleMethodOverride]
+        _ = self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request: socket, client_address: tuple[str, int]):
+        try:
+            self.finish_request(request, client_address)
+        # Same as socketserver.ThreadingMixIn: a failing request is logged by
+        # handle_error and must not kill the worker thread.
+        except Exception:  # noqa: BLE001
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    @override
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def make_server(
+    root: str,
+    bind: str = "127.0.0.1",
+    port: int = 8000,
+    workers: int = 32,
+    gzip_cache_bytes: int = 64 * 1024 * 1024,
+    quiet: bool = False,
+) -> PooledHTTPServer:
+    """
+    Creates a preview server for a built site.
+
+    Args:
+        root (str): Directory to serve, usually docs/.
+        bind (str): Address to listen on.
+        port (int): Port to listen on; 0 picks a free one.
+        workers (int): Number of worker threads.
+        gzip_cache_bytes (int): Size of the on-the-fly gzip cache.
+        quiet (bool): Do not log requests.
+
+    Returns:
+        PooledHTTPServer: The server, not yet serving.
+    """
+    handler = functools.partial(
+        PreviewRequestHandler,
+        root=root,
+        gzip_cache=GzipCache(gzip_cache_bytes),
+        quiet=quiet,
+    )
+    return PooledHTTPServer((bind, port), handler, workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preview server for the built site")
+    _ = parser.add_argument("--root", default="docs")
+    _ = parser.add_argument("--bind", default="127.0.0.1")
+    _ = parser.add_argument("--port", type=int, default=8000)
+    _ = parser.add_argument("--workers", type=int, default=32)
+    _ = parser.add_argument(
+        "--gzip-cache", type=int, default=64, metavar="MB", help="On-the-fly gzip cache"
+    )
+    _ = parser.add_argument("--quiet", action="store_true", help="Do not log requests")
+    args = parser.parse_args()
+    server = make_server(
+        cast(str, args.root),
+        cast(str, args.bind),
+        cast(int, args.port),
+        cast(int, args.workers),
+        cast(int, args.gzip_cache) * 1024 * 1024,
+        cast(bool, args.quiet),
+    )
+    host, port = server.server_address[:2]
+    print(f"Serving {args.root} on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
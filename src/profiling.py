@@ -0,0 +1,185 @@
+import cProfile
+import json
+import pstats
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import TypedDict
+
+STAGES = (
+    "read",
+    "block_parse",
+    "inline_parse",
+    "tree_build",
+    "serialize",
+    "template",
+    "write",
+)
+
+
+class FunctionStats(TypedDict):
+    function: str
+    calls: int
+    tottime: float
+    cumtime: float
+
+
+class PageProfile(TypedDict):
+    page: str
+    total: float
+    stages: dict[str, float]
+    peak_memory: int | None
+    functions: list[FunctionStats] | None
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Returns the nearest-rank percentile of the given values.
+
+    Args:
+        values (list[float]): The values, in any order.
+        fraction (float): The percentile as a fraction, e.g. 0.9 for p90.
+
+    Returns:
+        float: The percentile, or 0.0 when there are no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def top_functions(profile: cProfile.Profile, limit: int) -> list[FunctionStats]:
+    """
+    Summarizes a cProfile run as its most expensive functions by cumulative time.
+
+    Args:
+        profile (cProfile.Profile): The finished profile.
+        limit (int): Maximum number of functions to return.
+
+    Returns:
+        list[FunctionStats]: The functions, most expensive first.
+    """
+    stats = pstats.Stats(profile).stats  # pyright: ignore[reportAttributeAccessIssue, reportUnknownMemberType]
+    rows: list[FunctionStats] = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.items():  # pyright: ignore[reportUnknownVariableType]
+        rows.append(
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "tottime": tottime,
+                "cumtime": cumtime,
+            }
+        )
+    rows.sort(key=lambda row: row["cumtime"], reverse=True)
+    return rows[:limit]
+
+
+class Profiler:
+    def __init__(
+        self, cprofile: bool = False, trace_memory: bool = False, functions: int = 15
+    ) -> None:
+        """
+        Collects per-page stage timings, and optionally cProfile data and
+        tracemalloc peak memory, over a build.
+
+        Args:
+            cprofile (bool): Run each page under cProfile.
+            trace_memory (bool): Record each page's peak traced memory.
+            functions (int): Number of functions kept from each cProfile run.
+        """
+        self.cprofile: bool = cprofile
+        self.trace_memory: bool = trace_memory
+        self.functions: int = functions
+        self.pages: list[PageProfile] = []
+
+    def run(self, page: str, render: Callable[[dict[str, float]], None]) -> PageProfile:
+        """
+        Renders one page under the profiler.
+
+        Args:
+            page (str): Name of the page, usually its source path.
+            render (Callable[[dict[str, float]], None]): Renders the page, adding
+                                                         each stage's time to the
+                                                         given dict.
+
+        Returns:
+            PageProfile: The page's profile. It is not recorded; pass it to add().
+        """
+        stages = dict.fromkeys(STAGES, 0.0)
+        profile = cProfile.Profile() if self.cprofile else None
+        if self.trace_memory:
+            tracemalloc.start()
+        if profile is not None:
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            render(stages)
+        finally:
+            total = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            peak_memory = None
+            if self.trace_memory:
+                _, peak_memory = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+        return {
+            "page": page,
+            "total": total,
+            "stages": stages,
+            "peak_memory": peak_memory,
+            "functions": top_functions(profile, self.functions) if profile else None,
+        }
+
+    def add(self, page: PageProfile):
+        self.pages.append(page)
+
+    def report(self, slowest: int = 10) -> dict[str, object]:
+        """
+        Builds the build report: stage totals, percentiles and the slowest pages.
+
+        Args:
+            slowest (int): Number of slowest pages to include in full.
+
+        Returns:
+            dict[str, object]: The JSON-serializable report.
+        """
+        totals = {stage: 0.0 for stage in STAGES}
+        for page in self.pages:
+            for stage, seconds in page["stages"].items():
+                totals[stage] += seconds
+        series = {"total": [page["total"] for page in self.pages]}
+        for stage in STAGES:
+            series[stage] = [page["stages"][stage] for page in self.pages]
+        percentiles = {
+            name: {
+                "p50": percentile(values, 0.5),
+                "p90": percentile(values, 0.9),
+                "p99": percentile(values, 0.99),
+                "max": max(values, default=0.0),
+            }
+            for name, values in series.items()
+        }
+        memory = [p["peak_memory"] for p in self.pages if p["peak_memory"] is not None]
+        return {
+            "pages": len(self.pages),
+            "total": sum(series["total"]),
+            "stage_totals": totals,
+            "percentiles": percentiles,
+            "peak_memory_max": max(memory, default=None),
+            "slowest": sorted(self.pages, key=lambda p: p["total"], reverse=True)[
+                :slowest
+            ],
+        }
+
+    def write_report(self, path: str, slowest: int = 10):
+        """
+        Writes the build report as JSON.
+
+        Args:
+            path (str): Where to write the report.
+            slowest (int): Number of slowest pages to include in full.
+        """
+        with open(path, "w") as f:
+            json.dump(self.report(slowest), f, indent=2)
@@ -0,0 +1,197 @@
+import ctypes
+import errno
+import os
+import shutil
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+LOCK_NAME = ".build.lock"
+PUBLISH_MODES = ("rename", "symlink")
+# renameat2() arguments from <fcntl.h> and <linux/fs.h>.
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+def _load_renameat2() -> Callable[..., int] | None:
+    """
+    Looks up renameat2() in the C library (glibc 2.28+ on Linux).
+
+    Returns:
+        Callable[..., int] | None: The function, or None where it is missing.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    renameat2.argtypes = [
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_uint,
+    ]
+    renameat2.restype = ctypes.c_int
+    return renameat2
+
+
+_renameat2 = _load_renameat2()
+
+
+def exchange(path: str, other_path: str) -> bool:
+    """
+    Atomically swaps two existing paths with renameat2(RENAME_EXCHANGE), so
+    each name points at the other's directory in a single step.
+
+    Args:
+        path (str): A path.
+        other_path (str): The path to swap it with.
+
+    Returns:
+        bool: False if the C library, kernel or filesystem cannot exchange.
+
+    Raises:
+        OSError: If the exchange is supported but fails.
+    """
+    if _renameat2 is None:
+        return False
+    result = _renameat2(
+        AT_FDCWD, os.fsencode(path), AT_FDCWD, os.fsencode(other_path), RENAME_EXCHANGE
+    )
+    if result == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+        return False
+    raise OSError(error, os.strerror(error), path, None, other_path)
+
+
+@contextmanager
+def build_lock(path: str) -> Iterator[None]:
+    """
+    Holds an exclusive lock for the duration of a build.
+    Uses flock where available, so a crashed build never leaves a stale lock;
+    elsewhere the lock file itself is the lock.
+
+    Args:
+        path (str): Path to the lock file.
+
+    Raises:
+        RuntimeError: If another build holds the lock.
+    """
+    if fcntl is None:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise RuntimeError(f"Another build is running (lock file '{path}').")
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(path)
+        return
+
+    fd = os.open(path, os.O_CREAT | os.O_WRONLY)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise RuntimeError(f"Another build is running (lock file '{path}').")
+        yield
+    finally:
+        os.close(fd)
+
+
+def link_tree(src_dir: str, dest_dir: str):
+    """
+    Recreates src_dir at dest_dir with every file hardlinked rather than copied.
+    Files that cannot be linked are copied.
+
+    Args:
+        src_dir (str): Directory to clone; may be missing.
+        dest_dir (str): Directory to create.
+    """
+    os.makedirs(dest_dir)
+    if not os.path.isdir(src_dir):
+        return
+    for root, dirs, files in os.walk(src_dir):
+        target = os.path.join(dest_dir, os.path.relpath(root, src_dir))
+        for name in dirs:
+            os.makedirs(os.path.join(target, name), exist_ok=True)
+        for name in files:
+            try:
+                os.link(os.path.join(root, name), os.path.join(target, name))
+            except OSError:
+                _ = shutil.copy2(os.path.join(root, name), os.path.join(target, name))
+
+
+def prepare_staging(public_dir: str, mode: str) -> str:
+    """
+    Creates a staging directory holding a hardlinked clone of the published
+    build, for the next build to update in place of public_dir.
+
+    Args:
+        public_dir (str): The published directory (or symlink to it).
+        mode (str): One of PUBLISH_MODES.
+
+    Returns:
+        str: Path to the staging directory.
+    """
+    if mode == "symlink":
+        staging = os.path.join(f"{public_dir}.releases", str(time.time_ns()))
+    else:
+        staging = f"{public_dir}.staging"
+        shutil.rmtree(staging, ignore_errors=True)
+    link_tree(os.path.realpath(public_dir), staging)
+    print(f"Staging build in {staging}")
+    return staging
+
+
+def publish(staging: str, public_dir: str, mode: str, keep: int = 2):
+    """
+    Swaps a finished staging directory in as public_dir.
+    In symlink mode public_dir is a symlink replaced in a single atomic rename
+    and the newest `keep` releases are kept. In rename mode the directories
+    are exchanged atomically where renameat2() is available (Linux); elsewhere
+    the old directory is renamed away before the staging directory is renamed
+    into place, so public_dir is briefly missing and symlink mode is the one
+    to use when that matters.
+
+    Args:
+        staging (str): Path returned by prepare_staging.
+        public_dir (str): The published directory.
+        mode (str): One of PUBLISH_MODES.
+        keep (int): Number of releases kept in symlink mode.
+    """
+    old = f"{public_dir}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if mode == "symlink":
+        releases = os.path.dirname(staging)
+        link = f"{public_dir}.link-tmp"
+        if os.path.lexists(link):
+            os.remove(link)
+        parent = os.path.dirname(os.path.abspath(public_dir))
+        os.symlink(os.path.relpath(os.path.abspath(staging), parent), link)
+        if os.path.isdir(public_dir) and not os.path.islink(public_dir):
+            # First switch from a plain directory; later swaps are atomic.
+            os.rename(public_dir, old)
+        os.replace(link, public_dir)
+        for release in sorted(os.listdir(releases))[:-keep]:
+            shutil.rmtree(os.path.join(releases, release), ignore_errors=True)
+    elif os.path.isdir(public_dir) and exchange(staging, public_dir):
+        # staging now holds the previous build.
+        shutil.rmtree(staging, ignore_errors=True)
+    else:
+        if os.path.lexists(public_dir):
+            os.rename(public_dir, old)
+        os.rename(staging, public_dir)
+    shutil.rmtree(old, ignore_errors=True)
+    print(f"Published {staging} to {public_dir}")
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import re
+from enum import Enum
+from typing import TextIO
+from urllib.parse import quote, unquote
+
+from htmlnode import HTMLNode, collapse_whitespace, write_html
+
+
+class Slot(Enum):
+    CONTENT = "Content"
+    TITLE = "Title"
+
+
+# Characters of streamed page body collected before links are rewritten.
+STREAM_BUFFER_SIZE = 64 * 1024
+SLOT_PATTERN = re.compile(r"\{\{ (Content|Title) \}\}")
+LOCAL_URL_PATTERN = re.compile(r'\b(href|src)="/(?!/)([^"?#]+)')
+PRESERVED_PATTERN = re.compile(
+    r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.DOTALL | re.IGNORECASE
+)
+# A comment or a tag, whose quoted attribute values may contain '>'.
+TAG_PATTERN = re.compile(r"(<!--.*?-->|<(?:\"[^\"]*\"|'[^']*'|[^'\">])*>)", re.DOTALL)
+TAG_NAME_PATTERN = re.compile(r"</?(!?[a-zA-Z][a-zA-Z0-9-]*)")
+# Elements that start on a line of their own (or are not rendered), so the
+# whitespace beside their tags never shows.
+BLOCK_TAGS = frozenset(
+    {
+        "!doctype",
+        *("html", "head", "body", "title", "meta", "link", "base"),
+        *("address", "article", "aside", "blockquote", "details", "dialog"),
+        *("dd", "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer"),
+        *("form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hgroup", "hr"),
+        *("legend", "li", "main", "menu", "nav", "ol", "p", "pre", "section"),
+        *("summary", "table", "caption", "colgroup", "col", "thead", "tbody"),
+        *("tfoot", "tr", "th", "td", "ul"),
+    }
+)
+SELF_CLOSING_PATTERN = re.compile(
+    r"<(area|base|br|col|embed|hr|img|input|link|meta|source|track|wbr)\b"
+    + r"((?:\"[^\"]*\"|'[^']*'|[^'\">])*?)\s*/>",
+    re.IGNORECASE,
+)
+
+
+def find_local_urls(html: str) -> list[str]:
+    """
+    Finds the site paths that root-relative href and src attributes point to.
+
+    Args:
+        html (str): The HTML to search.
+
+    Returns:
+        list[str]: The decoded paths without their leading slash, query or
+                   fragment, in document order.
+    """
+    return [unquote(match.group(2)) for match in LOCAL_URL_PATTERN.finditer(html)]
+
+
+def apply_basepath(
+    html: str, basepath: str, assets: dict[str, str] | None = None
+) -> str:
+    """
+    Rewrites root-relative href and src attributes to live under the basepath.
+    With assets, those pointing at a fingerprinted static file are first
+    rewritten to its fingerprinted name.
+
+    Args:
+        html (str): The HTML to rewrite.
+        basepath (str): Base path for the site.
+        assets (dict[str, str] | None): Fingerprinted paths keyed by path (see
+                                        assets.fingerprint_assets).
+
+    Returns:
+        str: The rewritten HTML.
+    """
+    if assets:
+
+        def fingerprint(match: re.Match[str]) -> str:
+            path = assets.get(unquote(match.group(2)))
+            if path is None:
+                return match.group(0)
+            return f'{match.group(1)}="/{quote(path)}'
+
+        html = LOCAL_URL_PATTERN.sub(fingerprint, html)
+    if basepath == "/":
+        return html
+    return html.replace('href="/', f'href="{basepath}').replace(
+        'src="/', f'src="{basepath}'
+    )
+
+
+def _is_block(markup: str | None) -> bool:
+    """
+    Checks whether whitespace next to a piece of markup is insignificant.
+
+    Args:
+        markup (str | None): A tag or preserved element, or None at either end
+                             of the document.
+
+    Returns:
+        bool: True at the document's ends and for tags of BLOCK_TAGS.
+    """
+    if markup is None:
+        return True
+    match = TAG_NAME_PATTERN.match(markup)
+    return match is not None and match.group(1).lower() in BLOCK_TAGS
+
+
+def minify_markup(html: str) -> str:
+    """
+    Removes the formatting whitespace from hand-written markup. Text between
+    tags has its whitespace runs collapsed to a single space, which is dropped
+    entirely next to block-level tags (see BLOCK_TAGS), where it never renders;
+    between inline elements a single space is kept. Void elements lose their
+    self-closing slash. Tags themselves, attribute values included, and
+    preformatted elements (pre, textarea, script, style) are left untouched.
+
+    Args:
+        html (str): The markup, e.g. a template source.
+
+    Returns:
+        str: The minified markup.
+    """
+    # Alternating text and markup: tags, comments and preserved elements.
+    pieces: list[str] = []
+    preserved: set[int] = set()
+    parts = PRESERVED_PATTERN.split(html)
+    # split() yields text, then each match's two groups, then text again.
+    for i in range(0, len(parts), 3):
+        tokens = TAG_PATTERN.split(parts[i])
+        if pieces:
+            pieces[-1] += tokens[0]
+        else:
+            pieces.append(tokens[0])
+        pieces.extend(tokens[1:])
+        if i + 1 < len(parts):
+            preserved.add(len(pieces))
+            pieces.extend((parts[i + 1], ""))
+
+    minified: list[str] = []
+    for i, piece in enumerate(pieces):
+        if i in preserved:
+            minified.append(piece)
+            continue
+        if i % 2:
+            minified.append(SELF_CLOSING_PATTERN.sub(r"<\1\2>", piece))
+            continue
+        text = collapse_whitespace(piece)
+        if _is_block(pieces[i - 1] if i > 0 else None):
+            text = text.lstrip()
+        if _is_block(pieces[i + 1] if i + 1 < len(pieces) else None):
+            text = text.rstrip()
+        minified.append(text)
+    return "".join(minified)
+
+
+class Template:
+    def __init__(
+        self,
+        source: str,
+        basepath: str = "/",
+        minify: bool = False,
+        assets: dict[str, str] | None = None,
+    ) -> None:
+        """
+        Compiles template source into static segments separated by slots.
+        The basepath (and asset fingerprints) are applied to the static segments
+        once, here, so that rendering only has to rewrite the links inside the
+        page content.
+        Likewise, with minify the source is minified once here, and page bodies
+        are serialized minified as they are rendered.
+
+        Args:
+            source (str): The template source.
+            basepath (str): Base path for the site.
+            minify (bool): Emit minimal whitespace (see minify_markup and
+                           htmlnode.iter_html).
+            assets (dict[str, str] | None): Fingerprinted static file paths keyed
+                                            by path, for links to be rewritten to.
+        """
+        self.basepath: str = basepath
+        self.minify: bool = minify
+        self.assets: dict[str, str] | None = assets
+        if minify:
+            source = minify_markup(source)
+        self.segments: list[str] = []
+        self.slots: list[Slot] = []
+        last_end = 0
+        for match in SLOT_PATTERN.finditer(source):
+            self.segments.append(
+                apply_basepath(source[last_end : match.start()], basepath, assets)
+            )
+            self.slots.append(Slot(match.group(1)))
+            last_end = match.end()
+        self.segments.append(apply_basepath(source[last_end:], basepath, assets))
+
+    @classmethod
+    def from_file(
+        cls,
+        template_path: str,
+        basepath: str = "/",
+        minify: bool = False,
+        assets: dict[str, str] | None = None,
+    ) -> Template:
+        """
+        Reads and compiles a template file.
+
+        Args:
+            template_path (str): Path to the HTML template file.
+            basepath (str): Base path for the site.
+            minify (bool): Emit minimal whitespace.
+            assets (dict[str, str] | None): Fingerprinted static file paths.
+
+        Returns:
+            Template: The compiled template.
+        """
+        with open(template_path, "r") as f:
+            return cls(f.read(), basepath, minify, assets)
+
+    def _slot_values(self, content: str, title: str) -> list[str]:
+        content = apply_basepath(content, self.basepath, self.assets)
+        return [content if slot is Slot.CONTENT else title for slot in self.slots]
+
+    def render(self, content: str, title: str) -> str:
+        """
+        Renders the template with a single join.
+
+        Args:
+            content (str): The page body HTML.
+            title (str): The page title.
+
+        Returns:
+            str: The rendered page.
+        """
+        parts = [self.segments[0]]
+        for value, segment in zip(self._slot_values(content, title), self.segments[1:]):
+            parts.append(value)
+            parts.append(segment)
+        return "".join(parts)
+
+    def write(self, f: TextIO, content: str, title: str):
+        """
+        Renders the template straight into an open file.
+
+        Args:
+            f (TextIO): The file to write to.
+            content (str): The page body HTML.
+            title (str): The page title.
+        """
+        _ = f.write(self.segments[0])
+        for value, segment in zip(self._slot_values(content, title), self.segments[1:]):
+            _ = f.write(value)
+            _ = f.write(segment)
+
+    def write_node(self, f: TextIO, node: HTMLNode, title: str):
+        """
+        Renders the template straight into an open file, streaming the page
+        body from its HTMLNode tree instead of serializing it to a string first.
+        The body is buffered in blocks of about STREAM_BUFFER_SIZE characters
+        and rewritten up to the last tag that starts in the block, so a link
+        split across the serializer's chunks is still rewritten.
+
+        Args:
+            f (TextIO): The file to write to.
+            node (HTMLNode): The root of the page body.
+            title (str): The page title.
+        """
+        basepath = self.basepath
+        assets = self.assets
+        pending: list[str] = []
+        pending_size = 0
+
+        def flush_content(final: bool):
+            nonlocal pending_size
+            text = "".join(pending)
+            pending.clear()
+            # The last tag may still be open, so it waits for the next block.
+            end = len(text) if final else max(text.rfind("<"), 0)
+            _ = f.write(apply_basepath(text[:end], basepath, assets))
+            pending.append(text[end:])
+            pending_size = len(text) - end
+
+        def write_content(chunk: str):
+            nonlocal pending_size
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= STREAM_BUFFER_SIZE:
+                flush_content(final=False)
+
+        _ = f.write(self.segments[0])
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            if slot is Slot.CONTENT:
+                write_html(node, write_content, self.minify)
+                flush_content(final=True)
+            else:
+                _ = f.write(title)
+            _ = f.write(segment)
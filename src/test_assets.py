@@ -0,0 +1,171 @@
+import contextlib
+import io
+import os
+import unittest
+from typing import Any
+from unittest import mock
+
+from assets import (
+    copy_file,
+    find_duplicates,
+    fingerprint_assets,
+    fingerprint_path,
+    is_unchanged,
+    sync_directory,
+)
+from testing import TempDirTestCase
+
+
+class TestSyncDirectory(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.manifest = os.path.join(self.docs, ".assets.json")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(self.docs)
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def sync(self, use_hash: bool = False, **kwargs: Any):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sync_directory(
+                self.static, self.docs, self.manifest, use_hash, **kwargs
+            )
+
+    def test_first_sync_copies_everything(self):
+        self.assertEqual(self.sync(), (2, 0, 0))
+        with open(os.path.join(self.docs, "images", "a.png")) as f:
+            self.assertEqual(f.read(), "png")
+
+    def test_unchanged_files_are_not_copied(self):
+        _ = self.sync()
+        dest = os.path.join(self.docs, "index.css")
+        before = os.stat(dest)
+        self.assertEqual(self.sync(), (0, 2, 0))
+        after = os.stat(dest)
+        self.assertEqual(after.st_ino, before.st_ino)
+        self.assertEqual(after.st_mtime_ns, before.st_mtime_ns)
+
+    def test_changed_file_is_copied(self):
+        _ = self.sync()
+        self.write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        self.assertEqual(self.sync(), (1, 1, 0))
+        with open(os.path.join(self.docs, "index.css")) as f:
+            self.assertEqual(f.read(), "body { color: red; }")
+
+    def test_stale_assets_are_removed(self):
+        _ = self.sync()
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.write(os.path.join(self.docs, "index.html"), "<p>page</p>")
+        self.assertEqual(self.sync(), (0, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_hash_skips_touched_but_identical_files(self):
+        _ = self.sync()
+        src = os.path.join(self.static, "index.css")
+        os.utime(src, ns=(0, 1))
+        self.assertFalse(is_unchanged(src, os.path.join(self.docs, "index.css")))
+        self.assertEqual(self.sync(use_hash=True), (0, 2, 0))
+        # The hash match copied the mtime over, so a stat suffices again.
+        dest_stat = os.stat(os.path.join(self.docs, "index.css"))
+        self.assertEqual(dest_stat.st_mtime_ns, 1)
+        with mock.patch("assets.hash_file", side_effect=AssertionError):
+            self.assertEqual(self.sync(use_hash=True), (0, 2, 0))
+        self.assertEqual(self.sync(), (0, 2, 0))
+
+    def test_strategies_produce_identical_copies(self):
+        for strategy in ("copy", "kernel", "hardlink"):
+            with self.subTest(strategy=strategy):
+                dest = os.path.join(self.docs, f"{strategy}.css")
+                src = os.path.join(self.static, "index.css")
+                _ = copy_file(src, dest, strategy)
+                self.assertEqual(self.read(dest), "body {}")
+                self.assertTrue(is_unchanged(src, dest))
+
+    def test_hardlink_shares_the_source_inode(self):
+        _ = self.sync(strategy="hardlink")
+        src = os.path.join(self.static, "images", "a.png")
+        dest = os.path.join(self.docs, "images", "a.png")
+        self.assertTrue(os.path.samefile(src, dest))
+
+    def test_recopy_never_writes_through_a_hardlink(self):
+        _ = self.sync(strategy="hardlink")
+        src = os.path.join(self.static, "index.css")
+        dest = os.path.join(self.docs, "index.css")
+        _ = copy_file(os.path.join(self.static, "images", "a.png"), dest, "copy")
+        self.assertEqual(self.read(src), "body {}")
+        self.assertEqual(self.read(dest), "png")
+
+    def test_parallel_copy(self):
+        for index in range(20):
+            self.write(os.path.join(self.static, f"{index}.txt"), str(index))
+        self.assertEqual(self.sync(workers=4, strategy="kernel"), (22, 0, 0))
+        self.assertEqual(self.read(os.path.join(self.docs, "7.txt")), "7")
+
+    def test_dedupe_links_identical_files(self):
+        self.write(os.path.join(self.static, "images", "b.png"), "png")
+        self.write(os.path.join(self.static, "images", "c.png"), "gif")
+        sources = [
+            os.path.join(self.static, "images", name) for name in ("a.png", "b.png")
+        ]
+        self.assertEqual(find_duplicates(sources), {sources[1]: sources[0]})
+        self.assertEqual(self.sync(dedupe=True), (4, 0, 0))
+        images = os.path.join(self.docs, "images")
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(images, "a.png"), os.path.join(images, "b.png")
+            )
+        )
+        self.assertFalse(
+            os.path.samefile(
+                os.path.join(images, "a.png"), os.path.join(images, "c.png")
+            )
+        )
+        self.assertEqual(self.sync(dedupe=True), (0, 4, 0))
+
+    def test_fingerprint_path(self):
+        digest = "0123456789abcdef"
+        self.assertEqual(
+            fingerprint_path("index.css", digest), "index.0123456789ab.css"
+        )
+        self.assertEqual(
+            fingerprint_path("images/a.b.png", digest), "images/a.b.0123456789ab.png"
+        )
+        self.assertEqual(fingerprint_path("CNAME", digest), "CNAME.0123456789ab")
+
+    def test_fingerprinted_copies_are_published_and_replaced(self):
+        assets = fingerprint_assets(self.static)
+        self.assertEqual(sorted(assets), ["images/a.png", "index.css"])
+        _ = self.sync(fingerprints=assets)
+        css = os.path.join(self.docs, assets["index.css"])
+        self.assertTrue(os.path.samefile(css, os.path.join(self.docs, "index.css")))
+        self.assertEqual(self.sync(fingerprints=assets), (0, 2, 0))
+
+        self.write(os.path.join(self.static, "index.css"), "body { color: red; }")
+        changed = fingerprint_assets(self.static)
+        self.assertNotEqual(changed["index.css"], assets["index.css"])
+        self.assertEqual(self.sync(fingerprints=changed), (1, 1, 1))
+        self.assertFalse(os.path.exists(css))
+        self.assertEqual(
+            self.read(os.path.join(self.docs, changed["index.css"])),
+            "body { color: red; }",
+        )
+
+    def test_fingerprints_reuse_hashes_of_unchanged_files(self):
+        hashes: dict[str, list[int | str]] = {"gone.css": [1, 1, "0"]}
+        assets = fingerprint_assets(self.static, hashes)
+        self.assertEqual(sorted(hashes), ["images/a.png", "index.css"])
+        path = os.path.join(self.static, "index.css")
+        stat = os.stat(path)
+        # Same size and mtime: the recorded hash is trusted.
+        self.write(path, self.read(path).upper())
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(fingerprint_assets(self.static, hashes), assets)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertNotEqual(fingerprint_assets(self.static, hashes), assets)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,136 @@
+import contextlib
+import io
+import os
+import pickle
+import time
+import unittest
+from unittest import mock
+
+import cache as cache_module
+from cache import ParseCache, ParsedPage, RenderCache, evict_lru
+from page import generate_page, render_pages
+from testing import TempDirTestCase
+
+
+class TestParseCache(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ParseCache(os.path.join(self.root, "cache"))
+
+    def test_round_trip(self):
+        key = self.cache.key("# Title")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, ParsedPage("<div>x</div>", "Title"))
+        self.assertEqual(self.cache.get(key), ("<div>x</div>", "Title"))
+
+    def test_memory_entries_are_bounded_and_not_pickled(self):
+        cache = ParseCache(self.cache.path, memory_entries=2)
+        keys = [cache.key(str(index)) for index in range(3)]
+        for key in keys:
+            cache.put(key, ParsedPage("x", "t"))
+        self.assertEqual(list(cache.memory), keys[1:])
+        self.assertEqual(pickle.loads(pickle.dumps(cache)).memory, {})
+        os.remove(cache.entry_path(keys[2]))
+        self.assertEqual(cache.get(keys[2]), ("x", "t"))
+
+    def test_key_depends_on_parser_version(self):
+        key = self.cache.key("# Title")
+        with mock.patch.object(cache_module, "PARSER_VERSION", "other"):
+            self.assertNotEqual(self.cache.key("# Title"), key)
+
+    def test_evict_removes_least_recently_used(self):
+        keys = [self.cache.key(str(index)) for index in range(3)]
+        for offset, key in enumerate(keys):
+            self.cache.put(key, ParsedPage("x" * 100, "t"))
+            past = time.time_ns() - (10 - offset) * 1_000_000_000
+            os.utime(self.cache.entry_path(key), ns=(past, past))
+        _ = self.cache.get(keys[0])
+        self.cache.max_bytes = 2 * os.path.getsize(self.cache.entry_path(keys[0]))
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_template_change_skips_parsing(self):
+        source = os.path.join(self.root, "index.md")
+        dest = os.path.join(self.root, "out", "index.html")
+        template = os.path.join(self.root, "template.html")
+        with open(source, "w") as f:
+            _ = f.write("# Home\n\n[link](/blog)")
+        with open(template, "w") as f:
+            _ = f.write("<title>{{ Title }}</title>{{ Content }}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_page(source, template, dest, "/base/", cache=self.cache)
+            with open(template, "w") as f:
+                _ = f.write("<h1>{{ Title }}</h1>{{ Content }}")
+            with mock.patch("page.markdown_to_html_node", side_effect=AssertionError):
+                generate_page(source, template, dest, "/base/", cache=self.cache)
+        with open(dest) as f:
+            self.assertEqual(
+                f.read(),
+                '<h1>Home</h1><div><h1>Home</h1><p><a href="/base/blog">link</a></p></div>',
+            )
+
+
+class TestRenderCache(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = os.path.join(self.root, "cache")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.pages: list[tuple[str, str]] = []
+        for name in ("a", "b"):
+            source = os.path.join(self.root, f"{name}.md")
+            self.write(source, f"# {name}\n\ntext")
+            self.pages.append((source, os.path.join(self.root, "docs", f"{name}.html")))
+
+    def render(self, basepath: str = "/") -> RenderCache:
+        cache = RenderCache(self.cache_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _ = render_pages(self.pages, self.template, basepath, render_cache=cache)
+        return cache
+
+    def test_second_build_is_served_from_cache(self):
+        first = self.render()
+        self.assertEqual((first.hits, first.misses, first.stores), (0, 2, 2))
+        with open(self.pages[0][1]) as f:
+            expected = f.read()
+        os.remove(self.pages[0][1])
+        with mock.patch("page.markdown_to_html_node", side_effect=AssertionError):
+            second = self.render()
+        self.assertEqual((second.hits, second.misses, second.stores), (2, 0, 0))
+        with open(self.pages[0][1]) as f:
+            self.assertEqual(f.read(), expected)
+        self.assertIn("2 hits, 0 misses (100% hit rate)", second.report())
+
+    def test_restore_leaves_identical_pages_untouched(self):
+        _ = self.render()
+        path = self.pages[0][1]
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+        os.remove(self.pages[1][1])
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            _ = render_pages(
+                self.pages, self.template, "/", render_cache=RenderCache(self.cache_dir)
+            )
+        self.assertIn("Restored files: 1 written, 1 unchanged.", log.getvalue())
+        self.assertEqual(os.stat(path).st_mtime_ns, 1_000_000_000)
+        self.assertTrue(os.path.exists(self.pages[1][1]))
+
+    def test_key_covers_template_and_basepath(self):
+        _ = self.render()
+        self.assertEqual(self.render("/base/").misses, 2)
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.render().misses, 2)
+        self.write(self.pages[0][0], "# a\n\nchanged")
+        self.assertEqual(self.render().hits, 1)
+
+    def test_layout_is_versioned_and_prunable(self):
+        _ = self.render()
+        self.assertEqual(os.listdir(self.cache_dir), ["render-v1"])
+        self.assertEqual(evict_lru(self.cache_dir, 0), 2)
+        self.assertEqual(self.render().misses, 2)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,97 @@
+import contextlib
+import gzip
+import io
+import os
+import unittest
+
+from compress import COMPRESSORS, compress_file, compress_tree, should_compress
+from testing import TempDirTestCase
+
+
+class TestCompress(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.root, "blog"))
+        self.page = os.path.join(self.root, "blog", "index.html")
+        self.css = os.path.join(self.root, "index.css")
+        self.image = os.path.join(self.root, "logo.png")
+        self.write(self.page, "<p>hello</p>" * 100)
+        self.write(self.css, "body { color: red; }")
+        self.write(self.image, "png")
+        self.write(os.path.join(self.root, ".manifest.json"), "{}")
+
+    def compress(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return compress_tree(self.root, 2, [".gz"])
+
+    def test_should_compress(self):
+        self.assertTrue(should_compress("index.html"))
+        self.assertTrue(should_compress("index.css"))
+        self.assertTrue(should_compress("icon.svg"))
+        self.assertFalse(should_compress("logo.png"))
+        self.assertFalse(should_compress("index.html.gz"))
+
+    def test_compresses_text_outputs(self):
+        self.assertEqual(self.compress(), (2, 0, 0))
+        with gzip.open(f"{self.page}.gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 100)
+        self.assertTrue(os.path.exists(f"{self.css}.gz"))
+        self.assertFalse(os.path.exists(f"{self.image}.gz"))
+        self.assertFalse(os.path.exists(os.path.join(self.root, ".manifest.json.gz")))
+        self.assertEqual(
+            os.stat(f"{self.page}.gz").st_mtime_ns, os.stat(self.page).st_mtime_ns
+        )
+
+    def test_up_to_date_siblings_are_skipped(self):
+        _ = self.compress()
+        inode = os.stat(f"{self.css}.gz").st_ino
+        self.assertEqual(self.compress(), (0, 2, 0))
+        self.assertEqual(os.stat(f"{self.css}.gz").st_ino, inode)
+
+    def test_changed_file_is_recompressed(self):
+        _ = self.compress()
+        self.write(self.css, "body { color: blue; }")
+        os.utime(self.css, ns=(0, os.stat(self.css).st_mtime_ns + 10**9))
+        self.assertEqual(self.compress(), (1, 1, 0))
+        with gzip.open(f"{self.css}.gz", "rt") as f:
+            self.assertEqual(f.read(), "body { color: blue; }")
+
+    def test_replacement_with_older_mtime_is_recompressed(self):
+        _ = self.compress()
+        self.write(self.css, "body { color: blue; }")
+        os.utime(self.css, ns=(0, os.stat(self.css).st_mtime_ns - 10**9))
+        self.assertEqual(self.compress(), (1, 1, 0))
+        with gzip.open(f"{self.css}.gz", "rt") as f:
+            self.assertEqual(f.read(), "body { color: blue; }")
+
+    def test_orphaned_sibling_is_removed(self):
+        _ = self.compress()
+        os.unlink(self.css)
+        self.assertEqual(self.compress(), (0, 1, 1))
+        self.assertFalse(os.path.exists(f"{self.css}.gz"))
+
+    def test_compressed_files_it_did_not_write_are_kept(self):
+        data = os.path.join(self.root, "data.json.gz")
+        with open(data, "wb") as f:
+            _ = f.write(gzip.compress(b"{}"))
+        _ = self.compress()
+        self.assertEqual(self.compress(), (0, 2, 0))
+        self.assertTrue(os.path.exists(data))
+
+    def test_siblings_of_dropped_formats_are_removed(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            _ = compress_tree(self.root, 1, list(COMPRESSORS))
+        dropped = len(COMPRESSORS) - 1
+        self.assertEqual(self.compress(), (0, 2, 2 * dropped))
+        for suffix in COMPRESSORS:
+            self.assertEqual(os.path.exists(f"{self.css}{suffix}"), suffix == ".gz")
+
+    def test_optional_formats(self):
+        written = compress_file(self.css, list(COMPRESSORS))
+        self.assertEqual(written, list(COMPRESSORS))
+        for suffix in COMPRESSORS:
+            self.assertTrue(os.path.exists(f"{self.css}{suffix}"))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,40 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from corpus import generate_corpus, page_path, parse_mix
+from page import generate_pages_recursive
+
+
+class TestCorpus(unittest.TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("paragraph=3,code=1"), {"paragraph": 3, "code": 1})
+        with self.assertRaises(ValueError):
+            _ = parse_mix("table=1")
+
+    def test_page_path_depth(self):
+        self.assertEqual(page_path(7, 0), "page7.md")
+        self.assertEqual(page_path(123, 2), os.path.join("d2", "d1", "page123.md"))
+
+    def test_corpus_is_deterministic_and_builds(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            size_a = generate_corpus(a, 5, page_size=512, seed=1)
+            size_b = generate_corpus(b, 5, page_size=512, seed=1)
+            self.assertEqual(size_a, size_b)
+            with open(os.path.join(a, "content", page_path(3, 2))) as f:
+                markdown = f.read()
+            self.assertTrue(markdown.startswith("# Page 3\n\n"))
+            self.assertGreaterEqual(len(markdown), 512)
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursive(
+                    os.path.join(a, "content"),
+                    os.path.join(a, "template.html"),
+                    os.path.join(a, "docs"),
+                    "/",
+                )
+            self.assertTrue(
+                os.path.exists(os.path.join(a, "docs", "d0", "d0", "page3.html"))
+            )
@@ -0,0 +1,93 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from deps import DependencyGraph, Fingerprints, changed_dependencies, find_references
+from manifest import MANIFEST_NAME, load_manifest
+from page import generate_pages_incremental
+from testing import TempDirTestCase
+
+
+class TestFindReferences(unittest.TestCase):
+    def test_local_images_and_links(self):
+        with tempfile.TemporaryDirectory() as static:
+            os.makedirs(os.path.join(static, "images"))
+            for name in ("images/a.png", "images/b c.png", "doc.pdf"):
+                with open(os.path.join(static, name), "w") as f:
+                    _ = f.write("x")
+            markdown = (
+                "![a](/images/a.png) ![b](/images/b%20c.png?v=1) [doc](/doc.pdf#p2) "
+                + "[page](/blog/tom) [ext](https://example.com/doc.pdf) "
+                + "[rel](doc.pdf) [up](/../doc.pdf) ![missing](/images/z.png)"
+            )
+            self.assertEqual(
+                find_references(markdown, static),
+                ["doc.pdf", "images/a.png", "images/b c.png"],
+            )
+
+
+class TestDependencies(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.dest, MANIFEST_NAME)
+        os.makedirs(self.content)
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(self.dest)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+        self.write(os.path.join(self.content, "a.md"), "# A\n\n![a](/images/a.png)")
+        self.write(os.path.join(self.content, "b.md"), "# B\n\nNo images")
+
+    def build(self) -> tuple[int, int, int]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generate_pages_incremental(
+                self.content,
+                self.template,
+                self.dest,
+                "/",
+                self.manifest,
+                static_dir=self.static,
+            )
+
+    def graph(self) -> DependencyGraph:
+        return DependencyGraph(load_manifest(self.manifest))
+
+    def test_graph_records_dependencies_and_references(self):
+        _ = self.build()
+        graph = self.graph()
+        self.assertEqual(graph.affected(self.template), ["a.md", "b.md"])
+        self.assertEqual(graph.referrers, {"images/a.png": {"a.md"}})
+
+    def test_changed_image_rebuilds_no_pages(self):
+        _ = self.build()
+        self.write(os.path.join(self.static, "images", "a.png"), "new png")
+        self.assertEqual(self.build(), (0, 2, 0))
+
+    def test_changed_template_rebuilds_every_dependent(self):
+        _ = self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.build(), (2, 0, 0))
+
+    def test_changed_dependencies(self):
+        fingerprints = Fingerprints()
+        recorded = fingerprints.record([self.template])
+        self.assertEqual(
+            changed_dependencies(recorded, [self.template], fingerprints), []
+        )
+        self.assertEqual(
+            changed_dependencies({}, [self.template], fingerprints), [self.template]
+        )
+        self.assertEqual(
+            changed_dependencies({self.template: "old"}, [], fingerprints),
+            [self.template],
+        )
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
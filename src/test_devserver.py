@@ -0,0 +1,235 @@
+import contextlib
+import io
+import os
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from http.client import HTTPConnection
+from unittest import mock
+
+import utils
+from devserver import (
+    LiveReload,
+    PageRenderer,
+    format_event,
+    make_server,
+    resolve_page,
+)
+from images import ImageSizes
+from testing import TempDirTestCase
+
+
+class TestDevServer(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog", "tom"))
+        os.makedirs(self.static)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "tom", "index.md"), "# Tom")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.renderer = PageRenderer(self.content, self.template, max_entries=2)
+
+    def test_images_get_their_sizes(self):
+        self.write(os.path.join(self.static, "a.gif"), b"GIF89a\x10\x00\x08\x00")
+        source = os.path.join(self.content, "index.md")
+        self.write(source, "# Home\n\n![a](/a.gif)")
+        renderer = PageRenderer(
+            self.content, self.template, images=ImageSizes(self.static)
+        )
+        self.assertIn(b'width="16" height="8"', renderer.render(source))
+        self.assertNotIn(b"width=", self.renderer.render(source))
+
+    def test_resolve_page(self):
+        index = os.path.join(self.content, "index.md")
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        self.assertEqual(resolve_page(self.content, "/"), index)
+        self.assertEqual(resolve_page(self.content, "/index.html"), index)
+        self.assertEqual(resolve_page(self.content, "/blog/tom/?x=1"), tom)
+        self.assertEqual(resolve_page(self.content, "/blog/tom"), tom)
+        self.assertIsNone(resolve_page(self.content, "/blog/"))
+        self.assertIsNone(resolve_page(self.content, "/../content/index.md"))
+
+    def test_render_is_cached_until_the_source_changes(self):
+        source = os.path.join(self.content, "index.md")
+        with mock.patch(
+            "devserver.markdown_to_html_node",
+            wraps=utils.markdown_to_html_node,
+        ) as parse:
+            first = self.renderer.render(source)
+            self.assertEqual(self.renderer.render(source), first)
+            os.utime(source, ns=(0, 0))
+            self.assertEqual(self.renderer.render(source), first)
+            self.assertEqual(parse.call_count, 1)
+            self.write(source, "# Home\n\nChanged")
+            self.assertIn(b"Changed", self.renderer.render(source))
+            self.assertEqual(parse.call_count, 2)
+
+    def test_template_change_and_lru_bound(self):
+        pages = [
+            os.path.join(self.content, "index.md"),
+            os.path.join(self.content, "blog", "tom", "index.md"),
+        ]
+        for page in pages:
+            _ = self.renderer.render(page)
+        self.write(os.path.join(self.content, "other.md"), "# Other")
+        _ = self.renderer.render(os.path.join(self.content, "other.md"))
+        self.assertNotIn(pages[0], self.renderer.pages)
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertTrue(self.renderer.render(pages[1]).startswith(b"<h1>Tom</h1>"))
+        self.assertEqual(list(self.renderer.pages), [pages[1]])
+
+    def test_http(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            server = make_server(self.renderer, self.static, port=0)
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                base = f"http://127.0.0.1:{server.server_address[1]}"
+                with urllib.request.urlopen(f"{base}/") as response:
+                    self.assertEqual(
+                        response.headers["Content-Type"], "text/html; charset=utf-8"
+                    )
+                    self.assertIn(b"<title>Home</title>", response.read())
+                with urllib.request.urlopen(f"{base}/index.css") as response:
+                    self.assertEqual(response.read(), b"body {}")
+                connection = HTTPConnection("127.0.0.1", server.server_address[1])
+                connection.request("GET", "/blog/tom")
+                response = connection.getresponse()
+                self.assertEqual(response.status, 301)
+                self.assertEqual(response.headers["Location"], "/blog/tom/")
+                connection.close()
+                with self.assertRaises(urllib.error.HTTPError) as error:
+                    _ = urllib.request.urlopen(f"{base}/missing/")
+                self.assertEqual(error.exception.code, 404)
+                error.exception.close()
+            finally:
+                server.shutdown()
+                server.server_close()
+                thread.join()
+
+
+class TestLiveReload(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, "<body><article>{{ Content }}</article></body>")
+        self.home = os.path.join(self.content, "index.md")
+        self.blog = os.path.join(self.content, "blog", "index.md")
+        self.write(self.home, "# Home")
+        self.write(self.blog, "# Blog")
+        self.renderer = PageRenderer(self.content, self.template, "/base/")
+        self.live_reload = LiveReload(self.renderer)
+
+    def test_format_event(self):
+        self.assertEqual(
+            format_event("content", "<p>a</p>\n<p>b</p>"),
+            b"event: content\ndata: <p>a</p>\ndata: <p>b</p>\n\n",
+        )
+
+    def test_only_viewers_of_a_changed_page_are_notified(self):
+        home = self.live_reload.subscribe(self.home)
+        blog = self.live_reload.subscribe(self.blog)
+        self.live_reload.check()
+        os.utime(self.home, ns=(0, 0))
+        self.live_reload.check()
+        self.assertTrue(home.empty())
+        self.write(self.home, "# Home\n\n[link](/x)")
+        self.live_reload.check()
+        self.assertEqual(
+            home.get_nowait(),
+            ("content", '<div><h1>Home</h1><p><a href="/base/x">link</a></p></div>'),
+        )
+        self.assertTrue(blog.empty())
+        self.write(self.template, "<body><main>{{ Content }}</main></body>")
+        self.live_reload.check()
+        self.assertEqual(home.get_nowait(), ("reload", ""))
+        self.assertEqual(blog.get_nowait(), ("reload", ""))
+
+    def test_failed_render_is_retried_once_per_change(self):
+        home = self.live_reload.subscribe(self.home)
+        self.write(self.home, "No title")
+        with (
+            contextlib.redirect_stdout(io.StringIO()) as log,
+            mock.patch.object(
+                self.renderer, "render_page", wraps=self.renderer.render_page
+            ) as render_page,
+        ):
+            self.live_reload.check()
+            self.live_reload.check()
+            self.assertEqual(render_page.call_count, 1)
+            self.assertIn(f"Failed to render {self.home}", log.getvalue())
+            self.write(self.home, "# Fixed")
+            os.utime(self.home, ns=(0, 1))
+            self.live_reload.check()
+        self.assertEqual(home.get_nowait(), ("content", "<div><h1>Fixed</h1></div>"))
+
+    def test_missing_template_skips_the_poll(self):
+        home = self.live_reload.subscribe(self.home)
+        self.live_reload.check()
+        os.unlink(self.template)
+        self.write(self.home, "# Changed")
+        self.live_reload.check()
+        self.assertTrue(home.empty())
+
+    def test_run_survives_failed_checks(self):
+        with (
+            contextlib.redirect_stdout(io.StringIO()) as log,
+            mock.patch.object(
+                self.live_reload, "check", side_effect=RuntimeError("boom")
+            ) as check,
+        ):
+            self.live_reload.interval = 0.001
+            thread = threading.Thread(target=self.live_reload.run)
+            thread.start()
+            while check.call_count < 2:
+                time.sleep(0.001)
+            self.live_reload.stop()
+            thread.join()
+        self.assertIn("Live reload check failed. Reason: boom", log.getvalue())
+
+    def test_event_stream(self):
+        server = make_server(
+            self.renderer, self.root, port=0, live_reload=self.live_reload
+        )
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        self.live_reload.start()
+        port = server.server_address[1]
+        with contextlib.redirect_stderr(io.StringIO()):
+            try:
+                page = urllib.request.urlopen(f"http://127.0.0.1:{port}/blog/")
+                self.assertIn(b"EventSource", page.read())
+                page.close()
+                stream = urllib.request.urlopen(
+                    f"http://127.0.0.1:{port}/__livereload?path=/blog/"
+                )
+                self.assertEqual(stream.readline(), b"retry: 500\n")
+                _ = stream.readline()
+                saved = time.perf_counter()
+                self.write(self.blog, "# Blog\n\nNew post")
+                self.assertEqual(stream.readline(), b"event: content\n")
+                self.assertLess(time.perf_counter() - saved, 0.5)
+                self.assertIn(b"New post", stream.readline())
+                stopped = time.perf_counter()
+                self.live_reload.stop()
+                self.assertEqual(stream.read(), b"\n")
+                self.assertLess(time.perf_counter() - stopped, 0.5)
+                self.assertEqual(self.live_reload.subscribers, {})
+                stream.close()
+            finally:
+                self.live_reload.stop()
+                server.shutdown()
+                server.server_close()
+                thread.join()
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
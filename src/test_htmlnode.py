@@ -1,6 +1,16 @@
+import io
+import sys
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import (
+    HTMLNode,
+    LeafNode,
+    ParentNode,
+    iter_html,
+    new_leaf,
+    new_parent,
+    write_html,
+)
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -146,3 +156,95 @@ class TestParentNode(unittest.TestCase):
             repr(parent),
             f"ParentNode(div, [{', '.join(repr(child) for child in children)}], None)",
         )
+
+
+class TestTrustedConstruction(unittest.TestCase):
+    def test_new_leaf_matches_constructor(self):
+        node = new_leaf("a", "Link", {"href": "/x"})
+        self.assertIsInstance(node, LeafNode)
+        self.assertEqual(repr(node), repr(LeafNode("a", "Link", {"href": "/x"})))
+        self.assertIsNone(node.children)
+
+    def test_new_parent_matches_constructor(self):
+        children: list[HTMLNode] = [new_leaf("b", "Bold")]
+        node = new_parent("p", children)
+        self.assertIsInstance(node, ParentNode)
+        self.assertEqual(node.to_html(), ParentNode("p", children).to_html())
+        self.assertIsNone(node.value)
+        self.assertIsNone(node.props)
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (LeafNode("b", "x"), ParentNode("p", []), HTMLNode()):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+
+class TestSerializer(unittest.TestCase):
+    def tree(self) -> ParentNode:
+        return ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")]),
+                LeafNode("img", "", {"src": "/a.png", "alt": "a"}),
+            ],
+            {"class": "body"},
+        )
+
+    def test_iter_html_matches_to_html(self):
+        self.assertEqual(
+            "".join(iter_html(self.tree())),
+            '<div class="body"><p><b>Bold</b> text</p><img src="/a.png" alt="a"/></div>',
+        )
+
+    def test_write_html_to_stringio(self):
+        out = io.StringIO()
+        write_html(self.tree(), out.write)
+        self.assertEqual(out.getvalue(), self.tree().to_html())
+
+    def test_deep_tree_does_not_hit_recursion_limit(self):
+        node: ParentNode = ParentNode("span", [LeafNode(None, "x")])
+        depth = sys.getrecursionlimit() * 2
+        for _ in range(depth):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * (depth + 1) + "x"))
+
+    def test_errors_are_raised_while_streaming(self):
+        with self.assertRaises(ValueError):
+            _ = ParentNode("div", [LeafNode("b", None)]).to_html()  # pyright: ignore[reportArgumentType]
+        with self.assertRaises(NotImplementedError):
+            _ = ParentNode("div", [HTMLNode("p")]).to_html()
+
+
+class TestMinifiedSerializer(unittest.TestCase):
+    def test_collapses_text_and_void_tags(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode(None, "Some\n  text\u00a0\u00a0here "),
+                LeafNode("b", "bold\t text"),
+                LeafNode("img", "", {"src": "/a.png", "alt": "a  b"}),
+            ],
+        )
+        self.assertEqual(
+            "".join(iter_html(node, minify=True)),
+            '<p>Some text\u00a0\u00a0here <b>bold text</b><img src="/a.png" alt="a  b"></p>',
+        )
+
+    def test_preserves_pre_and_code(self):
+        code = "def f():\n    return  1\n"
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("pre", [ParentNode("code", [LeafNode(None, code)])]),
+                ParentNode("p", [LeafNode("code", "a  =  b"), LeafNode(None, " x  y")]),
+            ],
+        )
+        self.assertEqual(
+            "".join(iter_html(node, minify=True)),
+            f"<div><pre><code>{code}</code></pre><p><code>a  =  b</code> x y</p></div>",
+        )
+
+    def test_write_html_minified(self):
+        out = io.StringIO()
+        write_html(ParentNode("p", [LeafNode(None, "a \n b")]), out.write, True)
+        self.assertEqual(out.getvalue(), "<p>a b</p>")
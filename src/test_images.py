@@ -0,0 +1,109 @@
+import os
+import struct
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from images import ImageSizes, annotate_images, image_cache_path, read_image_size
+from testing import TempDirTestCase
+
+
+def png(width: int, height: int) -> bytes:
+    return b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR" + struct.pack(">II", width, height)
+
+
+def jpeg(width: int, height: int) -> bytes:
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc0" + struct.pack(">HBHH", 17, 8, height, width) + b"\x00" * 10
+    return b"\xff\xd8" + app0 + sof + b"\xff\xda"
+
+
+class TestReadImageSize(TempDirTestCase):
+    def size_of(self, data: bytes) -> tuple[int, int] | None:
+        self.write("image", data + b"\x00" * 64)
+        return read_image_size(os.path.join(self.root, "image"))
+
+    def test_png(self):
+        self.assertEqual(self.size_of(png(640, 480)), (640, 480))
+
+    def test_gif(self):
+        self.assertEqual(self.size_of(b"GIF89a" + struct.pack("<HH", 32, 16)), (32, 16))
+
+    def test_jpeg_skips_segments_before_frame(self):
+        self.assertEqual(self.size_of(jpeg(1024, 768)), (1024, 768))
+
+    def test_webp(self):
+        riff = b"RIFF\x00\x00\x00\x00WEBP"
+        lossy = b"VP8 \x00\x00\x00\x00\x00\x00\x00\x9d\x01\x2a" + struct.pack(
+            "<HH", 300, 200
+        )
+        bits = (300 - 1) | ((200 - 1) << 14)
+        lossless = b"VP8L\x00\x00\x00\x00\x2f" + struct.pack("<I", bits)
+        extended = (
+            b"VP8X\x00\x00\x00\x00\x00\x00\x00\x00"
+            + (300 - 1).to_bytes(3, "little")
+            + (200 - 1).to_bytes(3, "little")
+        )
+        for chunk in (lossy, lossless, extended):
+            self.assertEqual(self.size_of(riff + chunk), (300, 200))
+
+    def test_unknown_format(self):
+        self.assertIsNone(self.size_of(b"not an image"))
+
+
+class TestImageSizes(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.cache_path = os.path.join(self.root, ".cache", "images.json")
+        self.write("static/images/a.png", png(10, 20))
+        self.write("static/images/b.png", png(30, 40))
+
+    def test_get_resolves_static_urls(self):
+        sizes = ImageSizes(self.static)
+        self.assertEqual(sizes.get("/images/a.png"), (10, 20))
+        self.assertEqual(sizes.get("/images/a.png?v=1"), (10, 20))
+        self.assertIsNone(sizes.get("https://example.com/images/a.png"))
+        self.assertIsNone(sizes.get("/images/missing.png"))
+        self.assertIsNone(sizes.get("/../static/images/a.png"))
+
+    def test_sizes_are_cached_by_hash_and_saved(self):
+        sizes = ImageSizes(self.static, self.cache_path)
+        _ = sizes.get("/images/a.png")
+        self.write("static/images/copy.png", png(10, 20))
+        _ = sizes.get("/images/copy.png")
+        self.assertEqual(len(sizes.sizes), 1)
+        sizes.save()
+
+        reloaded = ImageSizes(self.static, self.cache_path)
+        self.assertEqual(reloaded.files, sizes.files)
+        self.write("static/images/a.png", png(50, 60))
+        os.utime(os.path.join(self.static, "images", "a.png"), ns=(0, 1))
+        self.assertEqual(reloaded.get("/images/a.png"), (50, 60))
+
+    def test_cache_path_is_beside_parse_cache(self):
+        self.assertEqual(
+            image_cache_path(os.path.join("build", "parse") + os.sep),
+            os.path.join("build", "parse.images.json"),
+        )
+
+    def test_annotate_images(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("img", "", {"src": "/images/a.png"})]),
+                LeafNode("img", "", {"src": "/images/b.png", "alt": "b"}),
+                LeafNode("img", "", {"src": "https://example.com/c.png"}),
+            ],
+        )
+        annotate_images(node, ImageSizes(self.static))
+        self.assertEqual(
+            node.to_html(),
+            '<div><p><img src="/images/a.png" width="10" height="20" decoding="async"/>'
+            + '</p><img src="/images/b.png" alt="b" width="30" height="40" '
+            + 'loading="lazy" decoding="async"/><img src="https://example.com/c.png" '
+            + 'loading="lazy" decoding="async"/></div>',
+        )
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -1,6 +1,20 @@
+import contextlib
+import io
+import os
 import unittest
+from unittest import mock
 
-from page import extract_title
+from assets import fingerprint_assets
+from cache import ParseCache, RenderCache
+from images import ImageSizes
+from manifest import MANIFEST_NAME, hash_file
+from page import (
+    extract_title,
+    generate_pages_incremental,
+    generate_pages_recursive,
+    render_pages,
+)
+from testing import TempDirTestCase
 
 
 class TestUtils(unittest.TestCase):
@@ -16,3 +30,292 @@ class TestUtils(unittest.TestCase):
         markdown = "#    Title with leading spaces   \n\nContent."
         title = extract_title(markdown)
         self.assertEqual(title, "Title with leading spaces")
+
+
+class TestIncrementalBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.dest, MANIFEST_NAME)
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.dest)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nText")
+
+    def build(self, jobs: int = 1, minify: bool = False) -> tuple[int, int, int]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generate_pages_incremental(
+                self.content,
+                self.template,
+                self.dest,
+                "/",
+                self.manifest,
+                jobs,
+                minify=minify,
+            )
+
+    def test_first_build_renders_everything(self):
+        self.assertEqual(self.build(), (2, 0, 0))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "post.html")))
+
+    def test_unchanged_build_renders_nothing(self):
+        _ = self.build()
+        self.assertEqual(self.build(), (0, 2, 0))
+
+    def test_changed_source_renders_only_that_page(self):
+        _ = self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        self.assertEqual(self.build(), (1, 1, 0))
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertIn("Changed", f.read())
+
+    def test_changed_template_renders_everything(self):
+        _ = self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.build(), (2, 0, 0))
+
+    def test_changed_minify_setting_renders_everything(self):
+        _ = self.build()
+        self.assertEqual(self.build(minify=True), (2, 0, 0))
+        self.assertEqual(self.build(minify=True), (0, 2, 0))
+
+    def test_fingerprinted_asset_change_rebuilds_linking_pages(self):
+        static = os.path.join(self.root, "static")
+        os.makedirs(static)
+        self.write(os.path.join(static, "a.png"), "a")
+        self.write(os.path.join(static, "b.png"), "b")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.png)")
+        self.write(self.template, '<img src="/b.png"/>{{ Content }}')
+
+        def build() -> tuple[int, int, int]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return generate_pages_incremental(
+                    self.content,
+                    self.template,
+                    self.dest,
+                    "/",
+                    self.manifest,
+                    static_dir=static,
+                    assets=fingerprint_assets(static),
+                )
+
+        self.assertEqual(build(), (2, 0, 0))
+        with open(os.path.join(self.dest, "index.html")) as f:
+            html = f.read()
+        assets = fingerprint_assets(static)
+        self.assertIn(f'src="/{assets["a.png"]}"', html)
+        self.assertIn(f'src="/{assets["b.png"]}"', html)
+        self.assertEqual(build(), (0, 2, 0))
+        self.write(os.path.join(static, "a.png"), "changed")
+        self.assertEqual(build(), (1, 1, 0))
+        self.write(os.path.join(static, "b.png"), "changed")
+        self.assertEqual(build(), (2, 0, 0))
+
+    def test_image_size_change_rebuilds_embedding_page(self):
+        static = os.path.join(self.root, "static")
+        os.makedirs(static)
+        image = os.path.join(static, "a.gif")
+        with open(image, "wb") as f:
+            _ = f.write(b"GIF89a\x10\x00\x08\x00")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.gif)")
+
+        def build() -> tuple[int, int, int]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return generate_pages_incremental(
+                    self.content,
+                    self.template,
+                    self.dest,
+                    "/",
+                    self.manifest,
+                    static_dir=static,
+                    images=ImageSizes(static),
+                )
+
+        self.assertEqual(build(), (2, 0, 0))
+        self.assertEqual(build(), (0, 2, 0))
+        with open(image, "wb") as f:
+            _ = f.write(b"GIF89a\x20\x00\x08\x00")
+        self.assertEqual(build(), (1, 1, 0))
+        with open(os.path.join(self.dest, "index.html")) as f:
+            self.assertIn('width="32" height="8"', f.read())
+
+    def test_unchanged_images_are_not_hashed_again(self):
+        static = os.path.join(self.root, "static")
+        self.write(os.path.join(static, "a.gif"), b"GIF89a\x10\x00\x08\x00")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.gif)")
+        images = ImageSizes(static)
+
+        def build() -> tuple[int, int, int]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return generate_pages_incremental(
+                    self.content,
+                    self.template,
+                    self.dest,
+                    "/",
+                    self.manifest,
+                    static_dir=static,
+                    images=images,
+                )
+
+        self.assertEqual(build(), (2, 0, 0))
+        with mock.patch("deps.hash_file", wraps=hash_file) as hashed:
+            self.assertEqual(build(), (0, 2, 0))
+        self.assertEqual(hashed.call_args_list, [mock.call(self.template)])
+
+    def test_removed_source_removes_output(self):
+        _ = self.build()
+        os.unlink(os.path.join(self.content, "blog", "post.md"))
+        self.assertEqual(self.build(), (0, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_missing_output_is_regenerated(self):
+        _ = self.build()
+        os.unlink(os.path.join(self.dest, "index.html"))
+        self.assertEqual(self.build(), (1, 1, 0))
+
+    def test_hardlinked_output_is_replaced_not_modified(self):
+        _ = self.build()
+        output = os.path.join(self.dest, "index.html")
+        previous = os.path.join(self.root, "previous.html")
+        os.link(output, previous)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        _ = self.build()
+        with open(previous) as f:
+            self.assertIn("Welcome", f.read())
+        self.assertFalse(os.path.samefile(output, previous))
+
+    def test_failed_page_is_not_recorded(self):
+        self.write(os.path.join(self.content, "broken.md"), "No title")
+        with self.assertRaises(RuntimeError):
+            _ = self.build(jobs=2)
+        self.write(os.path.join(self.content, "broken.md"), "# Fixed")
+        self.assertEqual(self.build(), (1, 2, 0))
+
+
+class TestParallelBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(self.content)
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for i in range(6):
+            self.write(
+                os.path.join(self.content, f"page{i}.md"), f"# Page {i}\n\nBody {i}"
+            )
+
+    def test_parallel_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, serial, "/")
+            generate_pages_recursive(self.content, self.template, self.dest, "/", 3)
+        for i in range(6):
+            with (
+                open(os.path.join(serial, f"page{i}.html")) as a,
+                open(os.path.join(self.dest, f"page{i}.html")) as b,
+            ):
+                self.assertEqual(a.read(), b.read())
+
+    def test_log_output_is_ordered(self):
+        pages = [
+            (os.path.join(self.content, f"page{i}.md"), f"{self.dest}/page{i}.html")
+            for i in range(6)
+        ]
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            failures = render_pages(pages, self.template, "/", jobs=3)
+        self.assertEqual(failures, [])
+        generated = [
+            line for line in log.getvalue().splitlines() if line.startswith("Page")
+        ]
+        self.assertEqual(generated, [f"Page generated at {dest}" for _, dest in pages])
+
+    def test_failing_page_does_not_abort_the_batch(self):
+        with open(os.path.join(self.content, "page2.md"), "w") as f:
+            _ = f.write("No title")
+        pages = [
+            (os.path.join(self.content, f"page{i}.md"), f"{self.dest}/page{i}.html")
+            for i in range(6)
+        ]
+        for jobs in (1, 3):
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                failures = render_pages(pages, self.template, "/", jobs=jobs)
+            self.assertEqual(
+                failures,
+                [
+                    (
+                        pages[2][0],
+                        "ValueError: No top-level heading found in the markdown "
+                        + "content.",
+                    )
+                ],
+            )
+            self.assertIn(f"Failed to generate page from {pages[2][0]}", log.getvalue())
+            self.assertIn("Output files: 5 written, 0 unchanged.", log.getvalue())
+            for _, dest_path in pages[:2] + pages[3:]:
+                os.unlink(dest_path)
+
+    def test_failed_write_is_reported_against_its_page(self):
+        pages = [
+            (os.path.join(self.content, f"page{i}.md"), f"{self.dest}/page{i}.html")
+            for i in range(6)
+        ]
+        os.makedirs(pages[2][1])
+        for cache in (None, ParseCache(os.path.join(self.root, "cache"))):
+            with contextlib.redirect_stdout(io.StringIO()):
+                failures = render_pages(pages, self.template, "/", cache=cache)
+            self.assertEqual([from_path for from_path, _ in failures], [pages[2][0]])
+            self.assertIn("IsADirectoryError", failures[0][1])
+            self.assertFalse([n for n in os.listdir(self.dest) if n.endswith(".tmp")])
+        render_cache = RenderCache(os.path.join(self.root, "render"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            _ = render_pages(pages, self.template, "/", render_cache=render_cache)
+        self.assertEqual(render_cache.stores, 5)
+
+    def test_parallel_build_fills_image_cache(self):
+        static = os.path.join(self.root, "static")
+        os.makedirs(static)
+        with open(os.path.join(static, "a.gif"), "wb") as f:
+            _ = f.write(b"GIF89a\x10\x00\x08\x00")
+        with open(os.path.join(self.content, "page0.md"), "a") as f:
+            _ = f.write("\n\n![a](/a.gif)")
+        images = ImageSizes(static)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                self.content, self.template, self.dest, "/", 3, images=images
+            )
+        self.assertEqual(list(images.files), ["a.gif"])
+        self.assertEqual(list(images.sizes.values()), [[16, 8]])
+        with open(os.path.join(self.dest, "page0.html")) as f:
+            self.assertIn('width="16" height="8"', f.read())
+
+    def test_rebuild_leaves_identical_pages_untouched(self):
+        for jobs in (1, 3):
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursive(self.content, self.template, self.dest, "/")
+            path = os.path.join(self.dest, "page0.html")
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+            with open(os.path.join(self.content, "page1.md"), "a") as f:
+                _ = f.write(f" {jobs}")
+            log = io.StringIO()
+            with contextlib.redirect_stdout(log):
+                generate_pages_recursive(
+                    self.content, self.template, self.dest, "/", jobs
+                )
+            self.assertIn("Output files: 1 written, 5 unchanged.", log.getvalue())
+            self.assertEqual(os.stat(path).st_mtime_ns, 1_000_000_000)
+
+    def test_bad_page_does_not_stop_batch(self):
+        with open(os.path.join(self.content, "page3.md"), "w") as f:
+            _ = f.write("No title")
+        with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(RuntimeError):
+            generate_pages_recursive(self.content, self.template, self.dest, "/", 2)
+        for i in (0, 1, 2, 4, 5):
+            self.assertTrue(os.path.exists(os.path.join(self.dest, f"page{i}.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "page3.html")))
@@ -0,0 +1,116 @@
+import gzip
+import os
+import threading
+import unittest
+from http.client import HTTPConnection, HTTPResponse
+
+from preview import accepts_gzip, make_server, parse_range
+from testing import TempDirTestCase
+
+
+class TestHeaders(unittest.TestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=50-500", 100), (50, 99))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        self.assertIsNone(parse_range("bytes=9-0", 100))
+        self.assertIsNone(parse_range("items=0-9", 100))
+        with self.assertRaises(ValueError):
+            _ = parse_range("bytes=100-", 100)
+
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip("gzip, deflate, br"))
+        self.assertTrue(accepts_gzip("br;q=1.0, gzip;q=0.8"))
+        self.assertFalse(accepts_gzip("gzip;q=0"))
+        self.assertFalse(accepts_gzip("identity"))
+
+
+class TestPreviewServer(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.root, "blog"))
+        self.html = b"<html>" + b"hello " * 200 + b"</html>"
+        self.write("index.html", self.html)
+        self.write("blog/index.html", b"<p>blog</p>")
+        self.write("image.png", bytes(range(256)) * 4)
+        self.server = make_server(self.root, port=0, workers=4, quiet=True)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.connection = HTTPConnection("127.0.0.1", self.server.server_address[1])
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def get(self, path: str, **headers: str) -> tuple[HTTPResponse, bytes]:
+        headers = {name.replace("_", "-"): value for name, value in headers.items()}
+        self.connection.request("GET", path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_keep_alive_and_conditional_get(self):
+        response, body = self.get("/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.html)
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+        self.assertFalse(etag.startswith("W/"))
+        response, body = self.get("/index.html", If_None_Match=etag)
+        self.assertEqual((response.status, body), (304, b""))
+        response, _ = self.get("/index.html", If_Modified_Since=last_modified)
+        self.assertEqual(response.status, 304)
+        response, _ = self.get("/index.html", If_None_Match='"other"')
+        self.assertEqual(response.status, 200)
+
+    def test_gzip_on_the_fly_and_precompressed(self):
+        response, body = self.get("/", Accept_Encoding="gzip")
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["Vary"], "Accept-Encoding")
+        etag = response.headers["ETag"]
+        self.assertTrue(etag.endswith('-gzip"'))
+        self.assertEqual(gzip.decompress(body), self.html)
+        self.write("index.html.gz", gzip.compress(b"from sibling"))
+        gz = os.path.join(self.root, "index.html.gz")
+        mtime = os.stat(os.path.join(self.root, "index.html")).st_mtime_ns
+        for stale in (mtime - 10**9, mtime + 10**9):
+            os.utime(gz, ns=(stale, stale))
+            response, body = self.get("/", Accept_Encoding="gzip")
+            self.assertEqual(gzip.decompress(body), self.html)
+        os.utime(gz, ns=(mtime, mtime))
+        response, body = self.get("/", Accept_Encoding="gzip")
+        self.assertEqual(gzip.decompress(body), b"from sibling")
+        sibling = os.stat(gz)
+        self.assertEqual(
+            response.headers["ETag"],
+            f'"{sibling.st_size:x}-{sibling.st_mtime_ns:x}-gz"',
+        )
+        response, _ = self.get("/", Accept_Encoding="gzip", If_None_Match=etag)
+        self.assertEqual(response.status, 200)
+        response, _ = self.get("/image.png", Accept_Encoding="gzip")
+        self.assertIsNone(response.headers["Content-Encoding"])
+
+    def test_range_requests(self):
+        response, body = self.get("/image.png", Range="bytes=10-19")
+        self.assertEqual(response.status, 206)
+        self.assertEqual(response.headers["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(body, bytes(range(10, 20)))
+        response, _ = self.get("/image.png", Range="bytes=5000-")
+        self.assertEqual(response.status, 416)
+        response, body = self.get("/image.png", Range="bytes=0-9", If_Range='"stale"')
+        self.assertEqual((response.status, len(body)), (200, 1024))
+
+    def test_directories_and_missing_files(self):
+        response, _ = self.get("/blog")
+        self.assertEqual(response.status, 301)
+        self.assertEqual(response.headers["Location"], "/blog/")
+        self.assertEqual(self.get("/blog/")[1], b"<p>blog</p>")
+        self.assertEqual(self.get("/missing.html")[0].status, 404)
+        self.assertEqual(self.get("/../etc/passwd")[0].status, 404)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,68 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from page import generate_page
+from profiling import STAGES, Profiler, percentile
+from template import Template
+
+
+class TestProfiling(unittest.TestCase):
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 0.5), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile([3.0], 0.9), 3.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_generate_page_records_every_stage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "index.md")
+            with open(source, "w") as f:
+                _ = f.write("# Title\n\nSome **bold** text\n\n- a\n- b")
+            dest = os.path.join(tmp, "out", "index.html")
+            profiler = Profiler(cprofile=True, trace_memory=True, functions=5)
+            with contextlib.redirect_stdout(io.StringIO()):
+                profile = profiler.run(
+                    source,
+                    lambda stats: generate_page(
+                        source,
+                        "template.html",
+                        dest,
+                        "/",
+                        Template("{{ Content }}"),
+                        stats,
+                    ),
+                )
+            with open(dest) as f:
+                self.assertEqual(
+                    f.read(),
+                    "<div><h1>Title</h1><p>Some <b>bold</b> text</p>"
+                    + "<ul><li>a</li><li>b</li></ul></div>",
+                )
+        self.assertEqual(set(profile["stages"]), set(STAGES))
+        self.assertTrue(all(seconds >= 0 for seconds in profile["stages"].values()))
+        self.assertGreaterEqual(profile["total"], sum(profile["stages"].values()))
+        self.assertIsNotNone(profile["peak_memory"])
+        self.assertIsNotNone(profile["functions"])
+        self.assertLessEqual(len(profile["functions"] or []), 5)
+
+    def test_report_lists_slowest_pages(self):
+        profiler = Profiler()
+        for name, seconds in (("a", 0.1), ("b", 0.3), ("c", 0.2)):
+            profiler.add(
+                {
+                    "page": name,
+                    "total": seconds,
+                    "stages": {stage: seconds / len(STAGES) for stage in STAGES},
+                    "peak_memory": None,
+                    "functions": None,
+                }
+            )
+        report = profiler.report(slowest=2)
+        self.assertEqual(report["pages"], 3)
+        self.assertAlmostEqual(report["total"], 0.6)  # pyright: ignore[reportArgumentType]
+        slowest = report["slowest"]
+        self.assertEqual([p["page"] for p in slowest], ["b", "c"])  # pyright: ignore[reportGeneralTypeIssues, reportUnknownVariableType]
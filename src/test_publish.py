@@ -0,0 +1,89 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from publish import build_lock, exchange, link_tree, prepare_staging, publish
+from testing import TempDirTestCase
+
+
+class TestBuildLock(unittest.TestCase):
+    def test_second_build_is_refused(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, ".build.lock")
+            with build_lock(path), self.assertRaises(RuntimeError), build_lock(path):
+                pass
+            with build_lock(path):
+                pass
+
+
+class TestPublish(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.docs = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.docs, "blog"))
+        self.write(os.path.join(self.docs, "index.html"), "old")
+        self.write(os.path.join(self.docs, "blog", "index.html"), "blog")
+
+    def stage(self, mode: str) -> str:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return prepare_staging(self.docs, mode)
+
+    def swap(self, staging: str, mode: str):
+        with contextlib.redirect_stdout(io.StringIO()):
+            publish(staging, self.docs, mode)
+
+    def test_link_tree_hardlinks_files(self):
+        clone = os.path.join(self.root, "clone")
+        link_tree(self.docs, clone)
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(self.docs, "blog", "index.html"),
+                os.path.join(clone, "blog", "index.html"),
+            )
+        )
+
+    def test_rename_publish(self):
+        staging = self.stage("rename")
+        self.write(os.path.join(staging, "new.html"), "new")
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "new.html")))
+        self.swap(staging, "rename")
+        self.assertFalse(os.path.exists(staging))
+        self.assertEqual(self.read(os.path.join(self.docs, "new.html")), "new")
+        self.assertEqual(
+            self.read(os.path.join(self.docs, "blog", "index.html")), "blog"
+        )
+
+    def test_exchange_swaps_directories(self):
+        other = os.path.join(self.root, "other")
+        os.makedirs(other)
+        self.write(os.path.join(other, "index.html"), "other")
+        if not exchange(other, self.docs):
+            self.skipTest("renameat2(RENAME_EXCHANGE) is not supported here")
+        self.assertEqual(self.read(os.path.join(self.docs, "index.html")), "other")
+        self.assertEqual(self.read(os.path.join(other, "index.html")), "old")
+
+    def test_rename_publish_without_exchange(self):
+        staging = self.stage("rename")
+        self.write(os.path.join(staging, "new.html"), "new")
+        with mock.patch("publish.exchange", return_value=False):
+            self.swap(staging, "rename")
+        self.assertFalse(os.path.exists(staging))
+        self.assertFalse(os.path.exists(f"{self.docs}.old"))
+        self.assertEqual(self.read(os.path.join(self.docs, "new.html")), "new")
+
+    def test_symlink_publish_keeps_recent_releases(self):
+        for version in ("v1", "v2", "v3"):
+            staging = self.stage("symlink")
+            self.write(os.path.join(staging, "index.html"), version)
+            self.swap(staging, "symlink")
+            self.assertTrue(os.path.islink(self.docs))
+            self.assertEqual(self.read(os.path.join(self.docs, "index.html")), version)
+        self.assertEqual(len(os.listdir(f"{self.docs}.releases")), 2)
+        self.assertFalse(os.path.exists(f"{self.docs}.old"))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
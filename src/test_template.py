@@ -0,0 +1,155 @@
+import io
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import (
+    STREAM_BUFFER_SIZE,
+    Slot,
+    Template,
+    apply_basepath,
+    find_local_urls,
+    minify_markup,
+)
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compile_segments_and_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(template.segments, ["<title>", "</title><main>", "</main>"])
+        self.assertEqual(template.slots, [Slot.TITLE, Slot.CONTENT])
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        self.assertEqual(
+            template.render("<p>Body</p>", "Hello"), "<title>Hello</title><p>Body</p>"
+        )
+
+    def test_render_repeated_slot(self):
+        template = Template("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render("", "T"), "T|T")
+
+    def test_basepath_applied_to_template_and_content(self):
+        template = Template('<link href="/index.css"/>{{ Content }}', basepath="/site/")
+        self.assertEqual(template.segments[0], '<link href="/site/index.css"/>')
+        self.assertEqual(
+            template.render('<img src="/a.png"/><a href="/b">b</a>', "T"),
+            '<link href="/site/index.css"/><img src="/site/a.png"/><a href="/site/b">b</a>',
+        )
+
+    def test_basepath_not_applied_to_title(self):
+        template = Template("{{ Title }}", basepath="/site/")
+        self.assertEqual(template.render("", 'href="/x'), 'href="/x')
+
+    def test_write_matches_render(self):
+        template = Template(
+            '<a href="/">{{ Title }}</a>{{ Content }}!', basepath="/site/"
+        )
+        out = io.StringIO()
+        template.write(out, '<a href="/x">x</a>', "T")
+        self.assertEqual(out.getvalue(), template.render('<a href="/x">x</a>', "T"))
+
+    def test_apply_basepath_root_is_noop(self):
+        html = '<a href="/x">x</a>'
+        self.assertIs(apply_basepath(html, "/"), html)
+
+    def test_write_node_matches_render(self):
+        template = Template("<t>{{ Title }}</t>{{ Content }}", basepath="/site/")
+        node = ParentNode("div", [LeafNode("a", "x", {"href": "/x"})])
+        out = io.StringIO()
+        template.write_node(out, node, "T")
+        self.assertEqual(out.getvalue(), template.render(node.to_html(), "T"))
+
+    def test_write_node_rewrites_links_split_across_chunks(self):
+        template = Template("{{ Content }}", basepath="/site/")
+        text = "x" * (STREAM_BUFFER_SIZE - 5)
+        node = ParentNode(
+            "div",
+            [
+                LeafNode(None, f'{text}<a href="'),
+                LeafNode(None, '/x">x</a><img src='),
+                LeafNode(None, '"/y.png"/>'),
+            ],
+        )
+        out = io.StringIO()
+        template.write_node(out, node, "T")
+        self.assertEqual(out.getvalue(), template.render(node.to_html(), "T"))
+        self.assertIn('href="/site/x"', out.getvalue())
+
+    def test_find_local_urls(self):
+        html = (
+            '<a href="/blog/my%20post?x=1">a</a><img src="/images/a.png"/>'
+            + '<a href="https://example.com/x">b</a><img src="//cdn/b.png"/>'
+        )
+        self.assertEqual(find_local_urls(html), ["blog/my post", "images/a.png"])
+
+    def test_fingerprinted_assets_rewritten_with_basepath(self):
+        assets = {
+            "index.css": "index.abc.css",
+            "images/my pic.png": "images/my pic.def.png",
+        }
+        template = Template(
+            '<link href="/index.css"/>{{ Content }}', basepath="/site/", assets=assets
+        )
+        self.assertEqual(template.segments[0], '<link href="/site/index.abc.css"/>')
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("img", "", {"src": "/images/my%20pic.png", "alt": "a"}),
+                LeafNode("a", "home", {"href": "/index.css#top"}),
+                LeafNode("a", "post", {"href": "/blog/post"}),
+            ],
+        )
+        expected = (
+            '<link href="/site/index.abc.css"/><p>'
+            + '<img src="/site/images/my%20pic.def.png" alt="a"/>'
+            + '<a href="/site/index.abc.css#top">home</a>'
+            + '<a href="/site/blog/post">post</a></p>'
+        )
+        self.assertEqual(template.render(node.to_html(), "T"), expected)
+        out = io.StringIO()
+        template.write_node(out, node, "T")
+        self.assertEqual(out.getvalue(), expected)
+        self.assertEqual(apply_basepath('<a href="/x">', "/", assets), '<a href="/x">')
+
+
+class TestMinify(unittest.TestCase):
+    def test_minify_markup(self):
+        source = (
+            '<!doctype html>\n<html>\n  <head>\n    <meta charset="utf-8" />\n'
+            "  </head>\n  <body>\n    <p>Hello   <b>world</b></p>\n"
+            "    <pre>  keep\n    this  </pre>\n  </body>\n</html>\n"
+        )
+        self.assertEqual(
+            minify_markup(source),
+            '<!doctype html><html><head><meta charset="utf-8"></head><body>'
+            + "<p>Hello <b>world</b></p><pre>  keep\n    this  </pre></body></html>",
+        )
+
+    def test_minify_markup_keeps_attributes_and_inline_spaces(self):
+        source = (
+            '<div>\n  <a title="a   b\n c" href="/x">one</a>\n  <a>two</a>\n'
+            '  <img alt="x > y" src="/i.png" />\n  <pre><br/></pre>\n</div>\n'
+            "<!-- note -->\n<span>three</span>\n"
+        )
+        self.assertEqual(
+            minify_markup(source),
+            '<div><a title="a   b\n c" href="/x">one</a> <a>two</a> '
+            + '<img alt="x > y" src="/i.png"><pre><br/></pre></div>'
+            + "<!-- note --> <span>three</span>",
+        )
+
+    def test_minified_template_renders_minified_body(self):
+        template = Template(
+            '<head>\n  <link href="/a.css" />\n</head>\n<main>{{ Content }}</main>\n',
+            "/site/",
+            minify=True,
+        )
+        node = ParentNode(
+            "p", [LeafNode(None, "a  b"), LeafNode("img", "", {"src": "/i.png"})]
+        )
+        out = io.StringIO()
+        template.write_node(out, node, "T")
+        self.assertEqual(
+            out.getvalue(),
+            '<head><link href="/site/a.css"></head><main><p>a b<img src="/site/i.png"></p></main>',
+        )
@@ -17,6 +17,9 @@ class TestTextNode(unittest.TestCase):
         node3 = TextNode("Node 1", TextType.ITALIC)
         self.assertNotEqual(node, node3)
 
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(TextNode("x", TextType.TEXT), "__dict__"))
+
     def test_repr(self):
         node = TextNode("This is a text node", TextType.BOLD)
         self.assertEqual(repr(node), "TextNode(This is a text node, BOLD, None)")
@@ -2,16 +2,19 @@ import unittest
 
 from textnode import TextNode, TextType
 from utils import (
+    Block,
     BlockType,
     block_to_block_type,
     extract_markdown_images,
     extract_markdown_links,
+    lex_blocks,
     markdown_to_blocks,
     markdown_to_html_node,
     split_nodes_delimiter,
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes,
+    text_to_textnodes_legacy,
 )
 
 
@@ -501,6 +504,53 @@ class TestUtils(unittest.TestCase):
             ],
         )
 
+    def test_text_to_textnodes_empty(self):
+        self.assertEqual(text_to_textnodes(""), [])
+
+    def test_text_to_textnodes_unclosed_delimiter(self):
+        self.assertEqual(
+            text_to_textnodes("a **b"),
+            [TextNode("a ", TextType.TEXT), TextNode("b", TextType.BOLD)],
+        )
+
+    def test_text_to_textnodes_nested_delimiters(self):
+        self.assertEqual(
+            text_to_textnodes("**bold _not italic_** and _a **b** c_"),
+            [
+                TextNode("bold _not italic_", TextType.BOLD),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("a ", TextType.ITALIC),
+                TextNode("b", TextType.BOLD),
+                TextNode(" c", TextType.TEXT),
+            ],
+        )
+
+    def test_text_to_textnodes_link_does_not_swallow_image(self):
+        self.assertEqual(
+            text_to_textnodes("[x ![c](d)"),
+            [TextNode("[x ", TextType.TEXT), TextNode("c", TextType.IMAGE, "d")],
+        )
+
+    def test_text_to_textnodes_matches_legacy(self):
+        samples = [
+            "This is **text** with an _italic_ word and a `code block`",
+            "~~strike~~ and __under__ and *star* ~ tilde",
+            "***triple*** ____four____ ``",
+            "![](empty-alt) [a](b)[c](d) ![e](f)",
+            "[broken](link and ![img](x)](y)",
+            "_a [link](b) c_ **d ![e](f) g**",
+            "`code with **stars**` then **bold with `code`**",
+        ]
+        for text in samples:
+            with self.subTest(text=text):
+                self.assertEqual(
+                    text_to_textnodes(text), text_to_textnodes_legacy(text)
+                )
+                self.assertEqual(
+                    text_to_textnodes(text, legacy=True),
+                    text_to_textnodes_legacy(text),
+                )
+
     def test_markdown_to_blocks_basic(self):
         md = """
 This is **bolded** paragraph
@@ -581,6 +631,83 @@ This is the same paragraph on a new line
         block_type = block_to_block_type(block)
         self.assertEqual(block_type, BlockType.paragraph)
 
+    def test_lex_blocks(self):
+        md = """
+# Title
+
+Paragraph on
+two lines
+
+> A quote
+
+- one
+- two
+
+1. first
+2. second
+
+```python
+print("hi")
+```
+"""
+        self.assertEqual(
+            lex_blocks(md),
+            [
+                Block(BlockType.heading, "Title", level=1),
+                Block(BlockType.paragraph, "Paragraph on two lines"),
+                Block(BlockType.quote, "A quote"),
+                Block(BlockType.unordered_list, items=("one", "two")),
+                Block(BlockType.ordered_list, items=("first", "second")),
+                Block(BlockType.code, 'print("hi")\n', language="python"),
+            ],
+        )
+
+    def test_lex_blocks_empty(self):
+        self.assertEqual(lex_blocks(""), [])
+        self.assertEqual(lex_blocks("\n  \n\n"), [])
+
+    def test_lex_blocks_fence_with_blank_lines(self):
+        md = "```\nfirst\n\nsecond\n```\n\nAfter"
+        self.assertEqual(
+            lex_blocks(md),
+            [
+                Block(BlockType.code, "first\n\nsecond\n"),
+                Block(BlockType.paragraph, "After"),
+            ],
+        )
+
+    def test_lex_blocks_closing_fence_ends_block_without_blank_line(self):
+        md = "```\ncode\n```\nAfter fence\n\nNext"
+        self.assertEqual(
+            lex_blocks(md),
+            [
+                Block(BlockType.code, "code\n"),
+                Block(BlockType.paragraph, "After fence"),
+                Block(BlockType.paragraph, "Next"),
+            ],
+        )
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><pre><code>code\n</code></pre><p>After fence</p><p>Next</p></div>",
+        )
+
+    def test_lex_blocks_unclosed_fence_is_verbatim(self):
+        md = "```\nno end\n\nParagraph"
+        self.assertEqual(
+            lex_blocks(md),
+            [
+                Block(BlockType.code, "```\nno end"),
+                Block(BlockType.paragraph, "Paragraph"),
+            ],
+        )
+
+    def test_markdown_to_html_node_codeblock_with_blank_lines(self):
+        md = "```\ndef f():\n\n    return 1\n```"
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            "<div><pre><code>def f():\n\n    return 1\n</code></pre></div>",
+        )
+
     def test_markdown_to_html_node_paragraphs(self):
         md = """
 This is **bolded** paragraph
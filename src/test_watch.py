@@ -0,0 +1,63 @@
+import contextlib
+import io
+import os
+import threading
+import time
+import unittest
+
+from testing import TempDirTestCase
+from watch import changed_paths, snapshot, watch
+
+
+class TestWatch(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(self.content)
+        self.write(os.path.join(self.content, "a.md"), "# A")
+        self.write(self.template, "{{ Content }}")
+
+    def test_changed_paths(self):
+        before = snapshot([self.content, self.template])
+        self.write(os.path.join(self.content, "b.md"), "# B")
+        self.write(self.template, "<main>{{ Content }}</main>")
+        os.remove(os.path.join(self.content, "a.md"))
+        self.assertEqual(
+            changed_paths(before, snapshot([self.content, self.template])),
+            [
+                os.path.join(self.content, "a.md"),
+                os.path.join(self.content, "b.md"),
+                self.template,
+            ],
+        )
+
+    def test_burst_of_changes_triggers_one_rebuild(self):
+        rebuilds: list[list[str]] = []
+
+        def edit():
+            time.sleep(0.05)
+            for index in range(3):
+                self.write(os.path.join(self.content, f"new{index}.md"), "# New")
+                time.sleep(0.02)
+
+        thread = threading.Thread(target=edit)
+        thread.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            watch(
+                [self.content, self.template],
+                rebuilds.append,
+                interval=0.02,
+                debounce=0.15,
+                max_rebuilds=1,
+            )
+        thread.join()
+        self.assertEqual(len(rebuilds), 1)
+        self.assertEqual(
+            rebuilds[0],
+            [os.path.join(self.content, f"new{index}.md") for index in range(3)],
+        )
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,112 @@
+import os
+import unittest
+from typing import TextIO
+
+from testing import TempDirTestCase
+from writer import OutputWriter, files_identical, is_identical
+
+
+class TestOutputWriter(TempDirTestCase):
+    def test_is_identical(self):
+        path = os.path.join(self.root, "a.html")
+        self.assertFalse(is_identical(path, b"abc"))
+        with open(path, "wb") as f:
+            _ = f.write(b"abc")
+        self.assertTrue(is_identical(path, b"abc"))
+        self.assertFalse(is_identical(path, b"abd"))
+        self.assertFalse(is_identical(path, b"abcd"))
+
+    def test_files_identical(self):
+        paths = [os.path.join(self.root, name) for name in ("a", "b", "c")]
+        for path, data in zip(paths, (b"abc" * 50_000, b"abc" * 50_000, b"abd")):
+            with open(path, "wb") as f:
+                _ = f.write(data)
+        self.assertTrue(files_identical(paths[0], paths[1]))
+        self.assertFalse(files_identical(paths[0], paths[2]))
+        self.assertFalse(files_identical(paths[0], os.path.join(self.root, "d")))
+
+    def test_streamed_output_is_discarded_when_identical(self):
+        path = os.path.join(self.root, "blog", "index.html")
+        writer = OutputWriter(threads=0)
+        self.assertTrue(writer.write_stream(path, lambda f: f.write("same")))
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+        self.assertFalse(writer.write_stream(path, lambda f: f.write("same")))
+        self.assertEqual(os.stat(path).st_mtime_ns, 1_000_000_000)
+        self.assertTrue(writer.write_stream(path, lambda f: f.write("new")))
+        self.assertEqual(self.read(path), "new")
+        self.assertEqual((writer.written, writer.skipped), (2, 1))
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["index.html"])
+
+    def test_writes_new_files_and_creates_directories(self):
+        writer = OutputWriter()
+        paths = [os.path.join(self.root, "a", "b", f"{i}.html") for i in range(50)]
+        for i, path in enumerate(paths):
+            writer.write(path, f"page {i}")
+        writer.close()
+        self.assertEqual((writer.written, writer.skipped), (50, 0))
+        for i, path in enumerate(paths):
+            self.assertEqual(self.read(path), f"page {i}")
+        self.assertFalse(
+            [n for n in os.listdir(os.path.dirname(paths[0])) if n.endswith(".tmp")]
+        )
+
+    def test_identical_output_is_not_rewritten(self):
+        path = os.path.join(self.root, "index.html")
+        with open(path, "w") as f:
+            _ = f.write("same")
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+        inode = os.stat(path).st_ino
+        writer = OutputWriter(threads=0)
+        writer.write(path, "same")
+        self.assertEqual((writer.written, writer.skipped), (0, 1))
+        self.assertEqual(os.stat(path).st_mtime_ns, 1_000_000_000)
+        self.assertEqual(os.stat(path).st_ino, inode)
+
+    def test_changed_output_replaces_file(self):
+        path = os.path.join(self.root, "index.html")
+        linked = os.path.join(self.root, "linked.html")
+        with open(path, "w") as f:
+            _ = f.write("old")
+        os.link(path, linked)
+        writer = OutputWriter(threads=0)
+        writer.write(path, "new")
+        self.assertEqual((writer.written, writer.skipped), (1, 0))
+        self.assertEqual(self.read(path), "new")
+        self.assertEqual(self.read(linked), "old")
+
+    def test_close_raises_background_errors(self):
+        blocker = os.path.join(self.root, "file")
+        with open(blocker, "w") as f:
+            _ = f.write("")
+        writer = OutputWriter()
+        writer.write(os.path.join(blocker, "index.html"), "page")
+        with self.assertRaises(OSError):
+            writer.close()
+
+    def test_failed_writes_are_recorded_against_their_source(self):
+        blocked = os.path.join(self.root, "blocked.html")
+        os.makedirs(blocked)
+        writer = OutputWriter(threads=1)
+        writer.max_pending = 1
+        writer.write(blocked, "page", source="blocked.md")
+        for i in range(3):
+            writer.write(os.path.join(self.root, f"{i}.html"), "page", source=f"{i}.md")
+        writer.close()
+        self.assertEqual([source for source, _ in writer.failures], ["blocked.md"])
+        self.assertIn("IsADirectoryError", writer.failures[0][1])
+        self.assertEqual(writer.written, 3)
+        self.assertFalse([n for n in os.listdir(self.root) if n.endswith(".tmp")])
+
+    def test_failed_stream_removes_temporary_file(self):
+        def render(f: TextIO):
+            _ = f.write("partial")
+            raise ValueError("bad page")
+
+        writer = OutputWriter(threads=0)
+        with self.assertRaises(ValueError):
+            _ = writer.write_stream(os.path.join(self.root, "index.html"), render)
+        self.assertEqual(os.listdir(self.root), [])
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+
+
+class TempDirTestCase(unittest.TestCase):
+    """
+    A test case that runs in a fresh temporary directory, self.root, removed
+    after the test (and after any tearDown).
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root: str = tmp.name
+
+    def write(self, path: str, data: str | bytes):
+        """
+        Writes a file, creating its directory.
+
+        Args:
+            path (str): Path relative to self.root, or an absolute path.
+            data (str | bytes): The contents; text is written as UTF-8.
+        """
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, bytes):
+            with open(path, "wb") as f:
+                _ = f.write(data)
+        else:
+            with open(path, "w") as f:
+                _ = f.write(data)
+
+    def read(self, path: str) -> str:
+        with open(os.path.join(self.root, path)) as f:
+            return f.read()
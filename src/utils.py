@@ -1,9 +1,28 @@
 import re
+import time
 from enum import Enum
+from typing import NamedTuple
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, new_leaf, new_parent
 from textnode import TextNode, TextType
 
+# Bump whenever markdown_to_html_node's output changes for the same input, so that
+# cached parses from older versions are not reused.
+PARSER_VERSION = "1"
+
+IMAGE_PATTERN = re.compile(r"!\[([^\]]*)\]\(([^)]+)\)")
+LINK_PATTERN = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
+INLINE_MARKUP_PATTERN = re.compile(r"[\[*_~`]")
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+HEADING_BLOCK_PATTERN = re.compile(r"#{1,6} ")
+CODE_BLOCK_PATTERN = re.compile(r"```")
+QUOTE_BLOCK_PATTERN = re.compile(r"> ")
+UNORDERED_LIST_PATTERN = re.compile(r"(\*|\-|\+) ")
+ORDERED_LIST_PATTERN = re.compile(r"\d+\. ")
+BLOCK_START_PATTERN = re.compile(r"(#{1,6}) |```|> |[*+-] |\d+\. ")
+ORDERED_ITEM_PATTERN = re.compile(r"\d+\. (.+)")
+FENCE_OPEN_PATTERN = re.compile(r"```(\w*)")
+
 
 def split_nodes_delimiter(
     old_nodes: list[TextNode], delimiter: str, text_type: TextType
@@ -46,8 +65,7 @@ def extract_markdown_images(text: str) -> list[tuple[str, str]]:
     Returns:
         list[tuple[str, str]]: A list of tuples where each tuple contains the alt text and URL of an image.
     """
-    pattern = r"!\[([^\]]*)\]\(([^)]+)\)"
-    matches = re.findall(pattern, text)
+    matches: list[tuple[str, str]] = IMAGE_PATTERN.findall(text)
     return matches
 
 
@@ -61,8 +79,7 @@ def extract_markdown_links(text: str) -> list[tuple[str, str]]:
     Returns:
         list[tuple[str, str]]: A list of tuples where each tuple contains the link text and URL.
     """
-    pattern = r"\[([^\]]+)\]\(([^)]+)\)"
-    matches = re.findall(pattern, text)
+    matches: list[tuple[str, str]] = LINK_PATTERN.findall(text)
     return matches
 
 
@@ -134,9 +151,10 @@ def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
     return new_nodes
 
 
-def text_to_textnodes(text: str) -> list[TextNode]:
+def text_to_textnodes_legacy(text: str) -> list[TextNode]:
     """
-    Converts a plain text string into a list of TextNode objects split using markdown syntax.
+    Converts a plain text string into a list of TextNode objects by running the
+    image, link and delimiter splitters one after another.
 
     Args:
         text (str): The input plain text string.
@@ -156,6 +174,100 @@ def text_to_textnodes(text: str) -> list[TextNode]:
     return nodes
 
 
+# Delimiter tokens in the order text_to_textnodes_legacy splits on them. A token
+# only opens or closes a span when no lower-ranked span is open; inside a span it
+# is literal text, and a lower-ranked token ends the span early.
+_DELIMITER_RANKS: dict[str, tuple[int, TextType]] = {
+    "**": (1, TextType.BOLD),
+    "__": (2, TextType.UNDERLINE),
+    "_": (3, TextType.ITALIC),
+    "*": (4, TextType.ITALIC),
+    "~~": (5, TextType.STRIKETHROUGH),
+    "`": (6, TextType.CODE),
+}
+
+
+def text_to_textnodes(text: str, legacy: bool = False) -> list[TextNode]:
+    """
+    Converts a plain text string into a list of TextNode objects split using markdown syntax.
+    The text is scanned once from left to right and produces the same nodes as
+    text_to_textnodes_legacy; text without any markup characters is returned as
+    a single node without scanning.
+
+    Args:
+        text (str): The input plain text string.
+        legacy (bool): Use the multi-pass splitter pipeline instead.
+
+    Returns:
+        list[TextNode]: A list of TextNode objects representing the parsed text.
+    """
+    if legacy:
+        return text_to_textnodes_legacy(text)
+    if INLINE_MARKUP_PATTERN.search(text) is None:
+        return [TextNode(text, TextType.TEXT)] if text else []
+
+    nodes: list[TextNode] = []
+    length = len(text)
+    next_image = IMAGE_PATTERN.search(text) if "!" in text else None
+    rank = 0  # rank of the open delimiter span, 0 when none is open
+    span_type = TextType.TEXT
+    run_start = pos = 0
+    while True:
+        markup = INLINE_MARKUP_PATTERN.search(text, pos)
+        stop = markup.start() if markup else length
+
+        if next_image is not None and next_image.start() <= stop:
+            start = next_image.start()
+            if start > run_start:
+                nodes.append(TextNode(text[run_start:start], span_type))
+            alt_text, url = next_image.group(1, 2)
+            nodes.append(TextNode(alt_text, TextType.IMAGE, url))
+            rank, span_type = 0, TextType.TEXT
+            run_start = pos = next_image.end()
+            next_image = IMAGE_PATTERN.search(text, pos)
+            continue
+        if markup is None:
+            break
+
+        char = text[stop]
+        if char == "[":
+            link = LINK_PATTERN.match(
+                text, stop, next_image.start() if next_image else length
+            )
+            if link is None:
+                pos = stop + 1
+                continue
+            if stop > run_start:
+                nodes.append(TextNode(text[run_start:stop], span_type))
+            link_text, url = link.group(1, 2)
+            nodes.append(TextNode(link_text, TextType.LINK, url))
+            rank, span_type = 0, TextType.TEXT
+            run_start = pos = link.end()
+            continue
+
+        delimiter = text[stop : stop + 2]
+        if delimiter not in _DELIMITER_RANKS:
+            delimiter = char
+            if delimiter not in _DELIMITER_RANKS:  # a lone "~"
+                pos = stop + 1
+                continue
+        token_rank, token_type = _DELIMITER_RANKS[delimiter]
+        pos = stop + len(delimiter)
+        if rank and token_rank > rank:
+            continue
+        if stop > run_start:
+            nodes.append(TextNode(text[run_start:stop], span_type))
+        if token_rank == rank:
+            rank, span_type = 0, TextType.TEXT
+        else:
+            rank, span_type = token_rank, token_type
+        run_start = pos
+
+    if length > run_start:
+        nodes.append(TextNode(text[run_start:], span_type))
+    return nodes
+
+
 def markdown_to_blocks(markdown: str) -> list[str]:
     """
     Converts a markdown string into a list of text blocks split by double newlines.
@@ -186,20 +298,132 @@ def block_to_block_type(block: str) -> BlockType:
     Returns:
         BlockType: The type of the block.
     """
-    if re.match(r"^#{1,6} ", block):
+    if HEADING_BLOCK_PATTERN.match(block):
         return BlockType.heading
-    elif re.match(r"^```", block):
+    elif CODE_BLOCK_PATTERN.match(block):
         return BlockType.code
-    elif re.match(r"^> ", block):
+    elif QUOTE_BLOCK_PATTERN.match(block):
         return BlockType.quote
-    elif re.match(r"^(\*|\-|\+) ", block):
+    elif UNORDERED_LIST_PATTERN.match(block):
         return BlockType.unordered_list
-    elif re.match(r"^\d+\. ", block):
+    elif ORDERED_LIST_PATTERN.match(block):
         return BlockType.ordered_list
     else:
         return BlockType.paragraph
 
 
+class Block(NamedTuple):
+    block_type: BlockType
+    text: str = ""
+    items: tuple[str, ...] = ()
+    level: int = 0
+    language: str = ""
+
+
+def _lex_fence(lines: list[str], start: int, opening: int) -> tuple[Block, int]:
+    """
+    Lexes a fenced code block, blank lines included, up to its closing fence.
+    Without a closing fence the block ends at the next empty line instead.
+
+    Args:
+        lines (list[str]): All lines of the markdown.
+        start (int): Index of the first line of the block.
+        opening (int): Index of the opening fence line.
+
+    Returns:
+        tuple[Block, int]: The code block and the index of the line after it.
+    """
+    count = len(lines)
+    end = opening + 1
+    while end < count and lines[end].rstrip() != "```":
+        end += 1
+    fence = FENCE_OPEN_PATTERN.fullmatch(lines[opening].strip())
+    if end < count and fence is not None:
+        body = lines[opening + 1 : end]
+        code = "\n".join(body) + "\n" if body else ""
+        return Block(BlockType.code, code, language=fence.group(1)), end + 1
+    # Unclosed or malformed fences are kept verbatim.
+    if end == count:
+        end = opening
+        while end < count and lines[end]:
+            end += 1
+        end -= 1
+    raw = "\n".join(lines[start : end + 1]).strip()
+    return Block(BlockType.code, raw), end + 1
+
+
+def lex_blocks(markdown: str) -> list[Block]:
+    """
+    Splits a markdown string into classified blocks in a single pass over its
+    lines, extracting each block's content as it goes. Blocks are separated by
+    empty lines, except inside fenced code, which runs to its closing fence.
+    A closing fence also ends its block when no empty line follows it, so text
+    right after the fence starts a new block. (The earlier splitter on empty
+    lines kept such text in the fence's block, which then was not code and
+    rendered as one paragraph, fences and all.)
+
+    Args:
+        markdown (str): The input markdown string.
+
+    Returns:
+        list[Block]: The blocks, in document order.
+    """
+    lines = markdown.split("\n")
+    count = len(lines)
+    blocks: list[Block] = []
+    i = 0
+    while i < count:
+        if not lines[i]:
+            i += 1
+            continue
+        start = i
+        while i < count and lines[i] and lines[i].isspace():
+            i += 1
+        if i == count or not lines[i]:
+            continue
+        if lines[i].lstrip().startswith("```"):
+            block, i = _lex_fence(lines, start, i)
+            blocks.append(block)
+            continue
+
+        end = i
+        while end < count and lines[end]:
+            end += 1
+        text = "\n".join(lines[i:end]).strip()
+        i = end
+
+        match = BLOCK_START_PATTERN.match(text)
+        if match is None:
+            blocks.append(Block(BlockType.paragraph, text.replace("\n", " ")))
+            continue
+        first_line = text.partition("\n")[0]
+        marker = text[0]
+        if marker == "#":
+            heading = first_line[match.end() :].strip()
+            blocks.append(Block(BlockType.heading, heading, level=len(match.group(1))))
+        elif marker == ">":
+            if len(first_line) > 2:
+                quote = first_line[2:].strip()
+            else:
+                quote = text.replace("\n> ", " ")
+            blocks.append(Block(BlockType.quote, quote))
+        elif marker in "*+-":
+            items = tuple(
+                line[2:].strip()
+                for line in text.split("\n")
+                if len(line) > 2 and line[0] in "*+-" and line[1] == " "
+            )
+            blocks.append(Block(BlockType.unordered_list, items=items))
+        else:
+            items = tuple(
+                item.group(1).strip()
+                for item in map(ORDERED_ITEM_PATTERN.match, text.split("\n"))
+                if item is not None
+            )
+            blocks.append(Block(BlockType.ordered_list, items=items))
+    return blocks
+
+
 def text_node_to_html_node(text_node: TextNode) -> HTMLNode:
     """
     Converts a TextNode into an HTMLNode.
@@ -212,25 +436,25 @@ def text_node_to_html_node(text_node: TextNode) -> HTMLNode:
     """
     match text_node.text_type:
         case TextType.TEXT:
-            return LeafNode(tag=None, value=text_node.text)
+            return new_leaf(tag=None, value=text_node.text)
         case TextType.BOLD:
-            return LeafNode(tag="b", value=text_node.text)
+            return new_leaf(tag="b", value=text_node.text)
         case TextType.ITALIC:
-            return LeafNode(tag="i", value=text_node.text)
+            return new_leaf(tag="i", value=text_node.text)
         case TextType.UNDERLINE:
-            return LeafNode(tag="u", value=text_node.text)
+            return new_leaf(tag="u", value=text_node.text)
         case TextType.STRIKETHROUGH:
-            return LeafNode(tag="s", value=text_node.text)
+            return new_leaf(tag="s", value=text_node.text)
         case TextType.CODE:
-            return LeafNode(tag="code", value=text_node.text)
+            return new_leaf(tag="code", value=text_node.text)
         case TextType.LINK:
-            return LeafNode(
+            return new_leaf(
                 tag="a",
                 props={"href": text_node.url if text_node.url else "#"},
                 value=text_node.text,
             )
         case TextType.IMAGE:
-            return LeafNode(
+            return new_leaf(
                 tag="img",
                 props={
                     "src": text_node.url if text_node.url else "",
@@ -239,110 +463,105 @@ def text_node_to_html_node(text_node: TextNode) -> HTMLNode:
                 value="",
             )
         case _:
-            return LeafNode(tag=None, value=text_node.text)
+            return new_leaf(tag=None, value=text_node.text)
 
 
-def text_to_children(text: str) -> list[HTMLNode]:
+def text_to_children(
+    text: str, stats: dict[str, float] | None = None
+) -> list[HTMLNode]:
     """
     Converts a plain text string into a list of HTMLNode children.
 
     Args:
         text (str): The input plain text string.
+        stats (dict[str, float] | None): If given, the time spent parsing inline
+                                         markup is added to its "inline_parse".
 
     Returns:
         list[HTMLNode]: A list of HTMLNode objects representing the parsed text.
     """
-    text_nodes = text_to_textnodes(text)
+    if stats is None:
+        text_nodes = text_to_textnodes(text)
+    else:
+        start = time.perf_counter()
+        text_nodes = text_to_textnodes(text)
+        stats["inline_parse"] = (
+            stats.get("inline_parse", 0.0) + time.perf_counter() - start
+        )
     children: list[HTMLNode] = []
     for tn in text_nodes:
         children.append(text_node_to_html_node(tn))
     return children
 
 
-def markdown_to_html_node(markdown: str) -> HTMLNode:
+def markdown_to_html_node(
+    markdown: str, stats: dict[str, float] | None = None
+) -> HTMLNode:
     """
     Converts a markdown string into an HTMLNode tree.
 
     Args:
         markdown (str): The input markdown string.
+        stats (dict[str, float] | None): If given, the time spent on block
+                                         parsing, inline parsing and building the
+                                         tree is added to its "block_parse",
+                                         "inline_parse" and "tree_build".
 
     Returns:
         HTMLNode: The root HTMLNode representing the parsed markdown.
     """
-    blocks = markdown_to_blocks(markdown)
+    start = lexed = inline_before = 0.0
+    if stats is not None:
+        start = time.perf_counter()
+    blocks = lex_blocks(markdown)
+    if stats is not None:
+        lexed = time.perf_counter()
+        stats["block_parse"] = stats.get("block_parse", 0.0) + lexed - start
+        inline_before = stats.get("inline_parse", 0.0)
+
     children: list[HTMLNode] = []
     for block in blocks:
-        block_type = block_to_block_type(block)
-        match block_type:
+        match block.block_type:
             case BlockType.heading:
-                heading_match = re.match(r"^(#{1,6}) (.*)", block)
-                level = 1  # Default to level 1
-                heading_text = ""
-                if heading_match:
-                    level = len(heading_match.group(1))
-                    heading_text = heading_match.group(2).strip().replace("\n", " ")
-                node = ParentNode(
-                    tag=f"h{level}",
-                    children=text_to_children(heading_text),
+                node = new_parent(
+                    tag=HEADING_TAGS[block.level - 1],
+                    children=text_to_children(block.text, stats),
                 )
                 children.append(node)
 
             case BlockType.paragraph:
-                node = ParentNode(
-                    tag="p",
-                    children=text_to_children(block.strip().replace("\n", " ")),
-                )
+                node = new_parent(tag="p", children=text_to_children(block.text, stats))
                 children.append(node)
 
-            case BlockType.unordered_list:
-                items_ul: list[tuple[str, str]] = re.findall(
-                    r"^(\*|\-|\+) (.+)$", block, re.MULTILINE
-                )
-                li_children: list[ParentNode] = []
-                for _, item in items_ul:
-                    li_node = ParentNode(
-                        tag="li",
-                        children=text_to_children(item.strip().replace("\n", " ")),
-                    )
-                    li_children.append(li_node)
-                ul_node = ParentNode(tag="ul", children=li_children)
-                children.append(ul_node)
-
-            case BlockType.ordered_list:
-                items_ol: list[str] = re.findall(r"^\d+\. (.+)$", block, re.MULTILINE)
-                li_children = []
-                for item in items_ol:
-                    li_node = ParentNode(
-                        tag="li",
-                        children=text_to_children(item.strip().replace("\n", " ")),
-                    )
-                    li_children.append(li_node)
-                ol_node = ParentNode(tag="ol", children=li_children)
-                children.append(ol_node)
+            case BlockType.unordered_list | BlockType.ordered_list:
+                li_children: list[HTMLNode] = [
+                    new_parent(tag="li", children=text_to_children(item, stats))
+                    for item in block.items
+                ]
+                tag = "ul" if block.block_type is BlockType.unordered_list else "ol"
+                children.append(new_parent(tag=tag, children=li_children))
 
             case BlockType.quote:
-                quote_match = re.match(r"^> (.+)$", block, re.MULTILINE)
-                content = quote_match.group(1).strip() if quote_match else block.strip()
-                node = ParentNode(
-                    tag="blockquote",
-                    children=text_to_children(content.replace("\n> ", " ")),
+                node = new_parent(
+                    tag="blockquote", children=text_to_children(block.text, stats)
                 )
                 children.append(node)
 
             case BlockType.code:
-                code_match = re.match(r"^```(\w+)?\n([\s\S]+?\n)```$", block)
-                if code_match:
-                    language = code_match.group(1) if code_match.group(1) else ""
-                    code_content = code_match.group(2)
-                else:
-                    language = ""
-                    code_content = block
-                code_node = ParentNode(
+                code_node = new_parent(
                     tag="code",
-                    props={"class": f"language-{language}"} if language else {},
-                    children=[LeafNode(tag=None, value=code_content)],
+                    props={"class": f"language-{block.language}"}
+                    if block.language
+                    else None,
+                    children=[new_leaf(tag=None, value=block.text)],
                 )
-                pre_node = ParentNode(tag="pre", children=[code_node])
+                pre_node = new_parent(tag="pre", children=[code_node])
                 children.append(pre_node)
 
-    return ParentNode(tag="div", children=children)
+    root = new_parent(tag="div", children=children)
+    if stats is not None:
+        inline = stats.get("inline_parse", 0.0) - inline_before
+        stats["tree_build"] = (
+            stats.get("tree_build", 0.0) + time.perf_counter() - lexed - inline
+        )
+    return root
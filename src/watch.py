@@ -0,0 +1,93 @@
+import os
+import time
+from collections.abc import Callable
+
+
+def snapshot(paths: list[str]) -> dict[str, tuple[int, int]]:
+    """
+    Records the size and mtime of every file under the given files and
+    directories.
+
+    Args:
+        paths (list[str]): Files and directories to scan; missing ones are skipped.
+
+    Returns:
+        dict[str, tuple[int, int]]: (size, mtime in ns) keyed by file path.
+    """
+    files: dict[str, tuple[int, int]] = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_size, stat.st_mtime_ns)
+            continue
+        for root, _, names in os.walk(path):
+            for name in names:
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                files[file_path] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def changed_paths(
+    old: dict[str, tuple[int, int]], new: dict[str, tuple[int, int]]
+) -> list[str]:
+    """
+    Compares two snapshots.
+
+    Args:
+        old (dict[str, tuple[int, int]]): The earlier snapshot.
+        new (dict[str, tuple[int, int]]): The later snapshot.
+
+    Returns:
+        list[str]: Sorted paths that were added, removed or modified.
+    """
+    return sorted(
+        path for path in old.keys() | new.keys() if old.get(path) != new.get(path)
+    )
+
+
+def watch(
+    paths: list[str],
+    rebuild: Callable[[list[str]], None],
+    interval: float = 0.5,
+    debounce: float = 0.2,
+    max_rebuilds: int | None = None,
+):
+    """
+    Polls the given paths and calls rebuild whenever something changed. A burst
+    of changes (an editor saving several files, a git checkout) is collected
+    until the tree has been quiet for `debounce` seconds and handled by a
+    single rebuild. Changes made during a rebuild trigger the next one.
+    Returns on Ctrl+C.
+
+    Args:
+        paths (list[str]): Files and directories to watch.
+        rebuild (Callable[[list[str]], None]): Called with the changed paths.
+        interval (float): Seconds between polls.
+        debounce (float): Quiet period in seconds that ends a burst.
+        max_rebuilds (int | None): Stop after this many rebuilds, if given.
+    """
+    current = snapshot(paths)
+    rebuilds = 0
+    print(f"Watching {', '.join(paths)} for changes (Ctrl+C to stop)")
+    try:
+        while max_rebuilds is None or rebuilds < max_rebuilds:
+            time.sleep(interval)
+            latest = snapshot(paths)
+            if latest == current:
+                continue
+            while True:
+                time.sleep(debounce)
+                settled = snapshot(paths)
+                if settled == latest:
+                    break
+                latest = settled
+            changes = changed_paths(current, latest)
+            current = latest
+            rebuild(changes)
+            rebuilds += 1
+    except KeyboardInterrupt:
+        print("Stopped watching.")
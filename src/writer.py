@@ -0,0 +1,204 @@
+import contextlib
+import os
+import threading
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TextIO
+
+DEFAULT_WRITE_THREADS = 4
+COMPARE_CHUNK_SIZE = 64 * 1024
+
+
+def is_identical(path: str, data: bytes) -> bool:
+    """
+    Checks whether a file already holds exactly the given data, comparing sizes
+    before reading the file.
+
+    Args:
+        path (str): Path to the file.
+        data (bytes): The data about to be written.
+
+    Returns:
+        bool: True if the file exists with the same contents.
+    """
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except FileNotFoundError:
+        return False
+
+
+def files_identical(path: str, other_path: str) -> bool:
+    """
+    Checks whether two files hold the same bytes, comparing sizes before
+    reading both files chunk by chunk.
+
+    Args:
+        path (str): Path to a file.
+        other_path (str): Path to the other file.
+
+    Returns:
+        bool: True if both files exist with the same contents.
+    """
+    try:
+        if os.stat(path).st_size != os.stat(other_path).st_size:
+            return False
+        with open(path, "rb") as f, open(other_path, "rb") as other:
+            while True:
+                chunk = f.read(COMPARE_CHUNK_SIZE)
+                if chunk != other.read(COMPARE_CHUNK_SIZE):
+                    return False
+                if not chunk:
+                    return True
+    except FileNotFoundError:
+        return False
+
+
+def discard(path: str):
+    """
+    Removes a temporary file left behind by a failed write, if there is one.
+
+    Args:
+        path (str): Path to the temporary file.
+    """
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+
+
+class OutputWriter:
+    def __init__(self, threads: int = DEFAULT_WRITE_THREADS):
+        """
+        Writes build outputs, skipping files whose contents did not change so
+        their mtimes stay put for rsync and CDN invalidation. Each write goes to
+        a temporary file renamed over the destination, and the temporary file is
+        removed if that fails. With threads, writes run in the background;
+        flush() or close() waits for them. A failed write that names its source
+        is added to failures; any other re-raises its error there.
+
+        Args:
+            threads (int): Number of writer threads; 0 writes synchronously.
+        """
+        self.written: int = 0
+        self.skipped: int = 0
+        self.failures: list[tuple[str, str]] = []
+        self.directories: set[str] = set()
+        self.lock: threading.Lock = threading.Lock()
+        self.pool: ThreadPoolExecutor | None = (
+            ThreadPoolExecutor(max_workers=threads) if threads > 0 else None
+        )
+        self.pending: deque[tuple[str | None, Future[bool]]] = deque()
+        # Bounds the page contents held in memory while waiting to be written.
+        self.max_pending: int = max(1, threads) * 16
+
+    def ensure_directory(self, path: str):
+        if path not in self.directories:
+            os.makedirs(path, exist_ok=True)
+            self.directories.add(path)
+
+    def write(
+        self, path: str, content: str, wait: bool = False, source: str | None = None
+    ):
+        """
+        Writes content to path unless the file already holds it.
+
+        Args:
+            path (str): Destination path.
+            content (str): The text to write, encoded as UTF-8.
+            wait (bool): Write synchronously even when threads are available.
+            source (str | None): The file the output was generated from. If a
+                                 background write fails, (source, error message)
+                                 is added to failures instead of raising.
+        """
+        data = content.encode()
+        if self.pool is None or wait:
+            _ = self.write_now(path, data)
+            return
+        self.pending.append((source, self.pool.submit(self.write_now, path, data)))
+        while len(self.pending) > self.max_pending:
+            self.collect()
+
+    def write_now(self, path: str, data: bytes) -> bool:
+        """
+        Writes data to path in the calling thread unless the file already holds it.
+
+        Args:
+            path (str): Destination path.
+            data (bytes): The data to write.
+
+        Returns:
+            bool: True if the file was written, False if it was unchanged.
+        """
+        if is_identical(path, data):
+            with self.lock:
+                self.skipped += 1
+            return False
+        self.ensure_directory(os.path.dirname(path))
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                _ = f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            discard(tmp_path)
+            raise
+        with self.lock:
+            self.written += 1
+        return True
+
+    def write_stream(self, path: str, render: Callable[[TextIO], None]) -> bool:
+        """
+        Streams a file to path in the calling thread: render writes it into the
+        temporary file, which is discarded instead of renamed if the existing
+        file already holds the same bytes.
+
+        Args:
+            path (str): Destination path.
+            render (Callable[[TextIO], None]): Writes the contents to a file.
+
+        Returns:
+            bool: True if the file was written, False if it was unchanged.
+        """
+        self.ensure_directory(os.path.dirname(path))
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                render(f)
+            if files_identical(tmp_path, path):
+                os.unlink(tmp_path)
+                with self.lock:
+                    self.skipped += 1
+                return False
+            os.replace(tmp_path, path)
+        except BaseException:
+            discard(tmp_path)
+            raise
+        with self.lock:
+            self.written += 1
+        return True
+
+    def collect(self):
+        """
+        Waits for the oldest background write, recording its failure against its
+        source or re-raising it if it has none.
+        """
+        source, future = self.pending.popleft()
+        try:
+            _ = future.result()
+        except Exception as e:
+            if source is None:
+                raise
+            self.failures.append((source, f"{type(e).__name__}: {e}"))
+
+    def flush(self):
+        while self.pending:
+            self.collect()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(wait=True)